@@ -0,0 +1,262 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+import json
+import logging
+import os
+import time
+from dotenv import load_dotenv
+from .metrics import (
+    ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_WAIT, ADMISSION_QUEUED, ADMISSION_REJECTED)
+
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Upstream calls running at once in this process, and per client key
+# (the rate-limit identity: IP or API key); 0 disables a limit
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "32"))
+ADMISSION_PER_KEY_CONCURRENCY = int(os.getenv("ADMISSION_PER_KEY_CONCURRENCY", "8"))
+# Calls waiting for a slot; beyond this new calls are shed with a 503
+# (0 sheds every call that cannot start at once)
+ADMISSION_QUEUE_DEPTH = int(os.getenv("ADMISSION_QUEUE_DEPTH", "128"))
+# JSON object of client key -> weight (default 1); a key with weight 2 gets
+# twice the share of freed slots while several keys are waiting, e.g.
+# {"jobs": 0.5, "api_key:3f2a...": 2}
+ADMISSION_WEIGHTS = os.getenv("ADMISSION_WEIGHTS", "")
+
+# Key of work with no client attached
+DEFAULT_KEY = "anonymous"
+# Weight of the newest slot hold time in the Retry-After estimate
+HOLD_EWMA_ALPHA = 0.2
+
+
+class AdmissionRejected(RuntimeError):
+    """
+    The admission queue is full; the call was shed without waiting
+    """
+
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(f"Admission queue full, shed call of {key}")
+        self.retry_after = retry_after
+
+
+_client_key: ContextVar[str] = ContextVar("admission_key", default=DEFAULT_KEY)
+
+
+@contextmanager
+def admission_key(key: str):
+    """
+    Attribute the upstream calls made inside the block to client ``key``.
+
+    Tasks created inside the block (asyncio.gather, create_task) inherit it.
+    """
+    token = _client_key.set(key or DEFAULT_KEY)
+    try:
+        yield
+    finally:
+        _client_key.reset(token)
+
+
+def current_key() -> str:
+    return _client_key.get()
+
+
+def load_weights(spec: str = ADMISSION_WEIGHTS) -> dict:
+    return {key: float(weight) for key, weight in json.loads(spec).items()} if spec.strip() else {}
+
+
+class _Waiter:
+    __slots__ = ("key", "finish", "future")
+
+    def __init__(self, key: str, finish: float, future: asyncio.Future):
+        self.key = key
+        self.finish = finish
+        self.future = future
+
+
+class AdmissionController:
+    """
+    Concurrency limits with weighted fair queuing in front of upstream calls.
+
+    A call starts at once while fewer than ``max_concurrency`` calls run in
+    total and fewer than ``per_key`` run for its key. Otherwise it waits in
+    its key's FIFO queue. Each waiter gets a virtual finish tag,
+    max(virtual time, previous tag of its key) + 1 / weight, and every
+    freed slot goes to the waiter with the smallest tag among the keys
+    below their own limit. A key that floods the queue therefore only
+    delays itself; a newly arriving key is served next.
+
+    With ``queue_depth`` calls waiting, new calls fail immediately with
+    AdmissionRejected, whose ``retry_after`` estimates when a slot frees up.
+    """
+
+    def __init__(self, max_concurrency: int = ADMISSION_MAX_CONCURRENCY,
+                 per_key: int = ADMISSION_PER_KEY_CONCURRENCY,
+                 queue_depth: int = ADMISSION_QUEUE_DEPTH, weights: dict = None):
+        self.max_concurrency = max_concurrency
+        self.per_key = per_key
+        self.queue_depth = queue_depth
+        self.weights = weights if weights is not None else load_weights()
+        self.reset()
+
+    def reset(self):
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.waited = 0
+        self.rejected = 0
+        self.hold = None  # moving average of slot hold time (seconds)
+        self._active_by_key = {}
+        self._queues = {}  # key -> deque of _Waiter
+        self._last_finish = {}
+        self._virtual_time = 0.0
+
+    def _has_room(self, key: str) -> bool:
+        if self.max_concurrency and self.active >= self.max_concurrency:
+            return False
+        return not self.per_key or self._active_by_key.get(key, 0) < self.per_key
+
+    def _start(self, key: str):
+        self.active += 1
+        self._active_by_key[key] = self._active_by_key.get(key, 0) + 1
+        self.admitted += 1
+        ADMISSION_IN_FLIGHT.inc()
+
+    def release(self, key: str, held: float = None):
+        """
+        Give back a slot of ``key`` that was held for ``held`` seconds
+        """
+        self.active -= 1
+        remaining = self._active_by_key[key] - 1
+        if remaining:
+            self._active_by_key[key] = remaining
+        else:
+            del self._active_by_key[key]
+        ADMISSION_IN_FLIGHT.dec()
+        if held is not None:
+            self.hold = held if self.hold is None else self.hold + HOLD_EWMA_ALPHA * (held - self.hold)
+        self._dispatch()
+
+    def _dispatch(self):
+        """
+        Hand free slots to the eligible waiters with the smallest finish tags
+        """
+        while self.queued:
+            best = None
+            for key, queue in self._queues.items():
+                if self._has_room(key) and (best is None or queue[0].finish < best.finish):
+                    best = queue[0]
+            if best is None:
+                return
+            self._dequeue(best)
+            self._virtual_time = best.finish
+            self._start(best.key)
+            best.future.set_result(None)
+
+    def _dequeue(self, waiter: _Waiter):
+        queue = self._queues[waiter.key]
+        queue.remove(waiter)
+        if not queue:
+            # An idle key starts over at the current virtual time
+            del self._queues[waiter.key]
+            self._last_finish.pop(waiter.key, None)
+        self.queued -= 1
+        ADMISSION_QUEUED.dec()
+
+    def retry_after(self) -> float:
+        """
+        Seconds until the calls queued now should have started
+        """
+        slots = self.max_concurrency or max(1, self.active)
+        return max(1.0, (self.hold or 1.0) * (self.queued + 1) / slots)
+
+    async def acquire(self, key: str):
+        """
+        Take a slot for ``key``, waiting in its queue if needed; every
+        acquire must be paired with a release
+        """
+        if not self._queues.get(key) and self._has_room(key):
+            self._start(key)
+            ADMISSION_QUEUE_WAIT.observe(0.0)
+        else:
+            await self._wait(key)
+
+    def try_acquire(self, key: str) -> bool:
+        """
+        Take a slot for ``key`` only if one is free and nobody is queued;
+        a True result must be paired with a release
+        """
+        if self.queued or not self._has_room(key):
+            return False
+        self._start(key)
+        return True
+
+    @asynccontextmanager
+    async def slot(self, key: str = None):
+        """
+        Hold one upstream call slot for the duration of the block
+        """
+        key = key or current_key()
+        await self.acquire(key)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(key, time.perf_counter() - started)
+
+    async def _wait(self, key: str):
+        if self.queued >= self.queue_depth:
+            self.rejected += 1
+            ADMISSION_REJECTED.labels("queue_full").inc()
+            retry_after = self.retry_after()
+            logger.warning(
+                f"Admission queue full ({self.queued} waiting), shedding call "
+                f"of {key[:24]}, retry in {retry_after:.0f}s")
+            raise AdmissionRejected(key, retry_after)
+
+        finish = max(self._virtual_time, self._last_finish.get(key, 0.0)) + \
+            1.0 / self.weights.get(key, 1.0)
+        self._last_finish[key] = finish
+        waiter = _Waiter(key, finish, asyncio.get_running_loop().create_future())
+        self._queues.setdefault(key, deque()).append(waiter)
+        self.queued += 1
+        self.waited += 1
+        ADMISSION_QUEUED.inc()
+        started = time.perf_counter()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just before the cancellation arrived
+                self.release(key)
+            else:
+                self._dequeue(waiter)
+                ADMISSION_REJECTED.labels("abandoned").inc()
+            raise
+        finally:
+            ADMISSION_QUEUE_WAIT.observe(time.perf_counter() - started)
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "waited": self.waited,
+            "rejected": self.rejected,
+            "active_by_key": len(self._active_by_key),
+            "queued_by_key": {key[:24]: len(queue) for key, queue in self._queues.items()},
+        }
+
+
+_controller = None
+
+
+def get_admission_controller() -> AdmissionController:
+    global _controller
+
+    if _controller is None:
+        _controller = AdmissionController()
+    return _controller
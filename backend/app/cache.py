@@ -0,0 +1,250 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# memory | sqlite | off
+GENERATION_CACHE = os.getenv("GENERATION_CACHE", "memory").lower()
+GENERATION_CACHE_TTL = float(os.getenv("GENERATION_CACHE_TTL", "3600"))  # seconds
+GENERATION_CACHE_MAX_ENTRIES = int(
+    os.getenv("GENERATION_CACHE_MAX_ENTRIES", "1024"))
+GENERATION_CACHE_MAX_BYTES = int(
+    os.getenv("GENERATION_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+GENERATION_CACHE_PATH = os.getenv(
+    "GENERATION_CACHE_PATH", "generation_cache.sqlite3")
+
+
+def cache_key(model: str, contents: str, config: dict) -> str:
+    """
+    Content address of a generation: rendered prompt, model and config
+    """
+    payload = json.dumps(
+        {"model": model, "contents": contents, "config": config},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    """
+    In-process LRU with a TTL, bounded by entry count and total bytes
+    """
+
+    def __init__(self, max_entries: int = GENERATION_CACHE_MAX_ENTRIES,
+                 max_bytes: int = GENERATION_CACHE_MAX_BYTES,
+                 ttl: float = GENERATION_CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size_bytes = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value, size)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value, size = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str):
+        size = len(key) + len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, size)
+            self.size_bytes += size
+            while (len(self._entries) > self.max_entries
+                   or self.size_bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self.size_bytes -= size
+
+
+class SQLiteCache:
+    """
+    On-disk cache shared by every uvicorn worker on the host.
+
+    WAL mode lets readers in other processes proceed while one writes.
+    Expired rows are purged and the table trimmed (least recently used
+    first) every ``trim_every`` writes.
+    """
+
+    def __init__(self, path: str = GENERATION_CACHE_PATH,
+                 max_entries: int = GENERATION_CACHE_MAX_ENTRIES,
+                 ttl: float = GENERATION_CACHE_TTL, trim_every: int = 100,
+                 table: str = "generation_cache"):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.trim_every = trim_every
+        self.evictions = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?",
+                (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                return None
+            self._conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?",
+                (now, key))
+            return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl, now))
+            self._writes += 1
+            if self._writes % self.trim_every == 0:
+                self._trim(now)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def _trim(self, now: float):
+        expired = self._conn.execute(
+            f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+        self.evictions += expired.rowcount
+        count = self._conn.execute(
+            f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        if count > self.max_entries:
+            trimmed = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f" SELECT key FROM {self.table}"
+                " ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_entries,))
+            self.evictions += trimmed.rowcount
+
+
+class GenerationCache:
+    """
+    Generation output cache with hit/miss accounting.
+
+    ``backends`` are checked in order (fastest first); a hit in a slower
+    backend is copied into the faster ones.
+    """
+
+    def __init__(self, *backends):
+        self.backends = list(backends)
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.backends)
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        for index, backend in enumerate(self.backends):
+            try:
+                value = backend.get(key)
+            except sqlite3.Error as e:
+                logger.warning(f"Generation cache read failed: {str(e)}")
+                continue
+            if value is not None:
+                for faster in self.backends[:index]:
+                    faster.set(key, value)
+                self.hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: str):
+        for backend in self.backends:
+            try:
+                backend.set(key, value)
+            except sqlite3.Error as e:
+                logger.warning(f"Generation cache write failed: {str(e)}")
+
+    def clear(self):
+        for backend in self.backends:
+            backend.clear()
+        self.hits = self.misses = self.bypasses = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "+".join(type(b).__name__ for b in self.backends) or "off",
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": [len(b) for b in self.backends],
+            "evictions": sum(b.evictions for b in self.backends),
+        }
+
+
+_cache = None
+
+
+def get_generation_cache() -> GenerationCache:
+    global _cache
+
+    if _cache is None:
+        if GENERATION_CACHE == "off":
+            _cache = GenerationCache()
+        elif GENERATION_CACHE == "sqlite":
+            _cache = GenerationCache(MemoryCache(), SQLiteCache())
+        else:
+            _cache = GenerationCache(MemoryCache())
+    return _cache
@@ -0,0 +1,61 @@
+import asyncio
+import logging
+import os
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+from .metrics import GENERATIONS_CANCELLED
+
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# How often a running generation checks whether its client is still there
+DISCONNECT_POLL_INTERVAL = float(os.getenv("DISCONNECT_POLL_INTERVAL", "0.25"))
+
+# nginx's "client closed request"; never reaches the client, but shows up
+# in logs and request metrics
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def cancel_on_disconnect(request: Request, awaitable, endpoint: str,
+                               poll_interval: float = None):
+    """
+    Await ``awaitable``, cancelling it as soon as the client disconnects.
+
+    Cancellation reaches the upstream calls (closing their connections), so
+    an abandoned request stops using Gemini quota and connection slots. The
+    request then ends with a 499.
+    """
+    poll_interval = poll_interval or DISCONNECT_POLL_INTERVAL
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                break
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        GENERATIONS_CANCELLED.labels(endpoint).inc()
+        logger.info(f"Client disconnected, cancelled {endpoint} generation")
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request.")
+    finally:
+        task.cancel()
+
+
+def cancel_pending(tasks, endpoint: str) -> int:
+    """
+    Cancel the tasks still running when a streamed response ends early
+    (the client went away); returns how many were cancelled
+    """
+    cancelled = 0
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+            cancelled += 1
+    if cancelled:
+        GENERATIONS_CANCELLED.labels(endpoint).inc()
+        logger.info(f"Stream closed early, cancelled {cancelled} {endpoint} tasks")
+    return cancelled
@@ -0,0 +1,240 @@
+import asyncio
+from collections import defaultdict
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from google.genai import types
+
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# off | record | replay | auto (replay what is recorded, record the rest)
+GEMINI_CASSETTE = os.getenv("GEMINI_CASSETTE", "off").lower()
+GEMINI_CASSETTE_PATH = os.getenv("GEMINI_CASSETTE_PATH", "gemini_cassette.jsonl.gz")
+# Multiplier for recorded latencies on replay; 0 replays instantly
+GEMINI_CASSETTE_LATENCY_SCALE = float(
+    os.getenv("GEMINI_CASSETTE_LATENCY_SCALE", "1.0"))
+
+MODES = ("off", "record", "replay", "auto")
+
+
+class CassetteMiss(RuntimeError):
+    """
+    Replay-only cassette has no recording for a request
+    """
+
+
+def _jsonable(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    return value
+
+
+def fingerprint(kind: str, model: str, contents, config) -> str:
+    """
+    Stable identity of a request: call kind, model, contents and config
+    """
+    payload = json.dumps(
+        {"kind": kind, "model": model, "contents": _jsonable(contents),
+         "config": _jsonable(config)},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _dump_response(response) -> dict:
+    return response.model_dump(
+        mode="json", exclude_none=True, exclude={"sdk_http_response"})
+
+
+def _load_response(data: dict) -> types.GenerateContentResponse:
+    return types.GenerateContentResponse.model_validate(data)
+
+
+class Cassette:
+    """
+    Recorded Gemini exchanges in a gzip-compressed JSON lines file.
+
+    One line per exchange: ``{"key", "kind", "latency", "response"}`` for
+    generate_content and ``{"key", "kind", "latency", "chunks": [[offset,
+    response], ...]}`` for streams, offsets in seconds from the call start.
+    Recording appends a gzip member per exchange, so a cassette can grow
+    across runs without rewriting it. Repeated requests replay their
+    recordings in order, cycling once exhausted.
+    """
+
+    def __init__(self, path: str = GEMINI_CASSETTE_PATH, mode: str = "replay",
+                 latency_scale: float = GEMINI_CASSETTE_LATENCY_SCALE):
+        if mode not in MODES or mode == "off":
+            raise ValueError(f"Unsupported cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._exchanges = defaultdict(list)
+        self._cursors = defaultdict(int)
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        if mode != "record" and os.path.exists(path):
+            self._load()
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._exchanges.values())
+
+    @property
+    def records(self) -> bool:
+        return self.mode in ("record", "auto")
+
+    def lookup(self, key: str):
+        """
+        Next recorded exchange for ``key``; None when it should be recorded
+        """
+        with self._lock:
+            entries = self._exchanges.get(key)
+            if self.mode == "record" or not entries:
+                self.misses += 1
+                if self.mode == "replay":
+                    raise CassetteMiss(
+                        f"No recording for request {key[:12]}... in {self.path}")
+                return None
+            self.hits += 1
+            entry = entries[self._cursors[key] % len(entries)]
+            self._cursors[key] += 1
+            return entry
+
+    def record(self, entry: dict):
+        line = json.dumps(entry, separators=(",", ":"), ensure_ascii=False)
+        with self._lock:
+            self._exchanges[entry["key"]].append(entry)
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.recorded += 1
+
+    def delay(self, seconds: float) -> float:
+        return max(0.0, seconds * self.latency_scale)
+
+    def stats(self) -> dict:
+        return {"mode": self.mode, "entries": len(self), "hits": self.hits,
+                "misses": self.misses, "recorded": self.recorded}
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._exchanges[entry["key"]].append(entry)
+        logger.info(f"Loaded {len(self)} Gemini exchanges from {self.path}")
+
+
+class _AsyncModels:
+    def __init__(self, cassette: Cassette, client):
+        self._cassette = cassette
+        self._client = client
+
+    async def generate_content(self, *, model: str, contents, config=None, **kwargs):
+        key = fingerprint("generate", model, contents, config)
+        entry = self._cassette.lookup(key)
+        if entry is not None:
+            await asyncio.sleep(self._cassette.delay(entry["latency"]))
+            return _load_response(entry["response"])
+
+        started = time.perf_counter()
+        response = await self._client.aio.models.generate_content(
+            model=model, contents=contents, config=config, **kwargs)
+        self._cassette.record({
+            "key": key, "kind": "generate",
+            "latency": round(time.perf_counter() - started, 4),
+            "response": _dump_response(response),
+        })
+        return response
+
+    async def generate_content_stream(self, *, model: str, contents, config=None,
+                                      **kwargs):
+        key = fingerprint("stream", model, contents, config)
+        entry = self._cassette.lookup(key)
+        if entry is not None:
+            return self._replay_stream(entry)
+
+        started = time.perf_counter()
+        stream = await self._client.aio.models.generate_content_stream(
+            model=model, contents=contents, config=config, **kwargs)
+        return self._record_stream(key, started, stream)
+
+    async def _replay_stream(self, entry: dict):
+        started = time.perf_counter()
+        for offset, data in entry["chunks"]:
+            wait = self._cassette.delay(offset) - (time.perf_counter() - started)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            yield _load_response(data)
+
+    async def _record_stream(self, key: str, started: float, stream):
+        chunks = []
+        async for chunk in stream:
+            chunks.append([round(time.perf_counter() - started, 4),
+                           _dump_response(chunk)])
+            yield chunk
+        # Only complete streams are recorded
+        self._cassette.record({
+            "key": key, "kind": "stream",
+            "latency": round(time.perf_counter() - started, 4),
+            "chunks": chunks,
+        })
+
+    def __getattr__(self, name):
+        return getattr(self._client.aio.models, name)
+
+
+class _Models:
+    def __init__(self, cassette: Cassette, client):
+        self._cassette = cassette
+        self._client = client
+
+    def generate_content(self, *, model: str, contents, config=None, **kwargs):
+        key = fingerprint("generate", model, contents, config)
+        entry = self._cassette.lookup(key)
+        if entry is not None:
+            time.sleep(self._cassette.delay(entry["latency"]))
+            return _load_response(entry["response"])
+
+        started = time.perf_counter()
+        response = self._client.models.generate_content(
+            model=model, contents=contents, config=config, **kwargs)
+        self._cassette.record({
+            "key": key, "kind": "generate",
+            "latency": round(time.perf_counter() - started, 4),
+            "response": _dump_response(response),
+        })
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._client.models, name)
+
+
+class _Aio:
+    def __init__(self, models: _AsyncModels):
+        self.models = models
+
+
+class CassetteClient:
+    """
+    genai.Client stand-in that records or replays ``generate_content`` and
+    ``generate_content_stream``. In replay mode no real client is needed.
+    """
+
+    def __init__(self, cassette: Cassette, client=None):
+        self.cassette = cassette
+        self._client = client
+        self.models = _Models(cassette, client)
+        self.aio = _Aio(_AsyncModels(cassette, client))
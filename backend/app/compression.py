@@ -0,0 +1,280 @@
+from collections import Counter
+from dataclasses import dataclass
+import math
+import os
+import re
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+# Shrink resumes and job descriptions to a token budget before rendering
+INPUT_COMPRESSION = os.getenv("INPUT_COMPRESSION", "true").lower() in ("1", "true", "yes")
+RESUME_TOKEN_BUDGET = int(os.getenv("RESUME_TOKEN_BUDGET", "1500"))
+JD_TOKEN_BUDGET = int(os.getenv("JD_TOKEN_BUDGET", "800"))
+
+# Rough Gemini ratio for English text; only used for budgeting and reports
+CHARS_PER_TOKEN = 4
+# Lines longer than this are split into sentences before ranking
+MAX_CHUNK_CHARS = 300
+# Lines a repeated page header or footer needs before it is dropped
+MIN_REPEATED_BLOCK = 2
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+SECTION_HEADINGS = frozenset((
+    "summary", "profile", "professional summary", "objective", "experience",
+    "work experience", "professional experience", "employment", "employment history",
+    "education", "skills", "technical skills", "core competencies", "projects",
+    "certifications", "awards", "publications", "languages", "interests", "hobbies",
+    "volunteering", "responsibilities", "requirements", "qualifications",
+    "nice to have", "benefits", "about us", "about the role",
+))
+
+_INVISIBLE = re.compile(r"[\u200b\u200c\u200d\u2060\ufeff\u00ad]")
+_SPACES = re.compile(r"[^\S\n]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+(?=\S)")
+_BULLET = re.compile(r"^\s*(?:[-*•·▪◦‣]|\d{1,2}[.)])\s+")
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our that "
+    "the their this to we will with you your".split())
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def normalize(text: str) -> str:
+    """
+    Collapse whitespace, adjacent duplicate lines and repeated page headers
+    and footers. Other repeated lines, such as two roles with the same
+    title, are kept.
+    """
+    text = _INVISIBLE.sub("", text.replace("\r\n", "\n").replace("\r", "\n"))
+    lines = []
+    previous = None
+    for line in text.split("\n"):
+        line = _SPACES.sub(" ", line).strip()
+        key = line.lower()
+        if key and key == previous:
+            continue
+        if key:
+            previous = key
+        lines.append(line)
+    lines = drop_repeated_blocks(lines)
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+def drop_repeated_blocks(lines: list) -> list:
+    """
+    Drop later copies of the leading block of lines (a page header) and
+    earlier copies of the trailing one (a page footer). Only blocks of at
+    least MIN_REPEATED_BLOCK non-empty lines without bullets count, so
+    content that happens to repeat is left alone.
+    """
+    content = [position for position, line in enumerate(lines) if line]
+    keys = [lines[position].lower() for position in content]
+    dropped = set()
+    for step in (1, -1):
+        # Walk forward from the header, or backward from the footer
+        order = keys if step == 1 else keys[::-1]
+        start = 1
+        while start < len(order):
+            length = 0
+            while (start + length < len(order) and length < start
+                   and order[start + length] == order[length]
+                   and not _BULLET.match(order[length])):
+                length += 1
+            if length >= MIN_REPEATED_BLOCK:
+                for offset in range(start, start + length):
+                    index = offset if step == 1 else len(order) - 1 - offset
+                    dropped.add(content[index])
+                start += length
+            else:
+                start += 1
+    return [line for position, line in enumerate(lines) if position not in dropped]
+
+
+def terms(text: str) -> list:
+    return [term for term in _TOKEN.findall(text.lower()) if term not in _STOPWORDS]
+
+
+def term_counts(text: str) -> Counter:
+    """
+    Counter of terms(text), without filtering stopwords term by term
+    """
+    counts = Counter(_TOKEN.findall(text.lower()))
+    for stopword in _STOPWORDS.intersection(counts):
+        del counts[stopword]
+    return counts
+
+
+def is_heading(line: str) -> bool:
+    """
+    Short line that labels a section, e.g. "EXPERIENCE" or "Skills:"
+    """
+    if len(line) > 40 or _BULLET.match(line) or line.endswith((".", ",")):
+        return False
+    return (line.endswith(":") or (line.isupper() and "," not in line)
+            or line.lower().strip(" :") in SECTION_HEADINGS)
+
+
+@dataclass
+class Chunk:
+    index: int
+    text: str
+    heading: int = None  # index of the chunk heading this one's section
+
+
+def split_chunks(text: str) -> list:
+    """
+    Split normalized text into headings, bullets and sentence-sized chunks
+    """
+    chunks = []
+    heading = None
+    for line in text.split("\n"):
+        if not line:
+            continue
+        if is_heading(line):
+            heading = len(chunks)
+            chunks.append(Chunk(heading, line))
+            continue
+        parts = [line] if len(line) <= MAX_CHUNK_CHARS else _SENTENCE_END.split(line)
+        for part in parts:
+            chunks.append(Chunk(len(chunks), part, heading))
+    return chunks
+
+
+def bm25_scores(documents: list, query: list) -> list:
+    """
+    Okapi BM25 score of each tokenized document for the query terms
+    """
+    count = len(documents)
+    if not count:
+        return []
+    average = sum(len(document) for document in documents) / count or 1.0
+    frequencies = Counter(term for document in documents for term in set(document))
+    weights = Counter(query)
+    idf = {term: math.log(1 + (count - frequencies[term] + 0.5) / (frequencies[term] + 0.5))
+           for term in weights if frequencies[term]}
+
+    scores = []
+    for document in documents:
+        counts = Counter(document)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * len(document) / average)
+        score = 0.0
+        for term, term_idf in idf.items():
+            tf = counts.get(term)
+            if tf:
+                score += weights[term] * term_idf * tf * (BM25_K1 + 1) / (tf + norm)
+        scores.append(score)
+    return scores
+
+
+def pack(chunks: list, scores: list, budget: int) -> str:
+    """
+    Keep the highest-scoring chunks that fit ``budget`` tokens, in their
+    original order, with the headings of their sections. The first chunk
+    (usually the candidate's name and title) is always kept.
+    """
+    selected = set()
+    used = 0
+
+    def cost(chunk: Chunk) -> int:
+        # +1 for the newline joining it to the previous chunk
+        return estimate_tokens(chunk.text) + 1
+
+    def take(chunk: Chunk) -> bool:
+        nonlocal used
+        extra = [chunk] if chunk.index not in selected else []
+        if chunk.heading is not None and chunk.heading not in selected:
+            extra.append(chunks[chunk.heading])
+        needed = sum(cost(item) for item in extra)
+        if used + needed > budget:
+            return False
+        used += needed
+        selected.update(item.index for item in extra)
+        return True
+
+    if chunks:
+        take(chunks[0])
+    ranked = sorted(range(len(chunks)), key=lambda index: (-scores[index], index))
+    for index in ranked:
+        if not is_heading(chunks[index].text):
+            take(chunks[index])
+    return "\n".join(chunks[index].text for index in sorted(selected))
+
+
+def truncate(text: str, budget: int) -> str:
+    """
+    Leading chunks of ``text`` that fit ``budget`` tokens
+    """
+    kept, used = [], 0
+    for chunk in split_chunks(text):
+        used += estimate_tokens(chunk.text) + 1
+        if used > budget:
+            break
+        kept.append(chunk.text)
+    return "\n".join(kept)
+
+
+def fit_jd(jd: str, budget: int = JD_TOKEN_BUDGET) -> str:
+    """
+    Job description as is when it fits ``budget``, otherwise normalized and
+    cut to its leading chunks when still over budget
+    """
+    if estimate_tokens(jd) <= budget:
+        return jd
+    jd = normalize(jd)
+    return truncate(jd, budget) if estimate_tokens(jd) > budget else jd
+
+
+@dataclass
+class CompressedInputs:
+    resume: str
+    jd: str
+    resume_tokens: int  # estimated tokens before compression
+    jd_tokens: int
+
+    @property
+    def tokens_before(self) -> int:
+        return self.resume_tokens + self.jd_tokens
+
+    @property
+    def tokens_after(self) -> int:
+        return estimate_tokens(self.resume) + estimate_tokens(self.jd)
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.tokens_before - self.tokens_after)
+
+
+def compress(resume: str, jd: str, resume_budget: int = RESUME_TOKEN_BUDGET,
+             jd_budget: int = JD_TOKEN_BUDGET, rank: bool = True) -> CompressedInputs:
+    """
+    Fit both texts into their token budgets; texts that already fit are
+    left unchanged, the others are normalized first.
+
+    Over-budget resumes keep the chunks most relevant to the job description
+    (BM25); over-budget job descriptions keep their leading chunks, where
+    role and requirements usually are. With ``rank=False`` the resume is cut
+    the same way, so the result does not depend on the job description.
+    """
+    result = CompressedInputs(resume, jd, estimate_tokens(resume), estimate_tokens(jd))
+    jd = fit_jd(jd, jd_budget)
+
+    if estimate_tokens(resume) <= resume_budget:
+        result.jd = jd
+        return result
+    resume = normalize(resume)
+    if estimate_tokens(resume) > resume_budget and not rank:
+        resume = truncate(resume, resume_budget)
+    elif estimate_tokens(resume) > resume_budget:
+        chunks = split_chunks(resume)
+        scores = bm25_scores([terms(chunk.text) for chunk in chunks], terms(jd))
+        resume = pack(chunks, scores, resume_budget)
+
+    result.resume, result.jd = resume, jd
+    return result
@@ -0,0 +1,145 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from typing import Optional
+from dotenv import load_dotenv
+from .compression import estimate_tokens
+from .metrics import CONTEXT_CACHE_REQUESTS
+from .timing import span
+
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Register the prompt prefix shared by every call for a resume (instructions
+# and resume text) as Gemini cached content, so calls for further sections
+# and job descriptions only send their task part
+CONTEXT_CACHE = os.getenv("CONTEXT_CACHE", "false").lower() in ("1", "true", "yes")
+CONTEXT_CACHE_TTL = int(os.getenv("CONTEXT_CACHE_TTL", "600"))
+# Gemini refuses smaller caches (1024 tokens for Flash models, more for Pro)
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("CONTEXT_CACHE_MIN_TOKENS", "1024"))
+# Seconds full prompts are sent for a model after a cache could not be created
+CONTEXT_CACHE_COOLDOWN = int(os.getenv("CONTEXT_CACHE_COOLDOWN", "300"))
+
+# Stop referencing a cache this long before it expires upstream
+EXPIRY_MARGIN = 30
+
+
+def prefix_key(model: str, prefix: str) -> str:
+    return hashlib.sha256(f"{model}\n{prefix}".encode("utf-8")).hexdigest()
+
+
+class ContextCache:
+    """
+    Names of Gemini cached contents by (model, prompt prefix).
+
+    A prefix is registered on first use with a TTL and referenced until
+    shortly before it expires. Concurrent first uses share one create call.
+    When creating fails (caching unsupported, quota, stand-in without the
+    endpoint) the model is skipped for ``cooldown`` seconds and callers send
+    full prompts; a None name always means "send the full prompt".
+    """
+
+    def __init__(self, ttl: int = CONTEXT_CACHE_TTL,
+                 min_tokens: int = CONTEXT_CACHE_MIN_TOKENS,
+                 cooldown: int = CONTEXT_CACHE_COOLDOWN):
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.cooldown = cooldown
+        self._entries = {}  # key -> (name, usable until, monotonic)
+        self._pending = {}  # key -> task creating the cache
+        self._unavailable = {}  # model -> monotonic time caching is retried
+        self.hits = 0
+        self.created = 0
+        self.skipped = 0
+        self.errors = 0
+        self.invalidated = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _count(self, counter: str, result: str):
+        setattr(self, counter, getattr(self, counter) + 1)
+        CONTEXT_CACHE_REQUESTS.labels(result).inc()
+
+    async def lookup(self, client, model: str, prefix: str) -> Optional[str]:
+        """
+        Cached content name for ``prefix``, creating it if needed
+        """
+        now = time.monotonic()
+        if (estimate_tokens(prefix) < self.min_tokens
+                or self._unavailable.get(model, 0) > now):
+            self._count("skipped", "skipped")
+            return None
+
+        key = prefix_key(model, prefix)
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > now:
+            self._count("hits", "hit")
+            return entry[0]
+
+        pending = self._pending.get(key)
+        joined = pending is not None and pending.get_loop() is asyncio.get_running_loop()
+        if not joined:
+            pending = asyncio.ensure_future(self._create(client, model, prefix, key))
+            self._pending[key] = pending
+            pending.add_done_callback(
+                lambda _, key=key, pending=pending: self._forget(key, pending))
+        name = await asyncio.shield(pending)
+        if joined:
+            self._count(*(("hits", "hit") if name else ("skipped", "skipped")))
+        return name
+
+    async def _create(self, client, model: str, prefix: str, key: str) -> Optional[str]:
+        try:
+            with span("context_cache"):
+                cached = await client.aio.caches.create(model=model, config={
+                    "contents": [prefix],
+                    "ttl": f"{self.ttl}s",
+                    "display_name": f"prefix-{key[:16]}",
+                })
+        except Exception as e:
+            self._count("errors", "error")
+            self._unavailable[model] = time.monotonic() + self.cooldown
+            logger.warning(
+                f"Context caching unavailable for {model}, sending full prompts "
+                f"for {self.cooldown}s: {str(e)[:200]}")
+            return None
+
+        self._count("created", "created")
+        now = time.monotonic()
+        self._entries = {k: v for k, v in self._entries.items() if v[1] > now}
+        self._entries[key] = (cached.name, now + self.ttl - min(EXPIRY_MARGIN, self.ttl / 2))
+        logger.info(f"Cached prompt prefix of {estimate_tokens(prefix)} tokens as {cached.name}")
+        return cached.name
+
+    def _forget(self, key: str, pending: asyncio.Future):
+        if self._pending.get(key) is pending:
+            del self._pending[key]
+
+    def invalidate(self, model: str, prefix: str):
+        """
+        Drop a cache the API no longer knows (expired or deleted upstream)
+        """
+        if self._entries.pop(prefix_key(model, prefix), None) is not None:
+            self._count("invalidated", "invalidated")
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "created": self.created,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "invalidated": self.invalidated,
+        }
+
+
+_context_cache = ContextCache()
+
+
+def get_context_cache() -> ContextCache:
+    return _context_cache
@@ -12,4 +12,5 @@ async def verify_api_key(x_api_key: str = Header(...)):
 # Optional: simple header-based auth you can turn on behind a proxy
  if True: # set to True to enforce and compare against env value
     if x_api_key != X_API_KEY:
-         raise HTTPException(status_code=401, detail="Unauthorized")
\ No newline at end of file
+         raise HTTPException(status_code=401, detail="Unauthorized")
+ return x_api_key
\ No newline at end of file
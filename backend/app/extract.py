@@ -0,0 +1,148 @@
+# Text extraction from resume uploads. Runs in the parse worker processes
+# of parsing.py: keep the imports light, every worker loads this module.
+import io
+import os
+import re
+import zipfile
+from xml.etree import ElementTree
+
+
+# Bound on the decompressed XML of a DOCX (zip bomb guard)
+MAX_DOCX_XML_BYTES = 100 * 1024 * 1024
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_BLANK_LINES = re.compile(r"\n{3,}")
+_TRAILING_SPACE = re.compile(r"[ \t]+\n")
+
+
+def preload():
+    """
+    Import the PDF library when a worker starts, not on its first file
+    """
+    import pypdf  # noqa: F401
+
+
+class DocumentError(ValueError):
+    """
+    The upload is not a readable document of its format
+    """
+
+
+def detect_format(filename: str, head: bytes) -> str:
+    """
+    Format of an upload by its leading bytes, then its extension
+    """
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        return "docx"
+    extension = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    if extension in ("pdf", "docx"):
+        # Claims a binary format without its signature
+        raise DocumentError(f"File is not a valid {extension.upper()} document.")
+    return "txt"
+
+
+def clean_text(text: str) -> str:
+    text = text.replace("\r\n", "\n").replace("\r", "\n").replace("\x00", "")
+    text = _TRAILING_SPACE.sub("\n", text)
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def extract_txt(data: bytes, max_pages: int) -> tuple:
+    for encoding in ("utf-8-sig", "utf-16"):
+        if encoding == "utf-16" and not data.startswith((b"\xff\xfe", b"\xfe\xff")):
+            continue
+        try:
+            return data.decode(encoding), None, False
+        except UnicodeDecodeError:
+            pass
+    # Latin-1 never fails; better than dropping every accented character
+    return data.decode("latin-1"), None, False
+
+
+def extract_pdf(data: bytes, max_pages: int) -> tuple:
+    from pypdf import PdfReader
+
+    try:
+        reader = PdfReader(io.BytesIO(data))
+        if reader.is_encrypted and not reader.decrypt(""):
+            raise DocumentError("Password-protected PDFs are not supported.")
+        pages = len(reader.pages)
+        texts = [page.extract_text() or "" for page in reader.pages[:max_pages]]
+    except DocumentError:
+        raise
+    except Exception as e:
+        # Malformed files surface as all kinds of errors inside pypdf
+        raise DocumentError(f"Could not read the PDF: {str(e)[:100]}")
+    return "\n\n".join(texts), pages, pages > max_pages
+
+
+def extract_docx(data: bytes, max_pages: int) -> tuple:
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            info = archive.getinfo("word/document.xml")
+            if info.file_size > MAX_DOCX_XML_BYTES:
+                raise DocumentError("The DOCX document is too large.")
+            with archive.open(info) as document:
+                text = _docx_text(document)
+            pages = _docx_pages(archive)
+    except DocumentError:
+        raise
+    except Exception as e:
+        raise DocumentError(f"Could not read the DOCX: {str(e)[:100]}")
+    return text, pages, False
+
+
+def _docx_text(document) -> str:
+    """
+    Paragraph text of word/document.xml, streamed with iterparse
+    """
+    paragraphs = []
+    parts = []
+    for event, element in ElementTree.iterparse(document, events=("end",)):
+        tag = element.tag
+        if tag == _W + "t":
+            parts.append(element.text or "")
+        elif tag == _W + "tab":
+            parts.append("\t")
+        elif tag in (_W + "br", _W + "cr"):
+            parts.append("\n")
+        elif tag == _W + "p":
+            paragraphs.append("".join(parts))
+            parts = []
+            element.clear()
+    return "\n".join(paragraphs)
+
+
+def _docx_pages(archive: zipfile.ZipFile):
+    """
+    Page count Word saved in docProps/app.xml, if any
+    """
+    try:
+        with archive.open("docProps/app.xml") as properties:
+            for _, element in ElementTree.iterparse(properties):
+                if element.tag.endswith("}Pages") and (element.text or "").isdigit():
+                    return int(element.text)
+    except (KeyError, ElementTree.ParseError):
+        pass
+    return None
+
+
+EXTRACTORS = {"pdf": extract_pdf, "docx": extract_docx, "txt": extract_txt}
+
+
+def extract_document(data: bytes, fmt: str, max_pages: int) -> dict:
+    """
+    Text of a document with its page count (None when the format has no
+    pages) and whether pages past ``max_pages`` were skipped
+    """
+    text, pages, truncated = EXTRACTORS[fmt](data, max_pages)
+    text = clean_text(text)
+    return {
+        "text": text,
+        "format": fmt,
+        "pages": pages,
+        "characters": len(text),
+        "truncated": truncated,
+    }
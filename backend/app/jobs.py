@@ -0,0 +1,307 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from typing import Optional
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Shared by the workers of one host; the default directory is writable for
+# the unprivileged user of the Docker image
+JOB_QUEUE_PATH = os.getenv(
+    "JOB_QUEUE_PATH", os.path.join(tempfile.gettempdir(), "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))  # seconds
+JOB_LEASE = float(os.getenv("JOB_LEASE", "120"))  # seconds
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "86400"))  # seconds
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+
+class JobStore:
+    """
+    Durable SQLite-backed job queue.
+
+    Jobs are claimed with a lease; a job whose worker died (lease expired) is
+    handed out again until it has been attempted ``max_attempts`` times. The
+    file can be shared by several uvicorn workers on the same host.
+
+    Calls are blocking (up to the 5 s busy timeout while another worker
+    writes); async code runs them with asyncio.to_thread.
+    """
+
+    def __init__(self, path: str = JOB_QUEUE_PATH, lease: float = JOB_LEASE,
+                 max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        try:
+            self._conn = sqlite3.connect(
+                path, timeout=5, check_same_thread=False, isolation_level=None)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " result TEXT,"
+                " error TEXT,"
+                " status_code INTEGER,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " lease_until REAL,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status_created"
+                " ON jobs (status, created_at)")
+        except sqlite3.Error as e:
+            raise RuntimeError(
+                f"Cannot open the job queue {path!r} ({e}); set JOB_QUEUE_PATH "
+                f"to a writable path") from e
+
+    def enqueue(self, payload: dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, payload, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(payload), now, now))
+        return job_id
+
+    def claim(self) -> Optional[dict]:
+        """
+        Atomically take the oldest runnable job, or None when idle
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Give up on jobs that keep losing their worker
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, status_code = 500,"
+                    " error = 'Job abandoned after repeated worker failures.',"
+                    " updated_at = ?"
+                    " WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                    (FAILED, now, RUNNING, now, self.max_attempts))
+                row = self._conn.execute(
+                    "SELECT * FROM jobs"
+                    " WHERE status = ? OR (status = ? AND lease_until < ?)"
+                    " ORDER BY created_at LIMIT 1",
+                    (QUEUED, RUNNING, now)).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, attempts = attempts + 1,"
+                        " lease_until = ?, updated_at = ? WHERE id = ?",
+                        (RUNNING, now + self.lease, now, row["id"]))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = self._to_dict(row)
+        job["status"] = RUNNING
+        job["attempts"] += 1
+        return job
+
+    def complete(self, job_id: str, result: dict):
+        self._finish(job_id, SUCCEEDED, 200, result=json.dumps(result))
+
+    def fail(self, job_id: str, status_code: int, error: str):
+        self._finish(job_id, FAILED, status_code, error=error)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def purge(self, older_than: float = JOB_RETENTION) -> int:
+        cutoff = time.time() - older_than
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (*FINISHED, cutoff))
+        return cursor.rowcount
+
+    def _finish(self, job_id: str, status: str, status_code: int,
+                result: str = None, error: str = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, status_code = ?, result = ?,"
+                " error = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+                (status, status_code, result, error, time.time(), job_id))
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+class JobWorkerPool:
+    """
+    Background asyncio workers draining the job queue.
+
+    ``handler(payload)`` returns the result dict or raises; an exception with
+    ``status_code``/``detail`` attributes (e.g. HTTPException) is recorded as
+    is, anything else as a 500. Workers are woken immediately for jobs
+    enqueued in this process and poll for jobs enqueued by other workers.
+    """
+
+    def __init__(self, store: JobStore, handler, workers: int = JOB_WORKERS,
+                 poll_interval: float = JOB_POLL_INTERVAL):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._tasks = []
+        self._wakeup = None
+        self._finished = {}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work(index))
+                       for index in range(self.workers)]
+        logger.info(f"Started {self.workers} job workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _work(self, index: int):
+        last_purge = time.monotonic()
+        while True:
+            self._wakeup.clear()
+            job = await asyncio.to_thread(self.store.claim)
+            if job is None:
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                if time.monotonic() - last_purge > 3600:
+                    await asyncio.to_thread(self.store.purge)
+                    last_purge = time.monotonic()
+                continue
+
+            started = time.perf_counter()
+            try:
+                result = await self.handler(job["payload"])
+                await asyncio.to_thread(self.store.complete, job["id"], result)
+            except asyncio.CancelledError:
+                # Shutting down: the lease expires and another worker retries
+                raise
+            except Exception as e:
+                status_code = getattr(e, "status_code", 500)
+                detail = getattr(e, "detail", None)
+                if detail is None:
+                    logger.error(
+                        f"Job {job['id']} failed: {str(e)}", exc_info=True)
+                    detail = "An unexpected error occurred. Please try again later."
+                await asyncio.to_thread(self.store.fail, job["id"], status_code, detail)
+            logger.info(
+                f"Worker {index} finished job {job['id']} in "
+                f"{(time.perf_counter() - started) * 1000:.0f}ms")
+            event = self._finished.pop(job["id"], None)
+            if event is not None:
+                event.set()
+
+
+_store = None
+_pool = None
+
+
+def get_job_store() -> JobStore:
+    global _store
+
+    if _store is None:
+        _store = JobStore()
+    return _store
+
+
+def get_worker_pool() -> Optional[JobWorkerPool]:
+    return _pool
+
+
+async def wait_for_job(job_id: str, timeout: float,
+                       poll_interval: float = JOB_POLL_INTERVAL) -> Optional[dict]:
+    """
+    Long-poll a job until it finishes or ``timeout`` elapses.
+
+    Jobs finished by this process wake the waiter immediately; jobs finished
+    by another worker process are picked up on the next poll.
+    """
+    store = get_job_store()
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            job = await asyncio.to_thread(store.get, job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job["status"] in FINISHED or remaining <= 0:
+                return job
+            if _pool is None:
+                await asyncio.sleep(min(remaining, poll_interval))
+                continue
+            event = _pool._finished.setdefault(job_id, asyncio.Event())
+            try:
+                await asyncio.wait_for(
+                    event.wait(), timeout=min(remaining, poll_interval))
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        if _pool is not None:
+            _pool._finished.pop(job_id, None)
+
+
+def start_worker_pool(handler, workers: int = JOB_WORKERS) -> Optional[JobWorkerPool]:
+    global _pool
+
+    if workers <= 0:
+        return None
+    _pool = JobWorkerPool(get_job_store(), handler, workers=workers)
+    _pool.start()
+    return _pool
+
+
+async def stop_worker_pool():
+    global _pool
+
+    if _pool is not None:
+        await _pool.stop()
+        _pool = None
@@ -1,36 +1,55 @@
-from slowapi.middleware import SlowAPIMiddleware
+from slowapi.middleware import SlowAPIASGIMiddleware
 from slowapi.errors import RateLimitExceeded
-from slowapi.util import get_remote_address
-from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi import _rate_limit_exceeded_handler
 from fastapi.responses import JSONResponse
-from fastapi import FastAPI, Request, Depends
+from fastapi import FastAPI, Request, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 
-# from .security import IPBlockMiddleware
-from .routers import generate, parse
+from .metrics import (
+    METRICS_ENABLED, RATE_LIMITED, MetricsMiddleware, init_process_gauges,
+    mark_process_dead, render_metrics,
+)
+from .openai_client import GEMINI_MAX_CONNECTIONS
+from .security import IPBlockMiddleware
+from .timing import TimingMiddleware
+from .routers import generate, jobs, parse, score
+from .jobs import start_worker_pool, stop_worker_pool
+from .parsing import shutdown_parser_pool
+from .ratelimit import limiter
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
-app = FastAPI(title="AI Resume + Cover Letter Generator API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background workers draining the generation job queue
+    start_worker_pool(jobs.run_generation_job)
+    init_process_gauges(GEMINI_MAX_CONNECTIONS)
+    yield
+    await stop_worker_pool()
+    shutdown_parser_pool()
+    mark_process_dead()
 
 
-# Initialize limiter
-limiter = Limiter(key_func=get_remote_address,
-                  default_limits=["100/day", "50/hour"])
+app = FastAPI(title="AI Resume + Cover Letter Generator API", lifespan=lifespan)
 
 
-# Add SlowAPI middleware
+# Add SlowAPI middleware (shared limiter, see ratelimit.py); the pure ASGI
+# variant keeps client disconnects visible to handlers
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_middleware(SlowAPIMiddleware)
+app.add_middleware(SlowAPIASGIMiddleware)
 
 # Custom rate limit exceeded handler
 
 
 @app.exception_handler(RateLimitExceeded)
 async def custom_rate_limit_handler(request: Request, exc: RateLimitExceeded):
+    route = getattr(request.scope.get("route"), "path", None) or "unmatched"
+    RATE_LIMITED.labels(route).inc()
     return JSONResponse(
         status_code=429,
         content={
@@ -51,10 +70,26 @@ app.add_middleware(
 
 
 app.include_router(generate.router)
+app.include_router(jobs.router)
 app.include_router(parse.router)
-# app.add_middleware(IPBlockMiddleware, max_failures=10, block_duration=3600)
+app.include_router(score.router)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+app.add_middleware(TimingMiddleware)
+app.add_middleware(IPBlockMiddleware)
 
 
 @app.get("/", tags=["Health"])
 def root():
     return {"status": "ok"}
+
+
+if METRICS_ENABLED:
+    @app.get("/metrics", tags=["Health"], include_in_schema=False)
+    @limiter.exempt
+    def metrics():
+        """
+        Prometheus scrape endpoint (all workers in multiprocess mode)
+        """
+        body, content_type = render_metrics()
+        return Response(content=body, media_type=content_type)
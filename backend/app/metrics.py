@@ -0,0 +1,295 @@
+import asyncio
+from contextlib import contextmanager
+import logging
+import os
+import time
+from dotenv import load_dotenv
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess,
+)
+
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Set for multi-worker uvicorn: every process writes its samples to files in
+# this directory and /metrics aggregates them. Must be an empty directory
+# created before the workers start.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Gemini calls take seconds; the API answers cache hits in milliseconds
+LATENCY_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+
+UPSTREAM_LATENCY = Histogram(
+    "gemini_request_duration_seconds",
+    "Latency of upstream Gemini calls",
+    ["task", "model", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_TIMEOUTS = Counter(
+    "gemini_timeouts_total",
+    "Gemini calls abandoned after REQUEST_TIMEOUT (returned as 504)",
+    ["task"],
+)
+TOKENS = Counter(
+    "gemini_tokens_total",
+    "Tokens reported in Gemini usage metadata",
+    ["task", "model", "kind"],
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "End-to-end latency of API requests",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+RATE_LIMITED = Counter(
+    "rate_limited_total",
+    "Requests rejected by the rate limiter (429)",
+    ["route"],
+)
+CACHE_REQUESTS = Counter(
+    "generation_cache_requests_total",
+    "Generation cache lookups",
+    ["result"],
+)
+COALESCED = Counter(
+    "generation_coalesced_total",
+    "Generations that joined an identical in-flight upstream call",
+)
+# Compare the single-call and two-call modes: stage latency here, tokens in
+# gemini_tokens_total (task="combined" vs cover_letter + bullets)
+GENERATION_LATENCY = Histogram(
+    "generation_duration_seconds",
+    "Latency of the generation stage by mode (combined, separate, fallback)",
+    ["mode"],
+    buckets=LATENCY_BUCKETS,
+)
+COMBINED_FALLBACKS = Counter(
+    "combined_generation_fallbacks_total",
+    "Combined generations that fell back to two calls",
+    ["reason"],
+)
+INPUT_TOKENS = Counter(
+    "input_tokens_estimated_total",
+    "Estimated resume and job description tokens before and after compression",
+    ["stage"],
+)
+CONTEXT_CACHE_REQUESTS = Counter(
+    "gemini_context_cache_requests_total",
+    "Prompt prefix lookups in the Gemini context cache",
+    ["result"],
+)
+UPSTREAM_RETRIES = Counter(
+    "gemini_retries_total",
+    "Gemini calls retried after a transient error",
+    ["task"],
+)
+HEDGED_REQUESTS = Counter(
+    "gemini_hedged_requests_total",
+    "Hedged second calls fired after the p95 latency, those that won, and "
+    "those skipped for lack of an admission slot",
+    ["task", "result"],
+)
+MODEL_FALLBACKS = Counter(
+    "model_fallbacks_total",
+    "Calls moved to the next model tier of a task after a failure",
+    ["task", "model", "fallback"],
+)
+CIRCUIT_EVENTS = Counter(
+    "circuit_breaker_events_total",
+    "Circuit breaker transitions (opened, closed) and calls rejected while open",
+    ["circuit", "event"],
+)
+# Cancelled calls are also counted in gemini_request_duration_seconds
+# (outcome="cancelled")
+GENERATIONS_CANCELLED = Counter(
+    "generations_cancelled_total",
+    "Generations cancelled because the client disconnected",
+    ["endpoint"],
+)
+UPSTREAM_WASTED = Counter(
+    "gemini_wasted_seconds_total",
+    "Seconds of Gemini calls aborted without a result (timeout, cancelled)",
+    ["task", "reason"],
+)
+UPLOAD_CACHE_REQUESTS = Counter(
+    "upload_cache_requests_total",
+    "Lookups of parsed uploads by content hash, from /parse (skipped parses) "
+    "and from generation requests with resume_hash",
+    ["endpoint", "result"],
+)
+RESUME_INDEX_REQUESTS = Counter(
+    "resume_index_requests_total",
+    "Lookups of structured resume indexes by resume hash (a miss analyzes the resume)",
+    ["result"],
+)
+PARSE_LATENCY = Histogram(
+    "parse_duration_seconds",
+    "Resume upload parsing by format and outcome (ok, invalid, rejected, timeout)",
+    ["format", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+# Includes the calls admitted without waiting (0s)
+ADMISSION_QUEUE_WAIT = Histogram(
+    "admission_queue_wait_seconds",
+    "Time upstream calls waited for an admission slot",
+    buckets=(0, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30),
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total",
+    "Upstream calls shed because the admission queue was full (queue_full) "
+    "or given up while waiting (abandoned)",
+    ["reason"],
+)
+# livesum: the value of a gauge is the sum over the live worker processes
+IN_FLIGHT = Gauge(
+    "gemini_requests_in_flight",
+    "Upstream Gemini calls currently running",
+    ["task"],
+    multiprocess_mode="livesum",
+)
+CONNECTION_POOL_SIZE = Gauge(
+    "gemini_connection_pool_size",
+    "Connections available to Gemini calls (GEMINI_MAX_CONNECTIONS per process)",
+    multiprocess_mode="livesum",
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_slots_in_use",
+    "Admission slots held by running upstream calls",
+    multiprocess_mode="livesum",
+)
+ADMISSION_QUEUED = Gauge(
+    "admission_queue_depth",
+    "Upstream calls waiting for an admission slot",
+    multiprocess_mode="livesum",
+)
+THREADPOOL_BUSY = Gauge(
+    "threadpool_busy_threads",
+    "Worker threads running blocking upstream calls",
+    multiprocess_mode="livesum",
+)
+THREADPOOL_SIZE = Gauge(
+    "threadpool_size_threads",
+    "Size of the default executor used by asyncio.to_thread",
+    multiprocess_mode="livesum",
+)
+
+# Usage metadata attribute -> kind label
+_USAGE_FIELDS = {
+    "prompt_token_count": "prompt",
+    "candidates_token_count": "completion",
+    "thoughts_token_count": "thoughts",
+    "cached_content_token_count": "cached",
+}
+
+
+def init_process_gauges(max_connections: int):
+    CONNECTION_POOL_SIZE.set(max_connections)
+    # Default of ThreadPoolExecutor, which asyncio.to_thread uses
+    THREADPOOL_SIZE.set(min(32, (os.cpu_count() or 1) + 4))
+
+
+@contextmanager
+def observe_upstream(task: str, model: str):
+    """
+    Track one upstream call: in-flight gauge, latency by outcome, timeouts,
+    and the time wasted on calls aborted by a timeout or a cancellation
+    """
+    IN_FLIGHT.labels(task).inc()
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    except Exception as e:
+        if isinstance(e, asyncio.TimeoutError) or getattr(e, "status_code", None) == 504:
+            outcome = "timeout"
+            UPSTREAM_TIMEOUTS.labels(task).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        IN_FLIGHT.labels(task).dec()
+        UPSTREAM_LATENCY.labels(task, model, outcome).observe(elapsed)
+        if outcome in ("timeout", "cancelled"):
+            UPSTREAM_WASTED.labels(task, outcome).inc(elapsed)
+
+
+def record_usage(task: str, model: str, response):
+    """
+    Add the token counts of a Gemini response (or final stream chunk)
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for field, kind in _USAGE_FIELDS.items():
+        count = getattr(usage, field, None)
+        if isinstance(count, int) and count > 0:
+            TOKENS.labels(task, model, kind).inc(count)
+
+
+@contextmanager
+def threadpool_slot():
+    THREADPOOL_BUSY.inc()
+    try:
+        yield
+    finally:
+        THREADPOOL_BUSY.dec()
+
+
+def render_metrics() -> tuple:
+    """
+    Exposition body and content type; aggregates all worker processes in
+    multiprocess mode
+    """
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead():
+    """
+    Drop the live gauges of this worker on shutdown
+    """
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording end-to-end latency per route template.
+
+    Unrouted paths share one label so scans cannot blow up cardinality.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUEST_LATENCY.labels(scope.get("method"), route, str(status)).observe(
+                time.perf_counter() - started)
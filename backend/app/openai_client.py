@@ -2,19 +2,53 @@
 import os
 from dotenv import load_dotenv
 from google import genai
+import httpx
+from .cassette import GEMINI_CASSETTE, Cassette, CassetteClient
 
 
 load_dotenv()
 
 _client = None
 
+# Connection pool shared by every in-flight Gemini call. With the async client
+# concurrency is bounded by sockets here, not by the default thread pool.
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", "100"))
+GEMINI_MAX_KEEPALIVE = int(os.getenv("GEMINI_MAX_KEEPALIVE", "20"))
+GEMINI_KEEPALIVE_EXPIRY = float(os.getenv("GEMINI_KEEPALIVE_EXPIRY", "30"))
+# Point the client at a local stand-in (see benchmarks/fake_gemini.py)
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+
+
+def get_http_options() -> dict:
+    limits = httpx.Limits(
+        max_connections=GEMINI_MAX_CONNECTIONS,
+        max_keepalive_connections=GEMINI_MAX_KEEPALIVE,
+        keepalive_expiry=GEMINI_KEEPALIVE_EXPIRY,
+    )
+    http_options = {
+        "client_args": {"limits": limits},
+        "async_client_args": {"limits": limits},
+    }
+    if GEMINI_BASE_URL:
+        http_options["base_url"] = GEMINI_BASE_URL
+    return http_options
+
 
 def get_client() -> genai.Client:
+    """
+    Shared Gemini client, wrapped in a record/replay cassette when
+    GEMINI_CASSETTE is set (replay needs no API key)
+    """
     global _client
 
     if _client is None:
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise RuntimeError("OPENAI_API_KEY not set")
-        _client = genai.Client(api_key=api_key)
+        client = None
+        if GEMINI_CASSETTE != "replay":
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise RuntimeError("OPENAI_API_KEY not set")
+            client = genai.Client(api_key=api_key, http_options=get_http_options())
+        if GEMINI_CASSETTE != "off":
+            client = CassetteClient(Cassette(mode=GEMINI_CASSETTE), client)
+        _client = client
     return _client
@@ -0,0 +1,203 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
+import logging
+import math
+import multiprocessing
+import os
+import time
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from .extract import DocumentError, detect_format, extract_document, preload
+from .metrics import PARSE_LATENCY
+from .timing import span
+
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Largest accepted upload (bytes); the upload is cut off as soon as it
+# grows past this
+PARSE_MAX_BYTES = int(os.getenv("PARSE_MAX_BYTES", str(5 * 1024 * 1024)))
+# Processes extracting PDF/DOCX text (0 = worker threads of this process),
+# and parses allowed to wait for one before new uploads get a 503
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "2"))
+PARSE_MAX_PENDING = int(os.getenv("PARSE_MAX_PENDING", "16"))
+# Seconds one file may take; a stuck worker process is replaced
+PARSE_TIMEOUT = float(os.getenv("PARSE_TIMEOUT", "10"))
+# Pages of a PDF that are extracted at most
+PARSE_MAX_PAGES = int(os.getenv("PARSE_MAX_PAGES", "50"))
+
+CHUNK_SIZE = 64 * 1024
+
+
+async def read_upload(file, max_bytes: int = PARSE_MAX_BYTES) -> tuple:
+    """
+    Read an UploadFile in chunks, failing with 413 as soon as it is too
+    large; returns (bytes, SHA-256 hex digest) with the digest computed as
+    the chunks come in
+    """
+    data = bytearray()
+    digest = hashlib.sha256()
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            return bytes(data), digest.hexdigest()
+        data += chunk
+        if len(data) > max_bytes:
+            raise too_large_error(max_bytes)
+        digest.update(chunk)
+
+
+def too_large_error(max_bytes: int = PARSE_MAX_BYTES) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Files must be at most {max_bytes // 1024} KiB.",
+    )
+
+
+class ParserPool:
+    """
+    Bounded pool of processes running CPU-bound document extraction.
+
+    At most ``workers`` files are parsed at once and ``max_pending`` more
+    wait for a worker; beyond that run() fails fast with a 503. A file that
+    takes longer than ``timeout`` gets a 504, and since a running process
+    cannot be interrupted the pool is replaced, killing its workers. With
+    ``workers=0`` extraction runs in threads (no timeout enforcement beyond
+    the 504).
+    """
+
+    def __init__(self, workers: int = PARSE_WORKERS, max_pending: int = PARSE_MAX_PENDING,
+                 timeout: float = PARSE_TIMEOUT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.running = 0  # submitted and not finished, queued included
+        self.parsed = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned, not forked: forking a process with running threads
+            # can copy a held lock into the child
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=preload)
+        return self._executor
+
+    def _restart(self):
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        self.restarts += 1
+        # No public API stops a busy worker; terminate them so a parse stuck
+        # on a malicious file does not keep its CPU
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, func, *args, timeout: float = None):
+        """
+        Run ``func(*args)`` in the pool with the queue and timeout rules
+        """
+        timeout = self.timeout if timeout is None else timeout
+        if self.running >= max(1, self.workers) + self.max_pending:
+            raise HTTPException(
+                status_code=503,
+                detail="The parser is busy. Please try again shortly.",
+                headers={"Retry-After": str(max(1, math.ceil(timeout)))},
+            )
+
+        self.running += 1
+        try:
+            if self.workers <= 0:
+                return await asyncio.wait_for(asyncio.to_thread(func, *args), timeout=timeout)
+            executor = self._get_executor()
+            future = None
+            try:
+                future = executor.submit(func, *args)
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+            except asyncio.TimeoutError:
+                # A queued parse was cancelled with the wait; a running one
+                # can only be stopped by killing the workers
+                if not future.cancel():
+                    logger.error(f"Parse timed out after {timeout:.1f}s, replacing the workers")
+                    self._restart()
+                raise
+            except BrokenProcessPool:
+                # A worker crashed, or was killed after another parse timed out
+                if self._executor is executor:
+                    logger.error("Parse worker died, replacing the workers")
+                    self._restart()
+                raise HTTPException(
+                    status_code=503,
+                    detail="The parser restarted. Please try again.",
+                    headers={"Retry-After": "1"},
+                )
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise HTTPException(status_code=504, detail="Parsing the file took too long.")
+        finally:
+            self.running -= 1
+
+    async def parse(self, data: bytes, filename: str = "") -> dict:
+        """
+        Detect the format of ``data`` and extract its text
+        """
+        started = time.perf_counter()
+        fmt = "unknown"
+        outcome = "error"
+        try:
+            fmt = detect_format(filename, data[:8])
+            with span("parse"):
+                if fmt == "txt":
+                    # Decoding is cheap, not worth a round trip to a worker
+                    result = extract_document(data, fmt, PARSE_MAX_PAGES)
+                else:
+                    result = await self.run(extract_document, data, fmt, PARSE_MAX_PAGES)
+            outcome = "ok"
+            self.parsed += 1
+            return result
+        except DocumentError as e:
+            outcome = "invalid"
+            raise HTTPException(status_code=422, detail=str(e))
+        except HTTPException as e:
+            outcome = {503: "rejected", 504: "timeout"}.get(e.status_code, "error")
+            raise
+        finally:
+            PARSE_LATENCY.labels(fmt, outcome).observe(time.perf_counter() - started)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "parsed": self.parsed,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+        }
+
+
+_pool = None
+
+
+def get_parser_pool() -> ParserPool:
+    global _pool
+
+    if _pool is None:
+        _pool = ParserPool()
+    return _pool
+
+
+def shutdown_parser_pool():
+    if _pool is not None:
+        _pool.shutdown()
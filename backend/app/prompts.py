@@ -1,3 +1,7 @@
+import math
+import re
+from .compression import CHARS_PER_TOKEN
+
 """ COVER_LETTER_SYSTEM = (
     "You are a senior tech recruiter and professional copywriter. "
     "Write concise, specific cover letters that mirror the job description, "
@@ -11,24 +15,117 @@
     "include metrics if possible, and reflect the job requirements."
 ) """
 
-COVER_LETTER_USER_TEMPLATE = (
-    "You are a senior tech recruiter and professional copywriter. "
-    "Write concise, specific cover letters that mirror the job description, "
-    "highlight quantifiable impact, match tone to company (concise, confident),"
-    "and avoid buzzword stuffing. 250-350 words max."
-    "Candidate Resume (raw text):\n"
-    "{{RESUME}}\n\n"
+# Every prompt starts with the same instructions and the resume, so the
+# prefix is identical across tasks and job descriptions and can be served
+# from Gemini's context cache (see context_cache.py); only the task part
+# after it changes per call.
+RESUME_PREFIX_TEMPLATE = (
+    "You are a senior tech recruiter, professional copywriter and resume "
+    "optimization expert. You write concise, specific application material "
+    "that mirrors the job description, highlights quantifiable impact and "
+    "avoids buzzword stuffing.\n\n"
+    "Candidate Resume (raw text):\n{{RESUME}}\n\n"
+)
+
+COVER_LETTER_TASK_TEMPLATE = (
     "Job Description:\n"
     "{{JD}}\n\n"
     "Company/Tone hints: {{TONE}}\n"
+    "Task: write a cover letter for this job. Match tone to company (concise, confident).\n"
     "Constraints: 250-350 words, concise opening, 3-4 body bullets aligning to JD, brief close."
 )
 
-RESUME_BULLETS_USER_TEMPLATE = (
-    "You are a resume optimization expert. Convert experience into ATS-friendly, "
-    "quantified bullets (STAR-style). Each bullet ≤ 1 line, start with a strong verb, "
-    "include metrics if possible, and reflect the job requirements."
-    "Candidate Resume (raw text):\n{{RESUME}}\n\n"
+RESUME_BULLETS_TASK_TEMPLATE = (
     "Target Job Description:\n{{JD}}\n\n"
+    "Task: convert the candidate's experience into ATS-friendly, quantified "
+    "bullets (STAR-style). Each bullet ≤ 1 line, start with a strong verb, "
+    "include metrics if possible, and reflect the job requirements.\n"
     "Output: 6-8 optimized bullets grouped by most relevant experience."
 )
+
+# Single call returning both sections as JSON (COMBINED_GENERATION); the
+# resume and job description are sent once instead of twice
+COMBINED_TASK_TEMPLATE = (
+    "Job Description:\n{{JD}}\n\n"
+    "Company/Tone hints: {{TONE}}\n"
+    "Task: using the resume and job description above, write both a cover "
+    "letter and optimized resume bullets.\n"
+    "cover_letter: matches tone to company (concise, confident). 250-350 words, "
+    "concise opening, 3-4 body bullets aligning to JD, brief close.\n"
+    "bullets: 6-8 ATS-friendly, quantified bullets (STAR-style) grouped by most "
+    "relevant experience. Each bullet ≤ 1 line, starts with a strong verb, "
+    "includes metrics if possible and reflects the job requirements.\n"
+    "Respond with JSON only: {\"cover_letter\": string, \"bullets\": [string]}."
+)
+
+
+_PLACEHOLDER = re.compile(r"\{\{([A-Z_]+)\}\}")
+
+
+def escape(value: str) -> str:
+    """
+    Neutralize placeholder syntax in user input so it reaches the model as
+    plain text and can never be mistaken for a template field
+    """
+    # Single-character membership is a memchr; "{{" in value is a much
+    # slower general substring search
+    if "{" not in value and "}" not in value:
+        return value
+    return value.replace("{{", "{ {").replace("}}", "} }")
+
+
+class PromptTemplate:
+    """
+    ``{{FIELD}}`` template compiled once into literal segments and slots.
+
+    Rendering fills the slots and joins the segments in one pass, so values
+    are copied once and a value containing ``{{JD}}`` is never substituted
+    into (values are escaped as well).
+    """
+
+    __slots__ = ("segments", "slots", "fields", "static_length")
+
+    def __init__(self, text: str):
+        self.segments = []
+        self.slots = []  # (segment index, field name)
+        position = 0
+        for match in _PLACEHOLDER.finditer(text):
+            if match.start() > position:
+                self.segments.append(text[position:match.start()])
+            self.slots.append((len(self.segments), match.group(1)))
+            self.segments.append("")
+            position = match.end()
+        if position < len(text):
+            self.segments.append(text[position:])
+        self.fields = frozenset(name for _, name in self.slots)
+        self.static_length = sum(len(segment) for segment in self.segments)
+
+    def _values(self, values: dict) -> dict:
+        if values.keys() != self.fields:
+            missing = sorted(self.fields - values.keys())
+            unknown = sorted(values.keys() - self.fields)
+            raise ValueError(f"Template fields missing: {missing}, unknown: {unknown}")
+        return {name: escape(value) for name, value in values.items()}
+
+    def render(self, **values: str) -> str:
+        values = self._values(values)
+        parts = self.segments.copy()
+        for index, name in self.slots:
+            parts[index] = values[name]
+        return "".join(parts)
+
+    def length(self, **values: str) -> int:
+        """
+        Length of the rendered prompt, without rendering it
+        """
+        values = self._values(values)
+        return self.static_length + sum(len(values[name]) for _, name in self.slots)
+
+    def estimated_tokens(self, **values: str) -> int:
+        return math.ceil(self.length(**values) / CHARS_PER_TOKEN)
+
+
+RESUME_PREFIX_PROMPT = PromptTemplate(RESUME_PREFIX_TEMPLATE)
+COVER_LETTER_TASK_PROMPT = PromptTemplate(COVER_LETTER_TASK_TEMPLATE)
+RESUME_BULLETS_TASK_PROMPT = PromptTemplate(RESUME_BULLETS_TASK_TEMPLATE)
+COMBINED_TASK_PROMPT = PromptTemplate(COMBINED_TASK_TEMPLATE)
@@ -0,0 +1,251 @@
+from contextlib import contextmanager
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+from fastapi import Request
+from limits.storage import SlidingWindowCounterSupport, Storage
+from limits.storage.base import TimestampedSlidingWindow
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+from .deps import X_API_KEY
+from .timing import span
+
+
+load_dotenv()
+
+# Any limits storage URI: memory:// (per process), sqlite:////abs/path.sqlite3
+# (shared by every uvicorn worker on the host; the directory must be
+# writable) or redis://host:6379 (needs the redis package).
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+# Seconds a SQLite check waits for another worker's write lock. The check
+# runs on the event loop, so keep it short; when it expires the limiter
+# falls back to per-process counters until the file is usable again.
+RATE_LIMIT_SQLITE_TIMEOUT = float(os.getenv("RATE_LIMIT_SQLITE_TIMEOUT", "0.05"))
+# ip | api_key: what the limits are counted against
+RATE_LIMIT_KEY_BY = os.getenv("RATE_LIMIT_KEY_BY", "ip").lower()
+# Off only for load tests against a local upstream
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+
+DEFAULT_LIMITS = ["100/day", "50/hour"]
+# Limits of the generation routes, checked together with DEFAULT_LIMITS
+GENERATE_LIMITS = "50/minute"
+# /score makes no upstream calls, so it does not count against DEFAULT_LIMITS
+SCORE_LIMITS = "60/minute"
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """
+    limits storage backed by a SQLite file shared across processes.
+
+    Each limit uses at most two counter rows per key (previous and current
+    window), so memory per key is constant; rows expire after two windows
+    and idle keys are purged every ``purge_every`` writes. A sliding window
+    check and its increment run in one transaction, so concurrent workers
+    cannot both take the last slot.
+
+    URI: ``sqlite:///relative/path.sqlite3`` or ``sqlite:////absolute/path``.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: str = "sqlite:///ratelimit.sqlite3",
+                 wrap_exceptions: bool = False, purge_every: int = 1000,
+                 timeout: float = RATE_LIMIT_SQLITE_TIMEOUT, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = uri.split("://", 1)[1][1:] or ":memory:"
+        self.purge_every = int(purge_every)
+        self._writes = 0
+        self._lock = threading.Lock()
+        try:
+            self._conn = sqlite3.connect(
+                self.path, timeout=float(timeout), check_same_thread=False,
+                isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                " key TEXT PRIMARY KEY,"
+                " count INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL)")
+        except sqlite3.Error as e:
+            raise RuntimeError(
+                f"Cannot open the rate limit database {self.path!r} ({e}); set "
+                f"RATE_LIMIT_STORAGE_URI to a writable path or memory://") from e
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def incr(self, key: str, expiry: float, amount: int = 1) -> int:
+        with self._transaction() as now:
+            return self._incr(key, expiry, amount, now)
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            return self._get(key, time.time())
+
+    def get_expiry(self, key: str) -> float:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at FROM rate_limits WHERE key = ?",
+                (key,)).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self) -> bool:
+        with self._lock:
+            self._conn.execute("SELECT 1").fetchone()
+        return True
+
+    def reset(self) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int,
+                                     amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        with self._transaction() as now:
+            previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+            previous_count, previous_ttl, current_count, _ = self._window(
+                previous_key, current_key, expiry, now)
+            weighted = previous_count * previous_ttl / expiry + current_count
+            if math.floor(weighted) + amount > limit:
+                return False
+            self._incr(current_key, 2 * expiry, amount, now)
+            return True
+
+    def get_sliding_window(self, key: str, expiry: int) -> tuple:
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        with self._lock:
+            return self._window(previous_key, current_key, expiry, now)
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        previous_key, current_key = self.sliding_window_keys(
+            key, expiry, time.time())
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM rate_limits WHERE key IN (?, ?)",
+                (previous_key, current_key))
+
+    def purge(self) -> int:
+        """
+        Evict counters of idle keys
+        """
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM rate_limits WHERE expires_at <= ?",
+                (time.time(),)).rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield time.time()
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            self.purge()
+
+    def _get(self, key: str, now: float) -> int:
+        row = self._conn.execute(
+            "SELECT count FROM rate_limits WHERE key = ? AND expires_at > ?",
+            (key, now)).fetchone()
+        return row[0] if row else 0
+
+    def _incr(self, key: str, expiry: float, amount: int, now: float) -> int:
+        # An expired counter starts over with a fresh expiry
+        self._conn.execute(
+            "INSERT INTO rate_limits (key, count, expires_at) VALUES (?, ?, ?)"
+            " ON CONFLICT(key) DO UPDATE SET"
+            "  count = CASE WHEN expires_at <= ? THEN excluded.count"
+            "               ELSE count + excluded.count END,"
+            "  expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at"
+            "                    ELSE expires_at END",
+            (key, amount, now + expiry, now, now))
+        return self._get(key, now)
+
+    def _window(self, previous_key: str, current_key: str, expiry: int,
+                now: float) -> tuple:
+        previous_count = self._get(previous_key, now)
+        current_count = self._get(current_key, now)
+        if previous_count == 0:
+            previous_ttl = 0.0
+        else:
+            previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+
+def api_key_identity(api_key: str) -> str:
+    """
+    Stable, non-reversible identity for an API key (safe to log and store)
+    """
+    return "api_key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def rate_limit_key_func(request: Request) -> str:
+    """
+    Key the limits by API key when configured and a valid one is sent, else by IP.
+
+    The limiter runs before the API-key dependency, so unknown keys fall back
+    to the IP instead of opening a fresh bucket per made-up key.
+    """
+    if RATE_LIMIT_KEY_BY == "api_key":
+        api_key = request.headers.get("x-api-key")
+        if api_key and api_key == X_API_KEY:
+            return api_key_identity(api_key)
+    return get_remote_address(request)
+
+
+class TimedLimiter(Limiter):
+    """
+    Limiter whose checks show up as the ``ratelimit`` timing span
+    """
+
+    def _check_request_limit(self, request, endpoint_func, in_middleware=True):
+        with span("ratelimit"):
+            return super()._check_request_limit(
+                request, endpoint_func, in_middleware)
+
+    def reset(self) -> None:
+        """
+        Clear the counters, including the in-memory fallback ones, and go
+        back to the configured storage
+        """
+        super().reset()
+        if self._fallback_storage is not None:
+            self._fallback_storage.reset()
+        self._storage_dead = False
+
+
+# One limiter for the whole app: default and route limits share a single
+# storage and are counted with O(1) sliding window counters. A storage error
+# (e.g. a SQLite file locked by another worker) switches to in-memory
+# counters instead of failing the request.
+limiter = TimedLimiter(
+    key_func=rate_limit_key_func,
+    default_limits=DEFAULT_LIMITS,
+    storage_uri=RATE_LIMIT_STORAGE_URI,
+    strategy="sliding-window-counter",
+    enabled=RATE_LIMIT_ENABLED,
+    in_memory_fallback_enabled=True,
+    swallow_errors=True,
+)
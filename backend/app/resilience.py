@@ -0,0 +1,306 @@
+import asyncio
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+import math
+import os
+import random
+import time
+from typing import Optional
+from dotenv import load_dotenv
+from google.genai import errors as genai_errors
+import httpx
+from .admission import current_key, get_admission_controller
+from .metrics import CIRCUIT_EVENTS, HEDGED_REQUESTS, UPSTREAM_RETRIES
+
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Retries of transient upstream errors (5xx, 429, connection failures) with
+# "full jitter" exponential backoff: sleep uniform(0, min(max, base * 2^n))
+UPSTREAM_RETRIES_MAX = int(os.getenv("UPSTREAM_RETRIES", "2"))
+UPSTREAM_RETRY_BASE_DELAY = float(os.getenv("UPSTREAM_RETRY_BASE_DELAY", "0.5"))
+UPSTREAM_RETRY_MAX_DELAY = float(os.getenv("UPSTREAM_RETRY_MAX_DELAY", "4"))
+# Send a second identical call when the first is slower than the observed
+# p95 latency of that task, and keep whichever answers first
+HEDGE_REQUESTS = os.getenv("HEDGE_REQUESTS", "false").lower() in ("1", "true", "yes")
+HEDGE_QUANTILE = float(os.getenv("HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "1.0"))
+# Consecutive failures that open the circuit, and seconds before a probe
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+# Latencies kept per task, and how many are needed before hedging starts
+LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+RETRYABLE_CODES = frozenset((429, 500, 502, 503, 504))
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Upstream calls are failing fast while the circuit is open
+    """
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit {name} is open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def is_transient(exc: BaseException) -> bool:
+    """
+    Upstream failure worth retrying; it also counts against the circuit.
+
+    Timeouts are not retried, since they come from the request deadline
+    that a retry could not meet either, but call_with_resilience still
+    counts them as circuit failures.
+    """
+    if isinstance(exc, genai_errors.APIError):
+        return exc.code in RETRYABLE_CODES
+    return isinstance(exc, httpx.TransportError)
+
+
+def backoff(attempt: int, base: float = None, cap: float = None) -> float:
+    base = UPSTREAM_RETRY_BASE_DELAY if base is None else base
+    cap = UPSTREAM_RETRY_MAX_DELAY if cap is None else cap
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+_deadline: ContextVar[Optional[float]] = ContextVar("upstream_deadline", default=None)
+
+
+@contextmanager
+def request_deadline(seconds: float):
+    """
+    Give the upstream calls made inside the block one shared time budget.
+
+    Nested blocks can only shorten an enclosing deadline. Tasks created
+    inside the block (asyncio.gather, create_task) inherit it.
+    """
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget() -> float:
+    """
+    Seconds left before the current deadline (infinite without one)
+    """
+    deadline = _deadline.get()
+    return math.inf if deadline is None else deadline - time.monotonic()
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed: calls pass, ``threshold`` transient failures in a row open it.
+    open: calls fail with CircuitOpenError for ``reset_timeout`` seconds.
+    half_open: a single probe call passes; its success closes the circuit,
+    its failure opens it again.
+    """
+
+    def __init__(self, name: str, threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def before_call(self):
+        state = self.state
+        if state == "closed":
+            return
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return
+        CIRCUIT_EVENTS.labels(self.name, "rejected").inc()
+        retry_after = self.reset_timeout if self._probing else (
+            self.opened_at + self.reset_timeout - time.monotonic())
+        raise CircuitOpenError(self.name, max(1.0, retry_after))
+
+    def success(self):
+        if self.opened_at is not None:
+            logger.info(f"Circuit {self.name} closed")
+            CIRCUIT_EVENTS.labels(self.name, "closed").inc()
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def failure(self):
+        self.failures += 1
+        if self._probing or (self.opened_at is None and self.failures >= self.threshold):
+            logger.warning(
+                f"Circuit {self.name} opened after {self.failures} failures, "
+                f"failing fast for {self.reset_timeout:.0f}s")
+            CIRCUIT_EVENTS.labels(self.name, "opened").inc()
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self):
+        """
+        The call ended without saying anything about upstream health
+        (client error, cancellation)
+        """
+        self._probing = False
+
+    def stats(self) -> dict:
+        return {"state": self.state, "failures": self.failures}
+
+
+class LatencyTracker:
+    """
+    Rolling window of successful call latencies per key
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples = {}
+
+    def observe(self, key: str, seconds: float):
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def quantile(self, key: str, q: float) -> Optional[float]:
+        samples = self._samples.get(key)
+        if not samples or len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def reset(self):
+        self._samples.clear()
+
+
+_breakers = {}
+_latencies = LatencyTracker()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name)
+    return breaker
+
+
+def get_latency_tracker() -> LatencyTracker:
+    return _latencies
+
+
+def reset():
+    _breakers.clear()
+    _latencies.reset()
+
+
+def resilience_stats() -> dict:
+    return {"circuits": {name: breaker.stats() for name, breaker in _breakers.items()}}
+
+
+async def hedged(factory, delay: float, task: str = "upstream"):
+    """
+    Await ``factory()``; if it has not finished after ``delay`` seconds,
+    start a second call and return the first successful result.
+
+    The second call takes an admission slot of its own, and is skipped when
+    none is free at once: a hedge must not push the per-key or global
+    concurrency over its limit, nor delay queued calls.
+    """
+    first = asyncio.ensure_future(factory())
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done:
+        return first.result()
+
+    admission = get_admission_controller()
+    key = current_key()
+    if not admission.try_acquire(key):
+        HEDGED_REQUESTS.labels(task, "skipped").inc()
+        return await first
+
+    HEDGED_REQUESTS.labels(task, "fired").inc()
+    admitted_at = time.perf_counter()
+    second = asyncio.ensure_future(factory())
+    pending = {first, second}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for call in done:
+                if call.exception() is None:
+                    if call is second:
+                        HEDGED_REQUESTS.labels(task, "won").inc()
+                    return call.result()
+                if not pending:
+                    raise call.exception()
+    finally:
+        for call in (first, second):
+            call.cancel()
+        admission.release(key, time.perf_counter() - admitted_at)
+
+
+async def call_with_resilience(factory, circuit: str, task: str = "upstream"):
+    """
+    Run ``factory()`` (one upstream call) behind the circuit breaker, with
+    retries of transient errors and, with HEDGE_REQUESTS, a hedged second
+    call. The call is cut off at the request deadline (see request_deadline)
+    and the timeout counts as a failure; retries stop early when the backoff
+    would overrun the deadline.
+    """
+    breaker = get_breaker(circuit)
+    attempt = 0
+    while True:
+        breaker.before_call()
+        started = time.perf_counter()
+        try:
+            delay = _latencies.quantile(task, HEDGE_QUANTILE) if HEDGE_REQUESTS else None
+            if delay is not None:
+                call = hedged(factory, max(HEDGE_MIN_DELAY, delay), task)
+            else:
+                call = factory()
+            budget = remaining_budget()
+            result = await (call if budget == math.inf else asyncio.wait_for(call, budget))
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except asyncio.TimeoutError:
+            # Recorded before the probe is given up, so a half-open circuit
+            # whose probe timed out opens again
+            breaker.failure()
+            raise
+        except Exception as e:
+            if not is_transient(e):
+                breaker.release()
+                raise
+            breaker.failure()
+            wait = backoff(attempt)
+            if attempt >= UPSTREAM_RETRIES_MAX or wait >= remaining_budget():
+                raise
+            attempt += 1
+            UPSTREAM_RETRIES.labels(task).inc()
+            logger.warning(
+                f"Transient upstream error for {task} ({str(e)[:100]}), "
+                f"retry {attempt}/{UPSTREAM_RETRIES_MAX} in {wait * 1000:.0f}ms")
+            await asyncio.sleep(wait)
+            continue
+        breaker.success()
+        _latencies.observe(task, time.perf_counter() - started)
+        return result
@@ -0,0 +1,304 @@
+import hashlib
+import json
+import math
+import os
+import re
+from dotenv import load_dotenv
+from .cache import MemoryCache
+from .compression import (
+    JD_TOKEN_BUDGET, RESUME_TOKEN_BUDGET, CompressedInputs, bm25_scores, compress,
+    estimate_tokens, fit_jd, is_heading, normalize, terms)
+from .metrics import RESUME_INDEX_REQUESTS
+from .timing import span
+
+
+load_dotenv()
+
+# Build prompts for resumes over RESUME_TOKEN_BUDGET from a structured
+# index of the resume (sections, roles, bullets, skills, dates) instead of
+# its raw text; the index is cached in memory by the hash of the resume
+RESUME_INDEX = os.getenv("RESUME_INDEX", "true").lower() in ("1", "true", "yes")
+# Bullets kept per role when the resume is over its token budget, the most
+# relevant to the job description first (0 keeps all that fit the budget)
+RESUME_INDEX_BULLETS_PER_ROLE = int(os.getenv("RESUME_INDEX_BULLETS_PER_ROLE", "4"))
+# Own LRU, so indexes of generation traffic never evict parsed uploads
+RESUME_INDEX_CACHE_MAX_ENTRIES = int(os.getenv("RESUME_INDEX_CACHE_MAX_ENTRIES", "256"))
+RESUME_INDEX_CACHE_MAX_BYTES = int(os.getenv("RESUME_INDEX_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+RESUME_INDEX_CACHE_TTL = float(os.getenv("RESUME_INDEX_CACHE_TTL", "3600"))  # seconds
+
+# Bump when analyze() changes, so indexes of the old analyzer are rebuilt
+INDEX_VERSION = 2
+# Leading lines of the resume always kept (name, title, contact)
+HEADER_LINES = 3
+# Skills rendered for over-budget resumes; longer entries are sentences
+MAX_SKILLS = 40
+MAX_SKILL_CHARS = 40
+
+SECTION_KINDS = (
+    ("experience", ("experience", "employment", "work history", "career")),
+    ("projects", ("project",)),
+    ("skills", ("skill", "competenc", "technolog", "tools", "stack")),
+    ("education", ("education", "academic", "degree")),
+    ("summary", ("summary", "profile", "objective", "about")),
+)
+# Sections whose entries are roles with bullets
+ROLE_KINDS = frozenset(("experience", "projects"))
+
+_MARKER = re.compile(r"^\s*(?:[-*•·▪◦‣]|\d{1,2}[.)])\s+")
+_DATE = re.compile(
+    r"\b(?:(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+|(\d{1,2})/)?"
+    r"((?:19|20)\d{2})\b|\b(present|current|now|today)\b", re.IGNORECASE)
+_MONTHS = "jan feb mar apr may jun jul aug sep oct nov dec".split()
+_SKILL_SEPARATORS = re.compile(r"\s*[,;|•·]\s*")
+
+
+def section_kind(title: str) -> str:
+    title = title.lower()
+    for kind, words in SECTION_KINDS:
+        if any(word in title for word in words):
+            return kind
+    return "other"
+
+
+def parse_dates(line: str) -> list:
+    """
+    Up to two normalized dates of a line: "2019-03", "2019" or "present"
+    """
+    dates = []
+    for match in _DATE.finditer(line):
+        month_name, month_number, year, ongoing = match.groups()
+        if ongoing:
+            dates.append("present")
+        elif month_name:
+            dates.append(f"{year}-{_MONTHS.index(month_name.lower()) + 1:02d}")
+        elif month_number and 1 <= int(month_number) <= 12:
+            dates.append(f"{year}-{int(month_number):02d}")
+        else:
+            dates.append(year)
+        if len(dates) == 2:
+            break
+    return dates
+
+
+def split_skills(line: str) -> list:
+    """
+    Skills of a line like "Languages: Python, Go; SQL"
+    """
+    label, colon, rest = line.partition(":")
+    if colon and len(label) <= 30:
+        line = rest
+    skills = (skill.strip(" .") for skill in _SKILL_SEPARATORS.split(_MARKER.sub("", line)))
+    return [skill for skill in skills if skill]
+
+
+def analyze(text: str) -> dict:
+    """
+    Split a resume into its header and sections.
+
+    Experience and project sections hold roles (``title``, ``start``,
+    ``end``, ``bullets``), the skills section a deduplicated ``skills``
+    list and the other sections their ``lines``. A role starts at a line
+    with dates, or at a plain line after bullets; lines without a bullet
+    marker that follow a role's bullets are bullets as well, since PDF
+    extraction often drops the markers.
+    """
+    index = {"v": INDEX_VERSION, "header": [], "sections": []}
+    section = None
+    for line in normalize(text).split("\n"):
+        if not line:
+            continue
+        if is_heading(line) and not _DATE.search(line):
+            kind = section_kind(line)
+            section = {"title": line.rstrip(":").strip(), "kind": kind}
+            if kind in ROLE_KINDS:
+                section["roles"] = []
+            elif kind == "skills":
+                section["skills"] = []
+            else:
+                section["lines"] = []
+            index["sections"].append(section)
+        elif section is None:
+            index["header"].append(line)
+        elif section["kind"] == "skills":
+            seen = {skill.lower() for skill in section["skills"]}
+            for skill in split_skills(line):
+                if skill.lower() not in seen:
+                    seen.add(skill.lower())
+                    section["skills"].append(skill)
+        elif section["kind"] in ROLE_KINDS:
+            add_role_line(section["roles"], line)
+        else:
+            section["lines"].append(_MARKER.sub("", line))
+    return index
+
+
+def add_role_line(roles: list, line: str):
+    role = roles[-1] if roles else None
+    bullet = _MARKER.match(line)
+    dates = [] if bullet else parse_dates(line)
+    if bullet and role is not None:
+        role["bullets"].append(line[bullet.end():])
+    elif role is not None and not role["bullets"] and not role["start"] \
+            and " | " not in role["title"]:
+        # Second header line, e.g. the company and dates under the job title
+        role["title"] += " | " + line
+        role["start"] = role["start"] or (dates[0] if dates else None)
+        role["end"] = role["end"] or (dates[1] if len(dates) > 1 else None)
+    elif role is not None and not dates:
+        role["bullets"].append(line)
+    else:
+        roles.append({
+            "title": line[bullet.end():] if bullet else line,
+            "start": dates[0] if dates else None,
+            "end": dates[1] if len(dates) > 1 else None,
+            "bullets": [],
+        })
+
+
+def index_skills(index: dict) -> list:
+    return [skill for section in index["sections"] for skill in section.get("skills", ())
+            if len(skill) <= MAX_SKILL_CHARS]
+
+
+def index_key(text: str) -> str:
+    return f"index:v{INDEX_VERSION}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+
+_index_cache = None
+
+
+def get_index_cache() -> MemoryCache:
+    global _index_cache
+
+    if _index_cache is None:
+        _index_cache = MemoryCache(
+            max_entries=RESUME_INDEX_CACHE_MAX_ENTRIES,
+            max_bytes=RESUME_INDEX_CACHE_MAX_BYTES, ttl=RESUME_INDEX_CACHE_TTL)
+    return _index_cache
+
+
+def get_resume_index(text: str) -> dict:
+    """
+    Index of a resume, analyzed once per resume text and then served from
+    the index cache
+    """
+    cache = get_index_cache()
+    key = index_key(text)
+    value = cache.get(key)
+    RESUME_INDEX_REQUESTS.labels("miss" if value is None else "hit").inc()
+    if value is not None:
+        return json.loads(value)
+    with span("resume_index"):
+        index = analyze(text)
+    cache.set(key, json.dumps(index, separators=(",", ":"), ensure_ascii=False))
+    return index
+
+
+def select(index: dict, jd: str, budget: int = RESUME_TOKEN_BUDGET, rank: bool = True,
+           bullets_per_role: int = None) -> str:
+    """
+    Render the part of an index that fits ``budget`` tokens.
+
+    The leading header lines, every role title (the career timeline), the
+    skills and the education are kept first; the remaining budget goes to
+    bullets and other lines by BM25 relevance to ``jd``. Skills named in the
+    job description are listed first. When the whole index does not fit,
+    roles keep at most ``bullets_per_role`` bullets and the skills at most
+    MAX_SKILLS entries of MAX_SKILL_CHARS. With ``rank=False`` nothing
+    depends on the job description: bullets and lines are kept in their
+    original order.
+    """
+    if bullets_per_role is None:
+        bullets_per_role = RESUME_INDEX_BULLETS_PER_ROLE
+    # [text, priority, parent item or None], in render order; items with
+    # no priority are only taken as the parent of another
+    items = []
+    rankable = []  # item indexes scored against the job description
+    bullets = []  # item indexes of the bullets of each role
+    skill_items = []  # (item index, skills) of each skills section
+    for position, line in enumerate(index["header"]):
+        if position >= HEADER_LINES:
+            rankable.append(len(items))
+        items.append([line, math.inf if position < HEADER_LINES else 0.0, None])
+
+    query = terms(jd) if rank else []
+    wanted = set(query)
+    for section in index["sections"]:
+        title = len(items)
+        items.append([section["title"].upper(), None, None])
+        if section["kind"] == "skills":
+            skills = section["skills"]
+            if rank:
+                skills = sorted(skills, key=lambda skill: not wanted.intersection(terms(skill)))
+            if skills:
+                skill_items.append((len(items), skills))
+                items.append([", ".join(skills), math.inf, title])
+        elif "roles" in section:
+            for role in section["roles"]:
+                header = len(items)
+                items.append([role["title"], math.inf, title])
+                bullets.append(range(len(items), len(items) + len(role["bullets"])))
+                rankable.extend(bullets[-1])
+                items.extend(["- " + bullet, 0.0, header] for bullet in role["bullets"])
+        else:
+            priority = math.inf if section["kind"] == "education" else 0.0
+            for line in section["lines"]:
+                if priority != math.inf:
+                    rankable.append(len(items))
+                items.append([line, priority, title])
+
+    if query and rankable:
+        scores = bm25_scores([terms(items[position][0]) for position in rankable], query)
+        for position, score in zip(rankable, scores):
+            items[position][1] = score
+    # An index that fits is rendered whole; pack_items needs no more than this
+    if sum(estimate_tokens(item[0]) + 1 for item in items) > budget:
+        for position, skills in skill_items:
+            skills = [skill for skill in skills if len(skill) <= MAX_SKILL_CHARS]
+            items[position][0] = ", ".join(skills[:MAX_SKILLS])
+        # The best bullets of each role, the first ones on ties
+        for positions in bullets if bullets_per_role else ():
+            ranked = sorted(positions, key=lambda position: (-items[position][1], position))
+            for position in ranked[bullets_per_role:]:
+                items[position][1] = None
+    return pack_items(items, budget)
+
+
+def pack_items(items: list, budget: int) -> str:
+    """
+    Take items by priority, each with its parents, while they fit ``budget``
+    tokens, and join them in their original order
+    """
+    selected = set()
+    used = 0
+    ranked = sorted(
+        (position for position, item in enumerate(items) if item[1] is not None),
+        key=lambda position: (-items[position][1], position))
+    for position in ranked:
+        chain = []
+        while position is not None and position not in selected:
+            chain.append(position)
+            position = items[position][2]
+        needed = sum(estimate_tokens(items[link][0]) + 1 for link in chain)
+        if used + needed <= budget:
+            used += needed
+            selected.update(chain)
+    return "\n".join(items[position][0] for position in sorted(selected))
+
+
+def compress_indexed(resume: str, jd: str, resume_budget: int = RESUME_TOKEN_BUDGET,
+                     jd_budget: int = JD_TOKEN_BUDGET, rank: bool = True) -> CompressedInputs:
+    """
+    Like compression.compress, with a resume over ``resume_budget`` rendered
+    from its index. A resume that fits once normalized, or that has no
+    recognizable sections, goes through compression.compress instead.
+    """
+    if estimate_tokens(normalize(resume)) <= resume_budget:
+        return compress(resume, jd, resume_budget, jd_budget, rank=rank)
+    index = get_resume_index(resume)
+    if not index["sections"]:
+        return compress(resume, jd, resume_budget, jd_budget, rank=rank)
+    result = CompressedInputs(resume, jd, estimate_tokens(resume), estimate_tokens(jd))
+    result.jd = fit_jd(jd, jd_budget)
+    result.resume = select(index, result.jd, resume_budget, rank=rank)
+    return result
@@ -1,17 +1,46 @@
 from contextlib import asynccontextmanager
 import asyncio
+from dataclasses import dataclass, field, replace
 from functools import lru_cache
+import json
 import logging
-from typing import Optional
+import math
+import os
+import time
+from typing import Callable, Optional
+from pydantic import ValidationError
 from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
-from slowapi import Limiter
-from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi import APIRouter, HTTPException, Request, Response, Depends
+from fastapi.responses import StreamingResponse
+from google.genai import errors as genai_errors
 from app.deps import verify_api_key
-from ..schemas import GenerateRequest, GenerateResponse
+from ..schemas import (
+    BatchGenerateRequest, BatchGenerateResult, CombinedGeneration,
+    GenerateRequest, GenerateResponse)
 from ..prompts import (
-    COVER_LETTER_USER_TEMPLATE, RESUME_BULLETS_USER_TEMPLATE,)
+    COMBINED_TASK_PROMPT, COVER_LETTER_TASK_PROMPT, RESUME_BULLETS_TASK_PROMPT,
+    RESUME_PREFIX_PROMPT)
 from ..openai_client import get_client
+from ..cache import cache_key, get_generation_cache
+from ..cancellation import cancel_on_disconnect, cancel_pending
+from ..compression import INPUT_COMPRESSION, CompressedInputs, compress
+from ..context_cache import CONTEXT_CACHE, get_context_cache
+from ..resume_index import RESUME_INDEX, compress_indexed
+from ..singleflight import SINGLE_FLIGHT, get_single_flight
+from ..ratelimit import GENERATE_LIMITS, api_key_identity, limiter, rate_limit_key_func
+from ..metrics import (
+    CACHE_REQUESTS, COMBINED_FALLBACKS, GENERATION_LATENCY, INPUT_TOKENS, MODEL_FALLBACKS,
+    observe_upstream, record_usage, threadpool_slot,
+)
+from ..admission import (
+    AdmissionRejected, admission_key, current_key, get_admission_controller)
+from ..resilience import (
+    CircuitOpenError, call_with_resilience, get_breaker, is_transient,
+    remaining_budget, request_deadline, resilience_stats)
+from ..routing import DEFAULT_MODEL, ModelTier, get_model_router
+from ..timing import mark, record, span
+from ..uploads import get_upload_cache
 import re
 
 router = APIRouter(prefix="/generate", tags=["Generate"])
@@ -29,17 +58,32 @@ def sanitize(text: str) -> str:
     return text.strip()
 
 
-# Initialize limiter
-limiter = Limiter(key_func=get_remote_address)
-
 # Configure logging
 logger = logging.getLogger(__name__)
 
 # Constants
 SAFE_MIN = 200
-MAX_RESUME_LENGTH = 1000
-MAX_JD_LENGTH = 500
-REQUEST_TIMEOUT = 30  # seconds
+# Hard caps on raw input (characters); what reaches the prompt is bounded
+# by the token budgets of compression.py
+MAX_RESUME_LENGTH = int(os.getenv("MAX_RESUME_LENGTH", "50000"))
+MAX_JD_LENGTH = int(os.getenv("MAX_JD_LENGTH", "20000"))
+# Budget shared by all upstream calls of one generation (seconds)
+REQUEST_TIMEOUT = 30
+
+# Run the cover letter and bullets calls at the same time (set to "false" to
+# fall back to one-after-the-other generation)
+PARALLEL_GENERATION = os.getenv(
+    "PARALLEL_GENERATION", "true").lower() in ("1", "true", "yes")
+# Batch generation: jobs generated at once and jobs accepted per request
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_JOBS = int(os.getenv("BATCH_MAX_JOBS", "50"))
+# One JSON-mode call for both sections instead of two calls; falls back to
+# the two-call path when the output cannot be parsed
+COMBINED_GENERATION = os.getenv(
+    "COMBINED_GENERATION", "false").lower() in ("1", "true", "yes")
+# Return whichever section succeeded instead of failing the whole request
+ALLOW_PARTIAL_RESULTS = os.getenv(
+    "ALLOW_PARTIAL_RESULTS", "false").lower() in ("1", "true", "yes")
 
 
 # Cached client - reuse across requests
@@ -48,6 +92,21 @@ def get_cached_client():
     return get_client()
 
 
+def client_or_error():
+    """
+    Gemini client for handlers that do not catch errors themselves; a
+    failure to build it (missing key, cassette error) becomes a JSON 500
+    """
+    try:
+        return get_cached_client()
+    except Exception as e:
+        logger.error(f"Could not create the Gemini client: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="An unexpected error occurred. Please try again later."
+        )
+
+
 # Dependency for rate limiting per API key
 async def get_rate_limit_key(
     request: Request,
@@ -57,38 +116,565 @@ async def get_rate_limit_key(
     Rate limit by API key if available, otherwise by IP
     """
     if api_key:
-        return f"api_key:{api_key}"
+        return api_key_identity(api_key)
     return get_remote_address(request)
 
 
+def timeout_error() -> HTTPException:
+    return HTTPException(
+        status_code=504,
+        detail="Request timeout. Please try again with shorter content."
+    )
+
+
+def circuit_open_error(e: CircuitOpenError) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="The generation service is temporarily unavailable. Please try again later.",
+        headers={"Retry-After": str(math.ceil(e.retry_after))},
+    )
+
+
+def overloaded_error(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="The generation service is at capacity. Please try again shortly.",
+        headers={"Retry-After": str(math.ceil(e.retry_after))},
+    )
+
+
 # Async timeout wrapper
-async def generate_with_timeout(func, *args, timeout=REQUEST_TIMEOUT, **kwargs):
+async def generate_with_timeout(func, *args, timeout=REQUEST_TIMEOUT,
+                                span_name="upstream", task="upstream",
+                                circuit="gemini", **kwargs):
     """
-    Execute generation with timeout protection
+    Execute generation with timeout protection and the resilience layer.
+
+    The timeout is capped by the request deadline (see request_deadline), so
+    successive calls of one request share a single budget. The call waits
+    for an admission slot (503 when the queue is full, see admission.py),
+    then runs with retries, hedging and the ``circuit`` breaker (see
+    resilience.py).
+
+    Coroutine functions are awaited on the event loop, so a timeout or
+    cancellation aborts the upstream request; plain callables run in a
+    worker thread that stays busy until upstream answers. Each attempt is
+    timed as ``span_name``, and the wait for a worker thread as
+    ``<span_name>_queue``.
     """
+    timeout = min(timeout, remaining_budget())
+    if timeout <= 0:
+        logger.error(f"No time left for {task}, request deadline exceeded")
+        raise timeout_error()
+
+    def attempt():
+        submitted = time.perf_counter()
+        if asyncio.iscoroutinefunction(func):
+            async def run():
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return run()
+
+        def run():
+            record(f"{span_name}_queue", time.perf_counter() - submitted)
+            with threadpool_slot(), span(span_name):
+                return func(*args, **kwargs)
+        return asyncio.to_thread(run)
+
+    admission = get_admission_controller()
+    key = current_key()
+    started = time.perf_counter()
     try:
-        return await asyncio.wait_for(
-            asyncio.to_thread(func, *args, **kwargs),
-            timeout=timeout
-        )
+        # Waiting for a slot uses up the call's budget as well
+        await asyncio.wait_for(admission.acquire(key), timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.error(f"Request timeout after {timeout:.1f}s waiting for admission")
+        raise timeout_error()
+    except AdmissionRejected as e:
+        raise overloaded_error(e) from e
+
+    admitted_at = time.perf_counter()
+    try:
+        # call_with_resilience enforces the deadline itself, so a timed out
+        # call counts against the circuit while it still holds the probe
+        with request_deadline(timeout - (admitted_at - started)):
+            return await call_with_resilience(attempt, circuit, task)
     except asyncio.TimeoutError:
-        logger.error(f"Request timeout after {timeout}s")
+        logger.error(f"Request timeout after {timeout:.1f}s")
+        raise timeout_error()
+    except CircuitOpenError as e:
+        logger.warning(str(e))
+        raise circuit_open_error(e) from e
+    finally:
+        admission.release(key, time.perf_counter() - admitted_at)
+
+
+@dataclass
+class GenerationTask:
+    """
+    One independent LLM call of the generation stage
+    """
+    name: str
+    label: str
+    contents: str
+    config: dict
+    model: str = DEFAULT_MODEL
+    # Raises ValueError for unusable output, which is then neither
+    # returned as a success nor cached
+    validate: Optional[Callable[[str], object]] = None
+    # Leading part of ``contents`` shared with other tasks (instructions and
+    # resume); referenced from Gemini's context cache when CONTEXT_CACHE is on
+    cache_prefix: str = ""
+    # Tiers tried in order when ``model`` fails (see routing.py)
+    fallbacks: list = field(default_factory=list)
+
+
+# Errors meaning a referenced cached content is unusable (expired, deleted,
+# not visible to this key); the call is repeated with the full prompt
+CACHE_MISS_CODES = (400, 403, 404)
+
+
+async def _chain(first, rest):
+    if first is not None:
+        yield first
+    async for chunk in rest:
+        yield chunk
+
+
+async def call_upstream(client, task: GenerationTask, stream: bool = False):
+    """
+    Send ``task`` to Gemini, referencing its cached prompt prefix if possible.
+
+    Returns the response, or the chunk iterator when ``stream`` is set. Any
+    context cache trouble falls back to sending the full prompt.
+    """
+    models = client.aio.models
+    method = models.generate_content_stream if stream else models.generate_content
+    if CONTEXT_CACHE and task.cache_prefix:
+        context_cache = get_context_cache()
+        name = await context_cache.lookup(client, task.model, task.cache_prefix)
+        if name is not None:
+            try:
+                response = await method(
+                    model=task.model,
+                    contents=task.contents[len(task.cache_prefix):],
+                    config={**task.config, "cachedContent": name},
+                )
+                if stream:
+                    # Streams report a rejected cache with their first chunk
+                    response = _chain(await anext(response, None), response)
+                return response
+            except genai_errors.ClientError as e:
+                if e.code not in CACHE_MISS_CODES:
+                    raise
+                logger.warning(
+                    f"Cached content {name} rejected ({e.code}), sending full prompt")
+                context_cache.invalidate(task.model, task.cache_prefix)
+    return await method(model=task.model, contents=task.contents, config=task.config)
+
+
+@dataclass
+class GenerationResult:
+    name: str
+    text: str = ""
+    error: Optional[Exception] = None
+    elapsed: float = 0.0
+    cached: bool = False
+    model: str = ""  # model that generated ``text``
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def should_fall_back(e: Exception) -> bool:
+    """
+    Failure of one model that another model may not have: transient errors
+    left after retries, an open circuit, or a model that is not available.
+    Timeouts are not, the request budget is spent, and neither is load
+    shedding, which applies to every model.
+    """
+    if isinstance(e, HTTPException):
+        return isinstance(e.__cause__, CircuitOpenError)
+    if isinstance(e, genai_errors.ClientError) and e.code == 404:
+        return True
+    return is_transient(e)
+
+
+async def call_with_fallback(client, task: GenerationTask) -> tuple:
+    """
+    Call ``task.model``, then its fallback tiers while the failure is one
+    another model may not have; returns (task that succeeded, response)
+    """
+    router = get_model_router()
+    attempts = [task] + [replace(task, model=tier.model, config=tier.config, fallbacks=[])
+                         for tier in task.fallbacks]
+    for index, attempt in enumerate(attempts):
+        started = time.perf_counter()
+        try:
+            with observe_upstream(task.name, attempt.model):
+                response = await generate_with_timeout(
+                    call_upstream, client, attempt, span_name=f"llm_{task.name}",
+                    task=task.name, circuit=attempt.model)
+        except Exception as e:
+            router.observe(task.name, attempt.model, time.perf_counter() - started, ok=False)
+            if index == len(attempts) - 1 or not should_fall_back(e):
+                raise
+            fallback = attempts[index + 1].model
+            MODEL_FALLBACKS.labels(task.name, attempt.model, fallback).inc()
+            logger.warning(
+                f"{attempt.model} failed for {task.name} ({str(e)[:100]}), "
+                f"falling back to {fallback}")
+            continue
+        router.observe(task.name, attempt.model, time.perf_counter() - started, ok=True)
+        record_usage(task.name, attempt.model, response)
+        return attempt, response
+
+
+async def run_generation_task(client, task: GenerationTask,
+                              use_cache: bool = True) -> GenerationResult:
+    """
+    Run a single generation task, capturing failures instead of raising.
+
+    Successful outputs are stored in the generation cache under the model
+    that produced them; ``use_cache=False`` skips the lookup (the fresh
+    result is still stored).
+    """
+    started = time.perf_counter()
+    result = GenerationResult(name=task.name)
+    cache = get_generation_cache()
+    key = cache_key(task.model, task.contents, task.config)
+    if use_cache:
+        with span("cache"):
+            cached = cache.get(key)
+        CACHE_REQUESTS.labels("miss" if cached is None else "hit").inc()
+        if cached is not None:
+            result.text, result.cached, result.model = cached, True, task.model
+            result.elapsed = time.perf_counter() - started
+            logger.info(f"Task {task.name} served from cache")
+            return result
+    try:
+        async def call():
+            return await call_with_fallback(client, task)
+
+        if SINGLE_FLIGHT:
+            served, response = await get_single_flight().do(key, call)
+        else:
+            served, response = await call()
+        result.model = served.model
+        if served is not task:
+            key = cache_key(served.model, served.contents, served.config)
+        result.text = response.text.strip() if response and response.text else ""
+        if not result.text:
+            logger.error(f"Empty {task.label} generated")
+            result.error = HTTPException(
+                status_code=500,
+                detail=f"Failed to generate {task.label}. Please try again."
+            )
+        elif task.validate is None or _is_valid(task, result):
+            with span("cache"):
+                cache.set(key, result.text)
+    except Exception as e:
+        result.error = e
+    result.elapsed = time.perf_counter() - started
+    logger.info(
+        f"Task {task.name} finished in {result.elapsed * 1000:.0f}ms "
+        f"(ok={result.ok})")
+    return result
+
+
+def _is_valid(task: GenerationTask, result: GenerationResult) -> bool:
+    try:
+        task.validate(result.text)
+        return True
+    except ValueError as e:
+        logger.warning(f"Invalid {task.label} output: {str(e)[:200]}")
+        result.error = e
+        return False
+
+
+async def fan_out(client, tasks: list, parallel: bool = None,
+                  use_cache: bool = True) -> dict:
+    """
+    Run generation tasks concurrently and collect every result.
+
+    A task that times out or comes back empty does not cancel the others;
+    callers decide what to do with partial results. In sequential mode the
+    stage stops at the first failure, like the original implementation.
+    """
+    if parallel is None:
+        parallel = PARALLEL_GENERATION
+
+    started = time.perf_counter()
+    if parallel:
+        results = await asyncio.gather(
+            *(run_generation_task(client, task, use_cache) for task in tasks))
+    else:
+        results = []
+        for task in tasks:
+            result = await run_generation_task(client, task, use_cache)
+            results.append(result)
+            if not result.ok and not ALLOW_PARTIAL_RESULTS:
+                break
+
+    logger.info(
+        f"Generation stage finished in {(time.perf_counter() - started) * 1000:.0f}ms "
+        f"(parallel={parallel}, tasks={len(tasks)})")
+    return {result.name: result for result in results}
+
+
+def resolve_resume(req) -> str:
+    """
+    Resume text of a request: ``resume_text``, or else the upload its
+    ``resume_hash`` fingerprint refers to
+    """
+    if req.resume_text or not req.resume_hash:
+        return req.resume_text
+    text = get_upload_cache().resume_text(req.resume_hash)
+    if text is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Unknown or expired resume_hash. Please upload the resume again."
+        )
+    return text
+
+
+def prepare_inputs(req: GenerateRequest) -> tuple:
+    """
+    Sanitize and validate a generation request, returning (resume, jd, tone)
+    """
+    with span("sanitize"):
+        resume = sanitize(resolve_resume(req))
+        jd = sanitize(req.job_description)
+        tone = sanitize(req.tone_hint or "balanced professional")
+
+        # Additional validation after sanitization
+        check_min_length(resume, jd)
+        check_max_length(resume=resume, jd=jd)
+    return resume, jd, tone
+
+
+def check_min_length(*texts: str):
+    if any(len(text) < SAFE_MIN for text in texts):
         raise HTTPException(
-            status_code=504,
-            detail="Request timeout. Please try again with shorter content."
+            status_code=422,
+            detail=f"Resume and job description must be at least {SAFE_MIN} characters after sanitization."
         )
 
 
+def check_max_length(resume: str = None, jd: str = None):
+    if resume is not None and len(resume) > MAX_RESUME_LENGTH:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Resume must be at most {MAX_RESUME_LENGTH} characters."
+        )
+    if jd is not None and len(jd) > MAX_JD_LENGTH:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Job description must be at most {MAX_JD_LENGTH} characters."
+        )
+
+
+def compress_inputs(resume: str, jd: str) -> CompressedInputs:
+    """
+    Fit resume and job description into their token budgets (see
+    compression.py) and count the estimated tokens saved; with RESUME_INDEX
+    an over-budget resume is rendered from its cached index (see
+    resume_index.py)
+    """
+    if not INPUT_COMPRESSION:
+        return CompressedInputs(resume, jd, 0, 0)
+    with span("compress"):
+        # A resume ranked per job description would change the prompt prefix
+        # for every job, defeating the context cache
+        if RESUME_INDEX:
+            compressed = compress_indexed(resume, jd, rank=not CONTEXT_CACHE)
+        else:
+            compressed = compress(resume, jd, rank=not CONTEXT_CACHE)
+    INPUT_TOKENS.labels("original").inc(compressed.tokens_before)
+    INPUT_TOKENS.labels("compressed").inc(compressed.tokens_after)
+    if compressed.tokens_saved:
+        logger.info(
+            f"Compressed inputs from {compressed.tokens_before} to "
+            f"{compressed.tokens_after} estimated tokens")
+    return compressed
+
+
+def routed_task(name: str, label: str, contents: str, extra_config: dict = None,
+                **kwargs) -> GenerationTask:
+    """
+    GenerationTask on the model tiers the router picks for ``name``, with
+    ``extra_config`` added to the generation config of every tier
+    """
+    tiers = [ModelTier(tier.model, {**tier.config, **(extra_config or {})})
+             for tier in get_model_router().order(name)]
+    return GenerationTask(
+        name=name, label=label, contents=contents, model=tiers[0].model,
+        config=tiers[0].config, fallbacks=tiers[1:], **kwargs)
+
+
+def build_tasks(resume: str, jd: str, tone: str) -> list:
+    """
+    Render the prompts for the cover letter and bullets tasks
+    """
+    prefix = RESUME_PREFIX_PROMPT.render(RESUME=resume)
+    cl_user = prefix + COVER_LETTER_TASK_PROMPT.render(JD=jd, TONE=tone)
+    rb_user = prefix + RESUME_BULLETS_TASK_PROMPT.render(JD=jd)
+
+    return [
+        routed_task("cover_letter", "cover letter", cl_user, cache_prefix=prefix),
+        routed_task("bullets", "resume bullets", rb_user, cache_prefix=prefix),
+    ]
+
+
+class CombinedOutputError(ValueError):
+    """
+    Combined generation output is not the expected JSON
+    """
+
+
+COMBINED_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "cover_letter": {"type": "STRING"},
+        "bullets": {"type": "ARRAY", "items": {"type": "STRING"}},
+    },
+    "required": ["cover_letter", "bullets"],
+    "propertyOrdering": ["cover_letter", "bullets"],
+}
+
+BULLET_MARKERS = "-*•·"
+
+
+def build_combined_task(resume: str, jd: str, tone: str) -> GenerationTask:
+    """
+    Render the single JSON-mode prompt producing both sections
+    """
+    prefix = RESUME_PREFIX_PROMPT.render(RESUME=resume)
+    contents = prefix + COMBINED_TASK_PROMPT.render(JD=jd, TONE=tone)
+    return routed_task(
+        "combined", "cover letter and resume bullets", contents,
+        extra_config={
+            "responseMimeType": "application/json",
+            "responseSchema": COMBINED_SCHEMA,
+        },
+        validate=parse_combined,
+        cache_prefix=prefix,
+    )
+
+
+def parse_combined(text: str) -> GenerateResponse:
+    """
+    Validate combined JSON output into a GenerateResponse
+    """
+    try:
+        output = CombinedGeneration.model_validate_json(text)
+    except ValidationError as e:
+        raise CombinedOutputError(f"Unparseable combined output: {e.errors()[:1]}")
+    cover_letter = output.cover_letter.strip()
+    bullets = [bullet.strip().lstrip(BULLET_MARKERS).strip() for bullet in output.bullets]
+    bullets = [bullet for bullet in bullets if bullet]
+    if not cover_letter or not bullets:
+        raise CombinedOutputError("Combined output is missing a section")
+    return GenerateResponse(
+        cover_letter=cover_letter,
+        bullets="\n".join(f"• {bullet}" for bullet in bullets),
+    )
+
+
+async def generate_response(client, resume: str, jd: str, tone: str,
+                            use_cache: bool = True) -> tuple:
+    """
+    Run the generation stage; returns (GenerateResponse, results by task name).
+
+    With COMBINED_GENERATION one JSON-mode call produces both sections. If its
+    output is empty or cannot be parsed, the two-call path runs instead;
+    other failures (timeouts, upstream errors) are raised as they are. All
+    upstream calls share one REQUEST_TIMEOUT budget.
+    """
+    with request_deadline(REQUEST_TIMEOUT):
+        return await _generate_response(client, resume, jd, tone, use_cache)
+
+
+async def _generate_response(client, resume: str, jd: str, tone: str,
+                             use_cache: bool) -> tuple:
+    started = time.perf_counter()
+    mode = "separate"
+    if COMBINED_GENERATION:
+        with span("render"):
+            task = build_combined_task(resume, jd, tone)
+        result = await run_generation_task(client, task, use_cache=use_cache)
+        if result.ok:
+            with span("response"):
+                generated = parse_combined(result.text)
+                generated.models = {"cover_letter": result.model, "bullets": result.model}
+            GENERATION_LATENCY.labels("combined").observe(time.perf_counter() - started)
+            return generated, {task.name: result}
+        if isinstance(result.error, CombinedOutputError):
+            reason = "invalid"
+        elif getattr(result.error, "status_code", None) == 500:
+            reason = "empty"
+        else:
+            raise result.error
+        COMBINED_FALLBACKS.labels(reason).inc()
+        logger.warning(f"Combined generation {reason}, falling back to two calls")
+        mode = "fallback"
+
+    with span("render"):
+        tasks = build_tasks(resume, jd, tone)
+    results = await fan_out(client, tasks, use_cache=use_cache)
+    with span("response"):
+        generated = build_response(tasks, results)
+    GENERATION_LATENCY.labels(mode).observe(time.perf_counter() - started)
+    return generated, results
+
+
+def wants_no_cache(request: Request) -> bool:
+    return "no-cache" in request.headers.get("cache-control", "").lower()
+
+
+def clean_bullets(text: str) -> str:
+    return text.replace("\n\n", "\n").strip()
+
+
+def build_response(tasks: list, results: dict) -> GenerateResponse:
+    """
+    Assemble a GenerateResponse from fan-out results.
+
+    Raises the first failure (in task order) unless partial results are
+    allowed and at least one section succeeded.
+    """
+    failed = [task.name for task in tasks
+              if task.name not in results or not results[task.name].ok]
+    if failed and not (ALLOW_PARTIAL_RESULTS and len(failed) < len(tasks)):
+        for task in tasks:
+            result = results.get(task.name)
+            if result is not None and not result.ok:
+                raise result.error
+
+    cover_letter = results["cover_letter"].text if "cover_letter" in results else ""
+    bullets_text = results["bullets"].text if "bullets" in results else ""
+
+    return GenerateResponse(
+        cover_letter=cover_letter,
+        # Clean up bullets formatting
+        bullets=clean_bullets(bullets_text),
+        failed_sections=failed,
+        models={name: result.model for name, result in results.items() if result.ok},
+    )
+
+
 # Main route with multiple protection layers
 @router.post(
     "/all",
     response_model=GenerateResponse,
     dependencies=[Depends(verify_api_key)]
 )
-@limiter.limit("50/minute")  # 5 requests per minute per IP
-@limiter.limit("100/hour")   # 10 requests per hour per IP
+# 50 requests per minute on top of the app-wide 50/hour and 100/day
+@limiter.limit(GENERATE_LIMITS, override_defaults=False)
 async def generate_all(
     request: Request,
+    response: Response,
     req: GenerateRequest,
     rate_limit_key: str = Depends(get_rate_limit_key)
 ):
@@ -96,97 +682,41 @@ async def generate_all(
     Generate cover letter and resume bullets with rate limiting and timeout protection.
 
     Rate limits:
-    - 5 requests per minute
-    - 10 requests per hour
+    - 50 requests per minute
+    - 50 requests per hour, 100 per day (app-wide defaults)
     - Per IP address or API key
+
+    Identical requests are served from the generation cache; send
+    ``Cache-Control: no-cache`` to force fresh generations. The generation
+    is cancelled if the client disconnects before it finishes.
     """
+    mark("pre_handler")
     try:
-        # Sanitize inputs
-        resume = sanitize(req.resume_text)
-        jd = sanitize(req.job_description)
-        tone = sanitize(req.tone_hint or "balanced professional")
-
-        # Additional validation after sanitization
-        if len(resume) < SAFE_MIN or len(jd) < SAFE_MIN:
-            raise HTTPException(
-                status_code=422,
-                detail=f"Resume and job description must be at least {SAFE_MIN} characters after sanitization."
-            )
+        resume, jd, tone = prepare_inputs(req)
 
         # Get cached client
         client = get_cached_client()
 
-        # Generate cover letter with timeout
-        logger.info(
-            f"Generating cover letter for rate_limit_key: {rate_limit_key[:50]}...")
-
-        cl_user = (
-            COVER_LETTER_USER_TEMPLATE
-            .replace("{{RESUME}}", resume)
-            .replace("{{JD}}", jd)
-            .replace("{{TONE}}", tone)
-        )
-
-        cl = await generate_with_timeout(
-            client.models.generate_content,
-            model="gemini-2.5-flash",
-            contents=cl_user,
-            config={
-                "temperature": 0.5,
-                "topP": 0.95,
-                "maxOutputTokens": 2048,  # Limit output size
-            }
-        )
-
-        cover_letter = cl.text.strip() if cl and cl.text else ""
-
-        if not cover_letter:
-            logger.error("Empty cover letter generated")
-            raise HTTPException(
-                status_code=500,
-                detail="Failed to generate cover letter. Please try again."
-            )
-
-        # Generate resume bullets with timeout
         logger.info(
-            f"Generating resume bullets for rate_limit_key: {rate_limit_key[:50]}...")
-
-        rb_user = (
-            RESUME_BULLETS_USER_TEMPLATE
-            .replace("{{RESUME}}", resume)
-            .replace("{{JD}}", jd)
-        )
-
-        rb = await generate_with_timeout(
-            client.models.generate_content,
-            model="gemini-2.5-flash",
-            contents=rb_user,
-            config={
-                "temperature": 0.5,
-                "topP": 0.95,
-                "maxOutputTokens": 1024,
-            }
-        )
-
-        bullets_text = rb.text.strip() if rb and rb.text else ""
+            f"Generating cover letter and resume bullets for rate_limit_key: {rate_limit_key[:50]}...")
 
-        if not bullets_text:
-            logger.error("Empty bullets generated")
-            raise HTTPException(
-                status_code=500,
-                detail="Failed to generate resume bullets. Please try again."
-            )
+        use_cache = not wants_no_cache(request)
+        if not use_cache:
+            get_generation_cache().bypasses += 1
+            CACHE_REQUESTS.labels("bypass").inc()
 
-        # Clean up bullets formatting
-        bullets = bullets_text.replace("\n\n", "\n").strip()
+        compressed = compress_inputs(resume, jd)
+        response.headers["X-Input-Tokens-Saved"] = str(compressed.tokens_saved)
+        with admission_key(rate_limit_key_func(request)):
+            generated, results = await cancel_on_disconnect(request, generate_response(
+                client, compressed.resume, compressed.jd, tone, use_cache=use_cache), "all")
+        response.headers["X-Cache"] = ", ".join(
+            f"{name}={'hit' if r.cached else 'miss'}" for name, r in results.items())
 
         logger.info(
             f"Successfully generated content for rate_limit_key: {rate_limit_key[:10]}...")
 
-        return GenerateResponse(
-            cover_letter=cover_letter,
-            bullets=bullets
-        )
+        return generated
 
     except RateLimitExceeded as e:
         logger.warning(f"Rate limit exceeded for {rate_limit_key[:10]}...")
@@ -207,3 +737,308 @@ async def generate_all(
             status_code=500,
             detail="An unexpected error occurred. Please try again later."
         )
+
+
+@router.get(
+    "/cache/stats",
+    dependencies=[Depends(verify_api_key)]
+)
+async def generation_cache_stats():
+    """
+    Hit/miss counters of the generation cache, request coalescing and
+    the Gemini context cache, circuit breaker states, model routing
+    health, admission queue and parsed upload cache, in this worker
+    """
+    return {
+        **get_generation_cache().stats(),
+        "single_flight": get_single_flight().stats(),
+        "context_cache": get_context_cache().stats(),
+        **resilience_stats(),
+        "routing": get_model_router().stats(),
+        "admission": get_admission_controller().stats(),
+        "uploads": get_upload_cache().stats(),
+    }
+
+
+def sse_event(event: str, data: dict) -> str:
+    """
+    Format a single server-sent event
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_section(client, task: GenerationTask, queue: asyncio.Queue,
+                         timeout: float = REQUEST_TIMEOUT, key: str = None):
+    """
+    Stream one task from Gemini into a queue of (event, data) tuples.
+
+    Always finishes with a section_complete or error event followed by None.
+    Streams hold an admission slot of client ``key`` and go through the
+    circuit breaker on the first model tier the router picks, but are not
+    retried, hedged or moved to a fallback model: deltas may already have
+    reached the client.
+    """
+    started = time.perf_counter()
+    parts = []
+    breaker = get_breaker(task.model)
+
+    async def consume():
+        stream = await call_upstream(client, task, stream=True)
+        last = None
+        async for chunk in stream:
+            last = chunk
+            text = chunk.text if chunk else None
+            if text:
+                parts.append(text)
+                await queue.put(("delta", {"section": task.name, "text": text}))
+        # Usage metadata is complete on the final chunk
+        record_usage(task.name, task.model, last)
+
+    admission = get_admission_controller()
+    key = key or current_key()
+    admitted_at = None
+    try:
+        # Waiting for a slot uses up the section's budget as well
+        await asyncio.wait_for(admission.acquire(key), timeout=timeout)
+        admitted_at = time.perf_counter()
+        timeout -= admitted_at - started
+        breaker.before_call()
+        try:
+            with observe_upstream(task.name, task.model):
+                await asyncio.wait_for(consume(), timeout=timeout)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            get_model_router().observe(
+                task.name, task.model, time.perf_counter() - admitted_at, ok=False)
+            raise
+        except Exception as e:
+            get_model_router().observe(
+                task.name, task.model, time.perf_counter() - admitted_at, ok=False)
+            if is_transient(e):
+                breaker.failure()
+            else:
+                breaker.release()
+            raise
+        breaker.success()
+        get_model_router().observe(
+            task.name, task.model, time.perf_counter() - admitted_at, ok=True)
+        text = "".join(parts).strip()
+        if task.name == "bullets":
+            text = clean_bullets(text)
+        if not text:
+            logger.error(f"Empty {task.label} generated")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to generate {task.label}. Please try again."
+            )
+        await queue.put(("section_complete", {
+            "section": task.name,
+            "text": text,
+            "model": task.model,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000),
+        }))
+    except asyncio.CancelledError:
+        if admitted_at is not None:
+            breaker.release()
+        raise
+    except (AdmissionRejected, CircuitOpenError) as e:
+        error = overloaded_error(e) if isinstance(e, AdmissionRejected) else circuit_open_error(e)
+        await queue.put(("error", {
+            "section": task.name, "status": error.status_code, "detail": error.detail}))
+    except asyncio.TimeoutError:
+        logger.error(f"Stream timeout after {timeout:.1f}s for {task.name}")
+        if admitted_at is not None:
+            breaker.failure()
+        await queue.put(("error", {
+            "section": task.name,
+            "status": 504,
+            "detail": "Request timeout. Please try again with shorter content.",
+        }))
+    except HTTPException as e:
+        await queue.put(("error", {
+            "section": task.name, "status": e.status_code, "detail": e.detail}))
+    except Exception as e:
+        logger.error(
+            f"Unexpected error streaming {task.name}: {str(e)}", exc_info=True)
+        await queue.put(("error", {
+            "section": task.name,
+            "status": 500,
+            "detail": "An unexpected error occurred. Please try again later.",
+        }))
+    finally:
+        if admitted_at is not None:
+            admission.release(key, time.perf_counter() - admitted_at)
+        await queue.put(None)
+
+
+async def stream_events(client, tasks: list, parallel: bool = None, key: str = None):
+    """
+    Yield SSE events for every task, one section after the other; upstream
+    calls are admitted as client ``key``.
+
+    In parallel mode all sections start upstream immediately; later sections
+    are buffered and flushed once the earlier ones have completed.
+    """
+    if parallel is None:
+        parallel = PARALLEL_GENERATION
+
+    queues = [asyncio.Queue() for _ in tasks]
+    producers = []
+    # Sections share one budget, like the calls of generate_response
+    deadline = time.monotonic() + REQUEST_TIMEOUT
+
+    def start(index: int):
+        producers.append(asyncio.create_task(stream_section(
+            client, tasks[index], queues[index],
+            timeout=deadline - time.monotonic(), key=key)))
+
+    failed = []
+    try:
+        yield sse_event("start", {"sections": [task.name for task in tasks]})
+        if parallel:
+            for index in range(len(tasks)):
+                start(index)
+        for index, task in enumerate(tasks):
+            if not parallel:
+                start(index)
+            while True:
+                item = await queues[index].get()
+                if item is None:
+                    break
+                event, data = item
+                if event == "error":
+                    failed.append(task.name)
+                yield sse_event(event, data)
+        yield sse_event("done", {"failed_sections": failed})
+    finally:
+        # Client went away or the stream finished: stop upstream work
+        cancel_pending(producers, "stream")
+
+
+@router.post(
+    "/stream",
+    dependencies=[Depends(verify_api_key)]
+)
+@limiter.limit(GENERATE_LIMITS, override_defaults=False)
+async def generate_stream(
+    request: Request,
+    req: GenerateRequest,
+    rate_limit_key: str = Depends(get_rate_limit_key)
+):
+    """
+    Stream cover letter and resume bullets as server-sent events.
+
+    Events: start, delta, section_complete, error, done. Input validation
+    errors are returned as regular HTTP errors before the stream starts.
+    """
+    resume, jd, tone = prepare_inputs(req)
+    compressed = compress_inputs(resume, jd)
+    client = client_or_error()
+
+    logger.info(
+        f"Streaming cover letter and resume bullets for rate_limit_key: {rate_limit_key[:50]}...")
+
+    return StreamingResponse(
+        stream_events(client, build_tasks(compressed.resume, compressed.jd, tone),
+                      key=rate_limit_key_func(request)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no",
+                 "X-Input-Tokens-Saved": str(compressed.tokens_saved)},
+    )
+
+
+async def generate_for_job(client, index: int, resume: str, jd: str, tone: str,
+                           use_cache: bool = True) -> BatchGenerateResult:
+    """
+    Generate one batch item, turning failures into a per-item status
+    """
+    try:
+        jd = sanitize(jd)
+        check_min_length(jd)
+        check_max_length(jd=jd)
+        # The resume is ranked against each job description separately
+        # (unless CONTEXT_CACHE keeps it identical for the whole batch)
+        compressed = compress_inputs(resume, jd)
+        generated, _ = await generate_response(
+            client, compressed.resume, compressed.jd, tone, use_cache=use_cache)
+        return BatchGenerateResult(index=index, status=200, result=generated)
+    except HTTPException as e:
+        return BatchGenerateResult(index=index, status=e.status_code, detail=e.detail)
+    except Exception as e:
+        logger.error(
+            f"Unexpected error in batch item {index}: {str(e)}", exc_info=True)
+        return BatchGenerateResult(
+            index=index,
+            status=500,
+            detail="An unexpected error occurred. Please try again later."
+        )
+
+
+async def batch_results(client, resume: str, tone: str, job_descriptions: list,
+                        use_cache: bool = True, concurrency: int = None,
+                        key: str = None):
+    """
+    Yield one NDJSON line per job description, in completion order; upstream
+    calls are admitted as client ``key``
+    """
+    semaphore = asyncio.Semaphore(concurrency or BATCH_CONCURRENCY)
+    started = time.perf_counter()
+
+    async def bounded(index: int, jd: str) -> BatchGenerateResult:
+        async with semaphore:
+            with admission_key(key):
+                return await generate_for_job(client, index, resume, jd, tone, use_cache)
+
+    pending = [asyncio.create_task(bounded(index, jd))
+               for index, jd in enumerate(job_descriptions)]
+    try:
+        for next_done in asyncio.as_completed(pending):
+            item = await next_done
+            yield item.model_dump_json(exclude_none=True) + "\n"
+    finally:
+        # Client went away: stop the remaining generations
+        cancel_pending(pending, "batch")
+        logger.info(
+            f"Batch of {len(job_descriptions)} finished in "
+            f"{(time.perf_counter() - started) * 1000:.0f}ms")
+
+
+@router.post(
+    "/batch",
+    dependencies=[Depends(verify_api_key)]
+)
+@limiter.limit("10/minute;20/hour", override_defaults=False)
+async def generate_batch(
+    request: Request,
+    req: BatchGenerateRequest,
+    rate_limit_key: str = Depends(get_rate_limit_key)
+):
+    """
+    Generate cover letters and bullets for one resume against many job descriptions.
+
+    Results are streamed as NDJSON in completion order, one
+    ``{"index", "status", "result" | "detail"}`` object per job description.
+    """
+    resume = sanitize(resolve_resume(req))
+    tone = sanitize(req.tone_hint or "balanced professional")
+    check_min_length(resume)
+    check_max_length(resume=resume)
+
+    if not req.job_descriptions or len(req.job_descriptions) > BATCH_MAX_JOBS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Provide between 1 and {BATCH_MAX_JOBS} job descriptions."
+        )
+
+    client = client_or_error()
+    use_cache = not wants_no_cache(request)
+
+    logger.info(
+        f"Generating batch of {len(req.job_descriptions)} for rate_limit_key: {rate_limit_key[:50]}...")
+
+    return StreamingResponse(
+        batch_results(client, resume, tone, req.job_descriptions, use_cache,
+                      key=rate_limit_key_func(request)),
+        media_type="application/x-ndjson",
+    )
@@ -0,0 +1,85 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+import asyncio
+import logging
+from app.deps import verify_api_key
+from ..admission import admission_key
+from ..jobs import get_job_store, get_worker_pool, wait_for_job
+from ..ratelimit import GENERATE_LIMITS, limiter
+from ..schemas import GenerateRequest, JobStatus, JobSubmitted
+from . import generate
+
+
+router = APIRouter(prefix="/generate/jobs", tags=["Jobs"])
+
+logger = logging.getLogger(__name__)
+
+MAX_WAIT = 30  # seconds a long-poll may hold the connection
+JOBS_ADMISSION_KEY = "jobs"
+
+
+async def run_generation_job(payload: dict) -> dict:
+    """
+    Worker handler: the same pipeline as /generate/all, without the HTTP request
+    """
+    req = GenerateRequest(**payload)
+    resume, jd, tone = generate.prepare_inputs(req)
+    compressed = generate.compress_inputs(resume, jd)
+    client = generate.get_cached_client()
+    # Background work shares one admission key (weight it with ADMISSION_WEIGHTS)
+    with admission_key(JOBS_ADMISSION_KEY):
+        generated, _ = await generate.generate_response(
+            client, compressed.resume, compressed.jd, tone)
+    return generated.model_dump()
+
+
+@router.post(
+    "",
+    status_code=202,
+    response_model=JobSubmitted,
+    dependencies=[Depends(verify_api_key)]
+)
+@limiter.limit(GENERATE_LIMITS, override_defaults=False)
+async def submit_job(
+    request: Request,
+    req: GenerateRequest,
+    rate_limit_key: str = Depends(generate.get_rate_limit_key)
+):
+    """
+    Queue a generation and return its id immediately.
+
+    Inputs are validated up front so bad requests fail fast with 422.
+    """
+    resume, _, _ = generate.prepare_inputs(req)
+
+    store = get_job_store()
+    # The upload behind resume_hash may expire before a worker gets to it
+    job_id = await asyncio.to_thread(
+        store.enqueue, {**req.model_dump(), "resume_text": resume, "resume_hash": None})
+    pool = get_worker_pool()
+    if pool is not None:
+        pool.notify()
+
+    logger.info(f"Queued job {job_id} for rate_limit_key: {rate_limit_key[:50]}...")
+    return JobSubmitted(
+        id=job_id, status="queued", status_url=f"{router.prefix}/{job_id}")
+
+
+@router.get(
+    "/{job_id}",
+    response_model=JobStatus,
+    dependencies=[Depends(verify_api_key)]
+)
+async def get_job(job_id: str, wait: float = 0):
+    """
+    Job status and, once succeeded, its GenerateResponse.
+
+    ``wait`` long-polls for up to that many seconds (capped at MAX_WAIT)
+    until the job finishes.
+    """
+    if wait > 0:
+        job = await wait_for_job(job_id, min(wait, MAX_WAIT))
+    else:
+        job = await asyncio.to_thread(get_job_store().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return JobStatus(**{key: job[key] for key in JobStatus.model_fields})
@@ -1,13 +1,87 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
+from starlette.datastructures import UploadFile
+import logging
+from ..parsing import PARSE_MAX_BYTES, get_parser_pool, read_upload, too_large_error
+from ..schemas import ParsedResume
+from ..singleflight import get_single_flight
+from ..uploads import get_upload_cache
 
 
 router = APIRouter(prefix="/parse", tags=["Parse"])
 
+logger = logging.getLogger(__name__)
 
-@router.post("/resume-text")
-async def resume_text(file: UploadFile = File(...)):
-    # Minimal stub: expect .txt now; you can add PDF/DOCX parsing later
-    if not file.filename.lower().endswith(".txt"):
-     raise HTTPException(400, detail="For now, upload .txt resumes.")
-    content = (await file.read()).decode("utf-8", errors="ignore")
-    return {"text": content}
\ No newline at end of file
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt")
+# Room for the multipart boundary and part headers around the file
+FORM_OVERHEAD = 16 * 1024
+
+UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"],
+        }}},
+    },
+}
+
+
+def bounded_receive(receive, max_bytes: int):
+    """
+    ASGI receive that fails with 413 once the request body passes ``max_bytes``
+    """
+    received = 0
+
+    async def wrapper():
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                raise too_large_error(PARSE_MAX_BYTES)
+        return message
+
+    return wrapper
+
+
+@router.post("/resume-text", response_model=ParsedResume, openapi_extra=UPLOAD_BODY)
+async def resume_text(request: Request, response: Response):
+    """
+    Extract the text of an uploaded PDF, DOCX or TXT resume (``file`` field).
+
+    The body is read as it arrives and rejected with 413 as soon as it passes
+    PARSE_MAX_BYTES. PDF and DOCX files are parsed in a pool of worker
+    processes (see parsing.py). Files seen before are answered from the
+    upload cache by their SHA-256 ``fingerprint`` (``X-Cache: hit``), which
+    generation requests also accept as ``resume_hash``.
+    """
+    max_body = PARSE_MAX_BYTES + FORM_OVERHEAD
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > max_body:
+        raise too_large_error(PARSE_MAX_BYTES)
+
+    bounded = Request(request.scope, receive=bounded_receive(request.receive, max_body))
+    async with bounded.form(max_files=1, max_fields=1) as form:
+        file = form.get("file")
+        if not isinstance(file, UploadFile):
+            raise HTTPException(422, detail="Upload the resume in the 'file' field.")
+        if not (file.filename or "").lower().endswith(SUPPORTED_EXTENSIONS):
+            raise HTTPException(400, detail="Upload a PDF, DOCX or TXT resume.")
+        data, fingerprint = await read_upload(file, PARSE_MAX_BYTES)
+
+    cache = get_upload_cache()
+    result = cache.get(fingerprint)
+    response.headers["X-Cache"] = "miss" if result is None else "hit"
+    if result is None:
+        # Identical uploads arriving together share one parse
+        result = await get_single_flight().do(
+            f"parse:{fingerprint}", lambda: get_parser_pool().parse(data, file.filename))
+        if not result["text"]:
+            raise HTTPException(
+                422, detail="No text found in the file. Scanned documents are not supported.")
+        cache.set(fingerprint, result)
+        logger.info(
+            f"Parsed {result['format']} resume {fingerprint[:12]}: "
+            f"{result['pages'] or 0} pages, {result['characters']} characters")
+    return {**result, "fingerprint": fingerprint}
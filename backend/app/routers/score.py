@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+import asyncio
+import logging
+from app.deps import verify_api_key
+from ..compression import normalize
+from ..metrics import threadpool_slot
+from ..ratelimit import SCORE_LIMITS, limiter
+from ..resume_index import get_resume_index, index_skills
+from ..schemas import BatchGenerateRequest, ScoreResponse
+from ..scoring import SCORE_MAX_JOBS, score_jobs
+from ..timing import span
+from . import generate
+
+
+router = APIRouter(tags=["Score"])
+
+logger = logging.getLogger(__name__)
+
+
+def score_in_thread(resume: str, job_descriptions: list, skills: list) -> list:
+    with threadpool_slot():
+        return score_jobs(resume, [normalize(jd) for jd in job_descriptions], skills)
+
+
+@router.post(
+    "/score",
+    response_model=ScoreResponse,
+    response_model_exclude_none=True,
+    dependencies=[Depends(verify_api_key)]
+)
+@limiter.limit(SCORE_LIMITS)
+async def score(
+    request: Request,
+    req: BatchGenerateRequest,
+    rate_limit_key: str = Depends(generate.get_rate_limit_key)
+):
+    """
+    Rank job descriptions by how well they match one resume, locally.
+
+    Takes the /generate/batch input (``tone_hint`` is ignored) and returns
+    keyword, skills, TF-IDF and BM25 relevance per job description, best
+    match first (see scoring.py). No model is called, so it is cheap enough
+    to pick the jobs worth a batch generation.
+    """
+    resume = generate.sanitize(generate.resolve_resume(req))
+    generate.check_min_length(resume)
+    generate.check_max_length(resume=resume)
+
+    if not req.job_descriptions or len(req.job_descriptions) > SCORE_MAX_JOBS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Provide between 1 and {SCORE_MAX_JOBS} job descriptions."
+        )
+    # Job descriptions are not checked for secrets: nothing here leaves the
+    # process, and one job mentioning "password" should not fail the rest
+    job_descriptions = [jd.strip() for jd in req.job_descriptions]
+    for jd in job_descriptions:
+        generate.check_max_length(jd=jd)
+
+    skills = index_skills(get_resume_index(resume))
+    with span("score"):
+        # Hundreds of job descriptions tokenize for tens of milliseconds
+        results = await asyncio.to_thread(score_in_thread, resume, job_descriptions, skills)
+    results.sort(key=lambda result: (-result["score"], result["index"]))
+
+    logger.info(
+        f"Scored {len(job_descriptions)} job descriptions for rate_limit_key: {rate_limit_key[:50]}...")
+    return ScoreResponse(results=results)
@@ -0,0 +1,179 @@
+from dataclasses import dataclass, field
+import json
+import logging
+import os
+import time
+from typing import Optional
+from dotenv import load_dotenv
+from .resilience import get_breaker
+
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+FALLBACK_MODEL = "gemini-2.5-flash-lite"
+
+# Models tried in order for each task, and the generation config they share
+DEFAULT_ROUTES = {
+    "cover_letter": {
+        "models": [DEFAULT_MODEL, FALLBACK_MODEL],
+        "config": {"temperature": 0.5, "topP": 0.95, "maxOutputTokens": 2048},
+    },
+    "bullets": {
+        "models": [DEFAULT_MODEL, FALLBACK_MODEL],
+        "config": {"temperature": 0.5, "topP": 0.95, "maxOutputTokens": 1024},
+    },
+    "combined": {
+        "models": [DEFAULT_MODEL, FALLBACK_MODEL],
+        # Budgets of the two separate calls combined
+        "config": {"temperature": 0.5, "topP": 0.95, "maxOutputTokens": 3072},
+    },
+}
+
+# JSON object (inline, or the path of a JSON file) overriding DEFAULT_ROUTES
+# per task. A model is a name or {"model": name, "config": {...}}; its config
+# is merged over the task config, e.g.
+# {"bullets": {"models": ["gemini-2.5-flash-lite", "gemini-2.5-flash"]}}
+MODEL_ROUTES = os.getenv("MODEL_ROUTES", "")
+# A model is passed over while its recent error rate or latency (moving
+# averages) is above these; 0 disables the latency rule
+ROUTING_MAX_ERROR_RATE = float(os.getenv("ROUTING_MAX_ERROR_RATE", "0.5"))
+ROUTING_LATENCY_SLO = float(os.getenv("ROUTING_LATENCY_SLO", "0"))
+# Seconds without traffic after which a passed-over model is tried again
+ROUTING_RECOVERY = float(os.getenv("ROUTING_RECOVERY", "30"))
+
+# Weight of the newest observation in the moving averages
+EWMA_ALPHA = 0.2
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    model: str
+    config: dict = field(default_factory=dict, hash=False)
+
+
+@dataclass
+class ModelStats:
+    latency: Optional[float] = None
+    error_rate: float = 0.0
+    calls: int = 0
+    updated_at: float = 0.0
+
+    def observe(self, seconds: float, ok: bool):
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += EWMA_ALPHA * (seconds - self.latency)
+        self.error_rate += EWMA_ALPHA * ((0.0 if ok else 1.0) - self.error_rate)
+        self.calls += 1
+        self.updated_at = time.monotonic()
+
+
+def load_routes(spec: str = MODEL_ROUTES) -> dict:
+    """
+    DEFAULT_ROUTES with the overrides of ``spec`` applied, as tiers per task
+    """
+    overrides = {}
+    if spec.strip():
+        if not spec.lstrip().startswith("{"):
+            with open(spec, encoding="utf-8") as f:
+                spec = f.read()
+        overrides = json.loads(spec)
+
+    routes = {}
+    for task in DEFAULT_ROUTES.keys() | overrides.keys():
+        route = {**DEFAULT_ROUTES.get(task, {}), **overrides.get(task, {})}
+        base = {**DEFAULT_ROUTES.get(task, {}).get("config", {}),
+                **overrides.get(task, {}).get("config", {})}
+        tiers = []
+        for entry in route.get("models") or [DEFAULT_MODEL]:
+            if isinstance(entry, str):
+                entry = {"model": entry}
+            tiers.append(ModelTier(entry["model"], {**base, **entry.get("config", {})}))
+        routes[task] = tiers
+    return routes
+
+
+class ModelRouter:
+    """
+    Picks the model tiers for a task from the routing table.
+
+    Tiers keep their configured order, except that tiers which currently
+    look unhealthy (circuit open, error rate or latency above the limits)
+    move behind the healthy ones. A model nobody called for
+    ``recovery`` seconds counts as healthy again, so a recovered primary
+    gets traffic back.
+    """
+
+    def __init__(self, routes: dict = None, max_error_rate: float = ROUTING_MAX_ERROR_RATE,
+                 latency_slo: float = ROUTING_LATENCY_SLO,
+                 recovery: float = ROUTING_RECOVERY):
+        self.routes = routes if routes is not None else load_routes()
+        self.max_error_rate = max_error_rate
+        self.latency_slo = latency_slo
+        self.recovery = recovery
+        self._stats = {}  # (task, model) -> ModelStats
+
+    def tiers(self, task: str) -> list:
+        """
+        Configured tiers of ``task``, primary first
+        """
+        return self.routes.get(task) or [ModelTier(DEFAULT_MODEL)]
+
+    def healthy(self, task: str, model: str) -> bool:
+        if get_breaker(model).state == "open":
+            return False
+        stats = self._stats.get((task, model))
+        if stats is None or time.monotonic() - stats.updated_at > self.recovery:
+            return True
+        if stats.error_rate > self.max_error_rate:
+            return False
+        return not (self.latency_slo and stats.latency and stats.latency > self.latency_slo)
+
+    def order(self, task: str) -> list:
+        """
+        Tiers of ``task`` in the order they should be tried
+        """
+        tiers = self.tiers(task)
+        healthy = [tier for tier in tiers if self.healthy(task, tier.model)]
+        if len(healthy) == len(tiers):
+            return tiers
+        return healthy + [tier for tier in tiers if tier not in healthy]
+
+    def observe(self, task: str, model: str, seconds: float, ok: bool):
+        stats = self._stats.get((task, model))
+        if stats is None:
+            stats = self._stats[(task, model)] = ModelStats()
+        stats.observe(seconds, ok)
+
+    def reset(self):
+        self._stats.clear()
+
+    def stats(self) -> dict:
+        report = {}
+        for task, tiers in self.routes.items():
+            report[task] = {}
+            for tier in tiers:
+                entry = {"healthy": self.healthy(task, tier.model)}
+                stats = self._stats.get((task, tier.model))
+                if stats is not None:
+                    entry.update(
+                        latency_ms=round((stats.latency or 0) * 1000),
+                        error_rate=round(stats.error_rate, 3),
+                        calls=stats.calls,
+                    )
+                report[task][tier.model] = entry
+        return report
+
+
+_router = None
+
+
+def get_model_router() -> ModelRouter:
+    global _router
+
+    if _router is None:
+        _router = ModelRouter()
+    return _router
@@ -1,9 +1,11 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class GenerateRequest(BaseModel):
-    resume_text: str
+    resume_text: str = ""
+    # Fingerprint returned by /parse/resume-text, instead of resume_text
+    resume_hash: Optional[str] = None
     job_description: str
     tone_hint: Optional[str] = ""
 
@@ -11,7 +13,80 @@ class GenerateRequest(BaseModel):
 class GenerateResponse(BaseModel):
     cover_letter: str
     bullets: str
+    failed_sections: List[str] = []
+    # Section -> model that generated it
+    models: Dict[str, str] = {}
+
+
+class CombinedGeneration(BaseModel):
+    """
+    JSON output of the single-call (combined) generation mode
+    """
+    cover_letter: str
+    bullets: List[str]
+
+
+class BatchGenerateRequest(BaseModel):
+    resume_text: str = ""
+    resume_hash: Optional[str] = None
+    job_descriptions: List[str]
+    tone_hint: Optional[str] = ""
+
+
+class BatchGenerateResult(BaseModel):
+    index: int
+    status: int
+    result: Optional[GenerateResponse] = None
+    detail: Optional[str] = None
+
+
+class JobSubmitted(BaseModel):
+    id: str
+    status: str
+    status_url: str
+
+
+class JobStatus(BaseModel):
+    id: str
+    status: str
+    attempts: int = 0
+    created_at: float
+    updated_at: float
+    status_code: Optional[int] = None
+    result: Optional[GenerateResponse] = None
+    error: Optional[str] = None
 
 
 class JDOnlyRequest(BaseModel):
     job_description: str
+
+
+class ParsedResume(BaseModel):
+    text: str
+    format: str
+    # None for formats without pages (plain text)
+    pages: Optional[int] = None
+    characters: int
+    # Pages past PARSE_MAX_PAGES were not extracted
+    truncated: bool = False
+    # SHA-256 of the file; send it as resume_hash to reuse the text
+    fingerprint: str
+
+
+class JobScore(BaseModel):
+    index: int
+    # Weighted keywords, skills and tfidf, in [0, 1]
+    score: float
+    keywords: float
+    # None when the resume has no skills section
+    skills: Optional[float] = None
+    tfidf: float
+    # Unbounded; only comparable within one response
+    bm25: float
+    matched_skills: List[str] = []
+    missing_keywords: List[str] = []
+
+
+class ScoreResponse(BaseModel):
+    # Best match first
+    results: List[JobScore]
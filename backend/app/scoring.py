@@ -0,0 +1,171 @@
+from collections import Counter
+import itertools
+import os
+import numpy as np
+from dotenv import load_dotenv
+from .compression import BM25_B, BM25_K1, term_counts, terms
+
+
+load_dotenv()
+
+# Job descriptions accepted per /score request
+SCORE_MAX_JOBS = int(os.getenv("SCORE_MAX_JOBS", "500"))
+
+# Weights of the components of the overall score, each in [0, 1]; without
+# skills in the resume the other two share the weight
+SCORE_WEIGHTS = {"keywords": 0.4, "skills": 0.3, "tfidf": 0.3}
+# Most important job description terms missing from the resume, per job
+MISSING_KEYWORDS = 10
+
+
+def sparse_counts(counters: list) -> tuple:
+    """
+    Term Counters of documents as coordinate arrays.
+
+    Returns (rows, columns, counts, vocabulary): one entry per distinct
+    term of each document, in order of first occurrence, ``vocabulary``
+    mapping terms to column numbers. Terms are numbered by C loops
+    (dict.fromkeys, map), not one by one in Python.
+    """
+    chain = itertools.chain.from_iterable
+    vocabulary = dict(zip(dict.fromkeys(chain(counters)), itertools.count()))
+    columns = np.fromiter(map(vocabulary.__getitem__, chain(counters)), dtype=np.intp)
+    counts = np.fromiter(chain(map(Counter.values, counters)), dtype=np.float64)
+    rows = np.repeat(np.arange(len(counters)), [len(counter) for counter in counters])
+    return rows, columns, counts, vocabulary
+
+
+def row_sums(rows: np.ndarray, values: np.ndarray, count: int) -> np.ndarray:
+    return np.bincount(rows, weights=values, minlength=count)
+
+
+def score_jobs(resume: str, job_descriptions: list, skills: list = ()) -> list:
+    """
+    Relevance of one resume to each job description, without any model call.
+
+    The job descriptions form the corpus (document frequencies, average
+    length) and are kept as sparse term counts, so hundreds of them score
+    in a few vectorized passes. Per job:
+
+    - ``keywords``: IDF-weighted share of the job's distinct terms that the
+      resume contains
+    - ``skills``: share of the resume's ``skills`` the job mentions, listed
+      in ``matched_skills`` (None without skills)
+    - ``tfidf``: cosine similarity of the TF-IDF vectors
+    - ``bm25``: Okapi BM25 of the job for the resume's terms (unbounded,
+      only comparable within one request)
+    - ``score``: weighted sum of the first three (SCORE_WEIGHTS)
+
+    ``missing_keywords`` are the job's highest TF-IDF terms absent from the
+    resume. Results are in the order of ``job_descriptions``.
+    """
+    count = len(job_descriptions)
+    counters = [term_counts(jd) for jd in job_descriptions]
+    rows, columns, tf, vocabulary = sparse_counts(counters)
+    size = len(vocabulary)
+
+    # Resume as a dense vector over the job vocabulary; its other terms
+    # cannot match anything
+    resume_tf = np.zeros(size)
+    for term, frequency in term_counts(resume).items():
+        column = vocabulary.get(term)
+        if column is not None:
+            resume_tf[column] = frequency
+    in_resume = resume_tf[columns] > 0
+
+    df = np.bincount(columns, minlength=size)
+    idf = np.log((1 + count) / (1 + df)) + 1  # smoothed, always positive
+    bm25_idf = np.log(1 + (count - df + 0.5) / (df + 0.5))
+
+    keywords = row_sums(rows, idf[columns] * in_resume, count) / \
+        np.maximum(row_sums(rows, idf[columns], count), 1e-12)
+
+    weights = tf * idf[columns]
+    resume_weights = resume_tf * idf
+    dot = row_sums(rows, weights * resume_weights[columns], count)
+    norms = np.sqrt(row_sums(rows, weights ** 2, count)) * np.linalg.norm(resume_weights)
+    tfidf = np.divide(dot, norms, out=np.zeros(count), where=norms > 0)
+
+    lengths = np.array([counter.total() for counter in counters], dtype=np.float64)
+    average = lengths.mean() if count and lengths.mean() else 1.0
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[rows] / average)
+    bm25 = row_sums(
+        rows, in_resume * bm25_idf[columns] * tf * (BM25_K1 + 1) / (tf + norm), count)
+
+    matched, skill_share = match_skills(skills, rows, columns, vocabulary, count)
+    if skill_share is None:
+        total = SCORE_WEIGHTS["keywords"] + SCORE_WEIGHTS["tfidf"]
+        score = (SCORE_WEIGHTS["keywords"] * keywords + SCORE_WEIGHTS["tfidf"] * tfidf) / total
+    else:
+        score = (SCORE_WEIGHTS["keywords"] * keywords + SCORE_WEIGHTS["skills"] * skill_share
+                 + SCORE_WEIGHTS["tfidf"] * tfidf)
+
+    missing = missing_keywords(rows, columns, weights, in_resume, vocabulary, count)
+    return [
+        {
+            "index": index,
+            "score": round(float(score[index]), 4),
+            "keywords": round(float(keywords[index]), 4),
+            "skills": None if skill_share is None else round(float(skill_share[index]), 4),
+            "tfidf": round(float(tfidf[index]), 4),
+            "bm25": round(float(bm25[index]), 4),
+            "matched_skills": matched[index],
+            "missing_keywords": missing[index],
+        }
+        for index in range(count)
+    ]
+
+
+def match_skills(skills: list, rows: np.ndarray, columns: np.ndarray, vocabulary: dict,
+                 count: int) -> tuple:
+    """
+    Skills mentioned by each job (all of a skill's terms occur in it) and
+    the share of ``skills`` that is, or (lists, None) without skills
+    """
+    skill_terms = [(skill, terms(skill)) for skill in skills]
+    skill_terms = [(skill, words) for skill, words in skill_terms if words]
+    if not skill_terms:
+        return [[] for _ in range(count)], None
+
+    # Presence of the skill terms in each job, one column per term
+    wanted = {}
+    for _, words in skill_terms:
+        for word in words:
+            if word in vocabulary:
+                wanted.setdefault(vocabulary[word], len(wanted))
+    lookup = np.full(len(vocabulary), -1)
+    lookup[list(wanted)] = list(wanted.values())
+    present = np.zeros((count, len(wanted) + 1), dtype=bool)  # last column: never present
+    hits = lookup[columns] >= 0
+    present[rows[hits], lookup[columns[hits]]] = True
+
+    matches = np.zeros((count, len(skill_terms)), dtype=bool)
+    for position, (_, words) in enumerate(skill_terms):
+        slots = [wanted.get(vocabulary.get(word), len(wanted)) for word in words]
+        matches[:, position] = present[:, slots].all(axis=1)
+    names = [skill for skill, _ in skill_terms]
+    matched = [[names[position] for position in np.flatnonzero(row)] for row in matches]
+    return matched, matches.mean(axis=1)
+
+
+def missing_keywords(rows: np.ndarray, columns: np.ndarray, weights: np.ndarray,
+                     in_resume: np.ndarray, vocabulary: dict, count: int) -> list:
+    """
+    Up to MISSING_KEYWORDS terms of each job absent from the resume, by
+    descending TF-IDF weight
+    """
+    absent = ~in_resume
+    rows, columns, weights = rows[absent], columns[absent], weights[absent]
+    # Stable: equal weights keep the order of first occurrence
+    order = np.lexsort((-weights, rows))
+    rows, columns = rows[order], columns[order]
+    # Position of each entry within its job
+    starts = np.searchsorted(rows, np.arange(count))
+    ranks = np.arange(len(rows)) - starts[rows]
+    keep = ranks < MISSING_KEYWORDS
+
+    names = np.array(list(vocabulary), dtype=object)
+    missing = [[] for _ in range(count)]
+    for row, term in zip(rows[keep].tolist(), names[columns[keep]].tolist()):
+        missing[row].append(term)
+    return missing
@@ -1,45 +1,235 @@
-from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from collections import defaultdict
-from datetime import datetime, timedelta
-import asyncio
+from collections import OrderedDict
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+from dotenv import load_dotenv
 
 
-class IPBlockMiddleware(BaseHTTPMiddleware):
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+IP_BLOCK_MAX_FAILURES = int(os.getenv("IP_BLOCK_MAX_FAILURES", "10"))
+IP_BLOCK_DURATION = float(os.getenv("IP_BLOCK_DURATION", "3600"))  # seconds
+# Failure scores halve every IP_BLOCK_HALF_LIFE seconds
+IP_BLOCK_HALF_LIFE = float(os.getenv("IP_BLOCK_HALF_LIFE", "300"))
+IP_BLOCK_CAPACITY = int(os.getenv("IP_BLOCK_CAPACITY", "10000"))
+# Optional SQLite file sharing blocks between uvicorn workers
+IP_BLOCK_SHARED_PATH = os.getenv("IP_BLOCK_SHARED_PATH")
+# Response statuses that look like probing: bad credentials and scans for
+# routes. Mistakes of legitimate users (422 validation, 429 rate limits)
+# and the server's side (5xx, 499 client went away) never count.
+IP_BLOCK_STATUSES = frozenset(
+    int(status) for status in os.getenv("IP_BLOCK_STATUSES", "401,403,404").split(",")
+    if status.strip())
+
+BLOCKED_BODY = json.dumps({
+    "detail": "Your IP has been temporarily blocked due to suspicious activity."
+}).encode()
+
+
+class ExpiringMap:
     """
-    Block IPs that exceed failure thresholds
+    Fixed-capacity map whose entries expire on a monotonic clock.
+
+    When full, the least recently written entry is dropped, so a scan from
+    many addresses cannot grow memory without bound.
     """
 
-    def __init__(self, app, max_failures=10, block_duration=3600):
-        super().__init__(app)
-        self.blocked_ips = {}
-        self.failure_counts = defaultdict(int)
+    def __init__(self, capacity: int, clock=time.monotonic):
+        self.capacity = capacity
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        if entry[0] <= self.clock():
+            del self._entries[key]
+            return default
+        return entry[1]
+
+    def set(self, key, value, ttl: float):
+        self._entries.pop(key, None)
+        self._entries[key] = (self.clock() + ttl, value)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        self._entries.clear()
+
+
+class SharedBlocklist:
+    """
+    Blocks shared by every worker on the host through a SQLite file.
+
+    Stored with wall-clock deadlines since monotonic clocks are per process.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ip_blocks ("
+            " ip TEXT PRIMARY KEY, blocked_until REAL NOT NULL)")
+
+    def add(self, ip: str, duration: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ip_blocks VALUES (?, ?)",
+                (ip, time.time() + duration))
+
+    def active(self) -> dict:
+        """
+        Map of blocked IP to remaining seconds; expired rows are dropped
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM ip_blocks WHERE blocked_until <= ?", (now,))
+            rows = self._conn.execute(
+                "SELECT ip, blocked_until FROM ip_blocks").fetchall()
+        return {ip: until - now for ip, until in rows}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM ip_blocks")
+
+
+class IPBlocker:
+    """
+    Decaying per-IP failure scores and temporary blocks.
+
+    Each failure adds 1 to a score that halves every ``half_life`` seconds;
+    an IP is blocked once its score reaches ``max_failures``. Both maps are
+    bounded by ``capacity``.
+    """
+
+    def __init__(self, max_failures: int = IP_BLOCK_MAX_FAILURES,
+                 block_duration: float = IP_BLOCK_DURATION,
+                 half_life: float = IP_BLOCK_HALF_LIFE,
+                 capacity: int = IP_BLOCK_CAPACITY,
+                 shared: Optional[SharedBlocklist] = None,
+                 sync_interval: float = 5.0, clock=time.monotonic):
         self.max_failures = max_failures
         self.block_duration = block_duration
+        self.decay = math.log(2) / half_life
+        # A score has decayed below 1/1000 after ~10 half-lives
+        self.score_ttl = half_life * 10
+        self.clock = clock
+        self.blocked = ExpiringMap(capacity, clock)
+        self.scores = ExpiringMap(capacity, clock)  # ip -> (score, updated_at)
+        self.shared = shared
+        self.sync_interval = sync_interval
+        self._next_sync = 0.0
+
+    def is_blocked(self, ip: str) -> bool:
+        if self.shared is not None and self.clock() >= self._next_sync:
+            self.sync()
+        return self.blocked.get(ip) is not None
+
+    def record_failure(self, ip: str) -> bool:
+        """
+        Count a failed response; returns True when the IP gets blocked
+        """
+        now = self.clock()
+        score, updated_at = self.scores.get(ip, (0.0, now))
+        score = score * math.exp(-self.decay * (now - updated_at)) + 1
+        # Small slack so failures in quick succession count as whole ones
+        if score < self.max_failures - 0.01:
+            self.scores.set(ip, (score, now), self.score_ttl)
+            return False
+
+        self.scores.pop(ip)
+        self.blocked.set(ip, True, self.block_duration)
+        if self.shared is not None:
+            self.shared.add(ip, self.block_duration)
+        logger.warning(f"Blocked {ip} for {self.block_duration:.0f}s")
+        return True
+
+    def sync(self):
+        """
+        Pull blocks added by other workers
+        """
+        self._next_sync = self.clock() + self.sync_interval
+        try:
+            for ip, remaining in self.shared.active().items():
+                self.blocked.set(ip, True, remaining)
+        except sqlite3.Error as e:
+            logger.warning(f"IP blocklist sync failed: {str(e)}")
+
+    def reset(self):
+        self.blocked.clear()
+        self.scores.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+
+class IPBlockMiddleware:
+    """
+    Block IPs that exceed failure thresholds.
+
+    Pure ASGI: the response is passed through untouched and only the status
+    of ``http.response.start`` is inspected, avoiding the extra task and
+    body streaming of BaseHTTPMiddleware. Only ``statuses`` (probing
+    errors) count as failures.
+    """
+
+    def __init__(self, app, blocker: Optional[IPBlocker] = None,
+                 statuses: frozenset = IP_BLOCK_STATUSES):
+        self.app = app
+        # Thresholds live on the blocker (IP_BLOCK_* settings for the shared one)
+        self.blocker = blocker or get_ip_blocker()
+        self.statuses = statuses
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope.get("client"):
+            await self.app(scope, receive, send)
+            return
+
+        client_ip = scope["client"][0]
+        if self.blocker.is_blocked(client_ip):
+            await send({
+                "type": "http.response.start",
+                "status": 403,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(BLOCKED_BODY)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": BLOCKED_BODY})
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] in self.statuses:
+                self.blocker.record_failure(client_ip)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+_blocker = None
+
+
+def get_ip_blocker() -> IPBlocker:
+    global _blocker
 
-    async def dispatch(self, request: Request, call_next):
-        client_ip = request.client.host
-
-        # Check if IP is blocked
-        if client_ip in self.blocked_ips:
-            if datetime.now() < self.blocked_ips[client_ip]:
-                return JSONResponse(
-                    status_code=403,
-                    content={
-                        "detail": "Your IP has been temporarily blocked due to suspicious activity."}
-                )
-            else:
-                del self.blocked_ips[client_ip]
-                self.failure_counts[client_ip] = 0
-
-        response = await call_next(request)
-
-        # Track failures
-        if response.status_code >= 400:
-            self.failure_counts[client_ip] += 1
-            if self.failure_counts[client_ip] >= self.max_failures:
-                self.blocked_ips[client_ip] = datetime.now(
-                ) + timedelta(seconds=self.block_duration)
-
-        return response
+    if _blocker is None:
+        shared = SharedBlocklist(IP_BLOCK_SHARED_PATH) if IP_BLOCK_SHARED_PATH else None
+        _blocker = IPBlocker(shared=shared)
+    return _blocker
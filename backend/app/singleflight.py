@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import os
+from dotenv import load_dotenv
+from .metrics import COALESCED
+
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Share one upstream call between concurrent identical requests
+SINGLE_FLIGHT = os.getenv("SINGLE_FLIGHT", "true").lower() in ("1", "true", "yes")
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one shared task.
+
+    Every caller awaits the shared task through ``asyncio.shield`` so one
+    waiter being cancelled (e.g. its client disconnected) does not cancel the
+    work for the others. The shared task is only cancelled once its last
+    waiter has gone away.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self.leaders = 0
+        self.collapsed = 0
+        self.abandoned = 0
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: str, factory):
+        flight = self._flights.get(key)
+        if flight is not None and flight.task.get_loop() is not asyncio.get_running_loop():
+            flight = None
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(
+                lambda _, key=key, flight=flight: self._forget(key, flight))
+            self.leaders += 1
+        else:
+            self.collapsed += 1
+            COALESCED.inc()
+            logger.info(f"Coalesced request onto in-flight call {key[:12]}...")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                self.abandoned += 1
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> dict:
+        return {
+            "leaders": self.leaders,
+            "collapsed": self.collapsed,
+            "abandoned": self.abandoned,
+            "in_flight": len(self._flights),
+        }
+
+    def reset(self):
+        self.leaders = self.collapsed = self.abandoned = 0
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    return _single_flight
@@ -0,0 +1,106 @@
+import asyncio
+from app.deps import verify_api_key
+from app.main import app
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, MagicMock
+
+TEST_API_KEY = "test-api-key-12345"
+RESUME_LINE = "Senior Python engineer building FastAPI services on AWS. "
+JOB_LINE = "Hiring a backend engineer with Python and cloud experience. "
+
+
+@pytest.fixture
+def api_key_override():
+    """Accept any request as authenticated for the duration of a test"""
+    previous = dict(app.dependency_overrides)
+    app.dependency_overrides[verify_api_key] = lambda: TEST_API_KEY
+    yield
+    app.dependency_overrides.clear()
+    app.dependency_overrides.update(previous)
+
+
+@pytest.fixture
+def test_client(api_key_override):
+    """Test client with API key verification overridden"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def make_payload():
+    """Factory of generation request bodies repeating ``resume`` and ``job_description``"""
+    def make(resume=RESUME_LINE, job_description=JOB_LINE, repeat=10):
+        return {
+            "resume_text": resume * repeat,
+            "job_description": job_description * repeat,
+            "tone_hint": "professional",
+        }
+    return make
+
+
+@pytest.fixture
+def valid_request_payload(make_payload):
+    """Request body every generation endpoint accepts"""
+    return make_payload()
+
+
+@pytest.fixture
+def make_mock_client():
+    """
+    Factory of mock genai clients whose generate_content answers ``text``.
+
+    ``answer(model=, contents=, config=)`` picks the text per call instead
+    (None keeps ``text``, and it may raise), ``delay`` slows every call down and ``in_flight``
+    records the current ("now") and peak ("max") number of calls running.
+    """
+    def make(text="Generated content", answer=None, delay=0.0, in_flight=None):
+        response = MagicMock()
+        response.text = text
+        mock_client = MagicMock()
+        mock_client.aio.models.generate_content = AsyncMock(return_value=response)
+        if answer is None and not delay and in_flight is None:
+            return mock_client
+
+        async def generate_content(**kwargs):
+            if in_flight is not None:
+                in_flight["now"] += 1
+                in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                if in_flight is not None:
+                    in_flight["now"] -= 1
+            answered = None if answer is None else answer(**kwargs)
+            if answered is None:
+                return response
+            per_call = MagicMock()
+            per_call.text = answered
+            return per_call
+
+        mock_client.aio.models.generate_content.side_effect = generate_content
+        return mock_client
+    return make
+
+
+@pytest.fixture
+def make_stream_client():
+    """Factory of mock genai clients whose streaming call yields the given chunks"""
+    def make(cover_chunks, bullet_chunks):
+        async def generate_content_stream(**kwargs):
+            if "Output: 6-8 optimized bullets" in kwargs["contents"]:
+                chunks = bullet_chunks
+            else:
+                chunks = cover_chunks
+
+            async def iterate():
+                for text in chunks:
+                    chunk = MagicMock()
+                    chunk.text = text
+                    yield chunk
+            return iterate()
+
+        mock_client = MagicMock()
+        mock_client.aio.models.generate_content_stream = AsyncMock(
+            side_effect=generate_content_stream)
+        return mock_client
+    return make
@@ -0,0 +1,113 @@
+# test_admission.py
+from app.admission import AdmissionController, AdmissionRejected, admission_key
+from app.resilience import get_breaker, request_deadline
+from app.routers.generate import generate_with_timeout
+import asyncio
+import pytest
+from fastapi import HTTPException
+from unittest.mock import AsyncMock, patch
+
+
+async def _grant_order(controller: AdmissionController, calls: list) -> list:
+    """
+    Queue ``calls`` (client keys) behind one running call and return the
+    order in which they get their slot
+    """
+    order = []
+    release = asyncio.Event()
+
+    async def call(key: str):
+        async with controller.slot(key):
+            order.append(key)
+            await release.wait()
+
+    async def blocker():
+        async with controller.slot("blocker"):
+            await release.wait()
+
+    tasks = [asyncio.create_task(blocker())]
+    await asyncio.sleep(0)
+    for key in calls:
+        tasks.append(asyncio.create_task(call(key)))
+        await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_a_flooding_key_does_not_starve_a_newcomer():
+    controller = AdmissionController(max_concurrency=1, per_key=0, queue_depth=100, weights={})
+    order = asyncio.run(_grant_order(controller, ["a"] * 5 + ["b"]))
+
+    # b arrived last but is served right after the first call of a
+    assert order == ["a", "b", "a", "a", "a", "a"]
+    assert controller.active == controller.queued == 0
+
+
+def test_weights_split_slots_between_waiting_keys():
+    controller = AdmissionController(
+        max_concurrency=1, per_key=0, queue_depth=100, weights={"gold": 2})
+    order = asyncio.run(_grant_order(controller, ["gold"] * 6 + ["free"] * 3))
+
+    assert order[:6].count("gold") == 4 and order[:6].count("free") == 2
+
+
+def test_per_key_limit_leaves_room_for_other_keys():
+    controller = AdmissionController(max_concurrency=4, per_key=1, queue_depth=100, weights={})
+
+    async def run():
+        async with controller.slot("a"):
+            waiting = asyncio.create_task(controller.acquire("a"))
+            await asyncio.sleep(0)
+            assert controller.queued == 1
+            async with controller.slot("b"):
+                assert controller.active == 2
+        await waiting
+        assert controller.active == 1 and controller.queued == 0
+
+    asyncio.run(run())
+
+
+def test_full_queue_sheds_with_retry_after():
+    controller = AdmissionController(max_concurrency=1, per_key=0, queue_depth=0, weights={})
+    asyncio.run(controller.acquire("busy"))
+
+    with pytest.raises(AdmissionRejected) as error:
+        asyncio.run(controller.acquire("late"))
+    assert error.value.retry_after >= 1
+    assert controller.rejected == 1
+
+
+def test_generate_all_returns_503_when_overloaded(
+    test_client, valid_request_payload, make_mock_client
+):
+    controller = AdmissionController(max_concurrency=1, per_key=0, queue_depth=0, weights={})
+    asyncio.run(controller.acquire("busy"))
+    mock_client = make_mock_client()
+    with patch("app.routers.generate.get_cached_client", return_value=mock_client), \
+            patch("app.routers.generate.get_admission_controller", return_value=controller):
+        response = test_client.post("/generate/all", json=valid_request_payload)
+
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) >= 1
+    # Shedding is the same for every model, so no fallback tier was tried
+    mock_client.aio.models.generate_content.assert_not_awaited()
+
+
+def test_timeout_while_queued_is_not_an_upstream_failure():
+    controller = AdmissionController(max_concurrency=1, per_key=0, queue_depth=10, weights={})
+    upstream = AsyncMock(return_value="done")
+
+    async def run():
+        await controller.acquire("busy")
+        with request_deadline(0.1), admission_key("late"):
+            await generate_with_timeout(upstream, circuit="queued")
+
+    with patch("app.routers.generate.get_admission_controller", return_value=controller), \
+            pytest.raises(HTTPException) as error:
+        asyncio.run(run())
+
+    assert error.value.status_code == 504
+    upstream.assert_not_awaited()
+    assert get_breaker("queued").failures == 0
+    assert controller.queued == 0
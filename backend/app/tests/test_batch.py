@@ -0,0 +1,99 @@
+# test_batch.py
+import json
+import pytest
+from unittest.mock import patch
+
+
+@pytest.fixture
+def resume():
+    return "Senior Python engineer building FastAPI services on AWS. " * 10
+
+
+def _job(name):
+    return f"{name} is hiring a backend engineer with Python and cloud experience. " * 10
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+@patch('app.routers.generate.get_cached_client')
+def test_batch_returns_one_line_per_job(mock_get_client, test_client, resume, make_mock_client):
+    """Every job description gets a result tagged with its index"""
+    mock_get_client.return_value = make_mock_client(delay=0.01)
+    payload = {
+        "resume_text": resume,
+        "job_descriptions": [_job("Acme"), _job("Globex"), _job("Initech")],
+    }
+
+    response = test_client.post("/generate/batch", json=payload)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    items = _lines(response)
+    assert sorted(item["index"] for item in items) == [0, 1, 2]
+    assert all(item["status"] == 200 for item in items)
+    assert items[0]["result"]["cover_letter"] == "Generated content"
+
+
+@patch('app.routers.generate.get_cached_client')
+def test_batch_reports_invalid_job_per_item(mock_get_client, test_client, resume, make_mock_client):
+    """A bad job description fails only its own item"""
+    mock_get_client.return_value = make_mock_client(delay=0.01)
+    payload = {
+        "resume_text": resume,
+        "job_descriptions": [_job("Acme"), "too short"],
+    }
+
+    items = {item["index"]: item for item in _lines(
+        test_client.post("/generate/batch", json=payload))}
+
+    assert items[0]["status"] == 200
+    assert items[1]["status"] == 422
+    assert "result" not in items[1]
+
+
+@patch('app.routers.generate.BATCH_CONCURRENCY', 1)
+@patch('app.routers.generate.get_cached_client')
+def test_batch_respects_concurrency_bound(mock_get_client, test_client, resume, make_mock_client):
+    """With a bound of one job, at most its two sections run at once"""
+    in_flight = {"now": 0, "max": 0}
+    mock_get_client.return_value = make_mock_client(delay=0.01, in_flight=in_flight)
+    payload = {
+        "resume_text": resume,
+        "job_descriptions": [_job(f"Company {i}") for i in range(4)],
+    }
+
+    response = test_client.post("/generate/batch", json=payload)
+
+    assert len(_lines(response)) == 4
+    assert in_flight["max"] == 2
+
+
+@patch('app.routers.generate.BATCH_MAX_JOBS', 2)
+def test_batch_rejects_too_many_jobs(test_client, resume):
+    payload = {
+        "resume_text": resume,
+        "job_descriptions": [_job("A"), _job("B"), _job("C")],
+    }
+
+    response = test_client.post("/generate/batch", json=payload)
+
+    assert response.status_code == 422
+
+
+def test_batch_validates_resume_up_front(test_client):
+    payload = {"resume_text": "short", "job_descriptions": [_job("Acme")]}
+
+    response = test_client.post("/generate/batch", json=payload)
+
+    assert response.status_code == 422
+
+
+@patch('app.routers.generate.get_cached_client', side_effect=RuntimeError("no API key"))
+def test_batch_client_error_returns_json_500(mock_get_client, test_client, resume):
+    response = test_client.post(
+        "/generate/batch", json={"resume_text": resume, "job_descriptions": [_job("Acme")]})
+
+    assert response.status_code == 500
+    assert response.json()["detail"] == "An unexpected error occurred. Please try again later."
@@ -0,0 +1,129 @@
+# test_cache.py
+from app.cache import (
+    GenerationCache, MemoryCache, SQLiteCache, cache_key, get_generation_cache)
+from unittest.mock import patch
+
+
+def test_cache_key_depends_on_prompt_model_and_config():
+    base = cache_key("gemini-2.5-flash", "prompt", {"temperature": 0.5})
+    assert base == cache_key("gemini-2.5-flash", "prompt", {"temperature": 0.5})
+    assert base != cache_key("gemini-2.5-pro", "prompt", {"temperature": 0.5})
+    assert base != cache_key("gemini-2.5-flash", "prompt!", {"temperature": 0.5})
+    assert base != cache_key("gemini-2.5-flash", "prompt", {"temperature": 0.7})
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2, max_bytes=10_000, ttl=60)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+
+    assert cache.get("a") == "1"
+    assert cache.get("b") is None
+    assert cache.get("c") == "3"
+    assert cache.evictions == 1
+
+
+def test_memory_cache_respects_byte_bound_and_ttl():
+    cache = MemoryCache(max_entries=100, max_bytes=20, ttl=60)
+    cache.set("a", "x" * 10)
+    cache.set("b", "y" * 10)
+    assert cache.get("a") is None
+    assert cache.size_bytes <= 20
+
+    cache.set("huge", "z" * 100)
+    assert cache.get("huge") is None
+
+    expired = MemoryCache(ttl=0)
+    expired.set("a", "1")
+    assert expired.get("a") is None
+
+
+def test_sqlite_cache_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    SQLiteCache(path=path, ttl=60).set("key", "value")
+
+    assert SQLiteCache(path=path, ttl=60).get("key") == "value"
+    assert SQLiteCache(path=path, ttl=0).get("missing") is None
+
+
+def test_sqlite_cache_trims_to_max_entries(tmp_path):
+    cache = SQLiteCache(path=str(tmp_path / "cache.sqlite3"),
+                        max_entries=3, ttl=60, trim_every=1)
+    for index in range(5):
+        cache.set(f"k{index}", "v")
+    assert len(cache) == 3
+
+
+def test_tiered_cache_promotes_hits(tmp_path):
+    memory = MemoryCache()
+    disk = SQLiteCache(path=str(tmp_path / "cache.sqlite3"))
+    disk.set("key", "value")
+    cache = GenerationCache(memory, disk)
+
+    assert cache.get("key") == "value"
+    assert memory.get("key") == "value"
+    assert cache.get("other") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+@patch('app.routers.generate.get_cached_client')
+def test_generate_all_serves_repeat_from_cache(
+    mock_get_client, test_client, valid_request_payload, make_mock_client
+):
+    """A resubmitted request does not call Gemini again"""
+    mock_client = make_mock_client()
+    mock_get_client.return_value = mock_client
+
+    first = test_client.post("/generate/all", json=valid_request_payload)
+    second = test_client.post("/generate/all", json=valid_request_payload)
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert first.headers["X-Cache"] == "cover_letter=miss, bullets=miss"
+    assert second.headers["X-Cache"] == "cover_letter=hit, bullets=hit"
+    assert mock_client.aio.models.generate_content.call_count == 2
+    assert get_generation_cache().stats()["hits"] == 2
+
+
+@patch('app.routers.generate.get_cached_client')
+def test_generate_all_no_cache_header_bypasses_cache(
+    mock_get_client, test_client, valid_request_payload, make_mock_client
+):
+    """Cache-Control: no-cache forces fresh generations"""
+    mock_client = make_mock_client()
+    mock_get_client.return_value = mock_client
+
+    test_client.post("/generate/all", json=valid_request_payload)
+    response = test_client.post(
+        "/generate/all",
+        json=valid_request_payload,
+        headers={"Cache-Control": "no-cache"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["X-Cache"] == "cover_letter=miss, bullets=miss"
+    assert mock_client.aio.models.generate_content.call_count == 4
+    assert get_generation_cache().stats()["bypasses"] == 1
+
+
+@patch('app.routers.generate.get_cached_client')
+def test_generate_all_does_not_cache_failures(
+    mock_get_client, test_client, valid_request_payload, make_mock_client
+):
+    """Empty outputs are not cached"""
+    mock_get_client.return_value = make_mock_client(text="")
+
+    response = test_client.post("/generate/all", json=valid_request_payload)
+
+    assert response.status_code == 500
+    assert len(get_generation_cache().backends[0]) == 0
+
+
+def test_cache_stats_endpoint(test_client):
+    response = test_client.get("/generate/cache/stats")
+
+    assert response.status_code == 200
+    assert {"hits", "misses", "bypasses", "hit_ratio"} <= set(response.json())
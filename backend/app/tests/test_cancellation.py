@@ -0,0 +1,114 @@
+# test_cancellation.py
+from app.cancellation import cancel_on_disconnect
+from app.main import app
+from app.resilience import request_deadline
+from app.routers.generate import build_tasks, run_generation_task
+from benchmarks.fake_gemini import FakeGeminiServer, free_port
+import asyncio
+import threading
+import time
+import httpx
+import pytest
+import uvicorn
+from fastapi import HTTPException
+from google import genai
+from prometheus_client import REGISTRY
+from unittest.mock import patch
+
+
+RESUME = "Senior Python engineer building cancellable services. " * 5
+JD = "Backend engineer with Python and cloud experience. " * 5
+
+
+def _wasted(task, reason):
+    return REGISTRY.get_sample_value(
+        "gemini_wasted_seconds_total", {"task": task, "reason": reason}) or 0
+
+
+def _wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+def test_timeout_aborts_the_upstream_call():
+    before = _wasted("cover_letter", "timeout")
+    task = build_tasks(RESUME, JD, "calm")[0]
+
+    with FakeGeminiServer(latency=5) as upstream:
+        client = genai.Client(api_key="test-key", http_options={"base_url": upstream.base_url})
+
+        async def run():
+            with request_deadline(0.3):
+                return await run_generation_task(client, task, use_cache=False)
+
+        started = time.perf_counter()
+        result = asyncio.run(run())
+        elapsed = time.perf_counter() - started
+
+        assert result.error.status_code == 504
+        assert elapsed < 1.0
+        # The fake upstream sees the connection close long before its 5s
+        assert _wait_for(lambda: upstream.app.state.aborted == 1)
+    assert _wasted("cover_letter", "timeout") - before >= 0.3
+
+
+class _Request:
+    def __init__(self, disconnect_after: float):
+        self.disconnect_at = time.monotonic() + disconnect_after
+
+    async def is_disconnected(self) -> bool:
+        return time.monotonic() >= self.disconnect_at
+
+
+def test_disconnect_cancels_the_generation():
+    cancelled = asyncio.Event()
+
+    async def generation():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def run():
+        with pytest.raises(HTTPException) as error:
+            await cancel_on_disconnect(_Request(0.1), generation(), "test", poll_interval=0.02)
+        return error.value.status_code
+
+    assert asyncio.run(run()) == 499
+    assert REGISTRY.get_sample_value(
+        "generations_cancelled_total", {"endpoint": "test"}) >= 1
+
+
+def test_result_is_returned_while_the_client_is_connected():
+    async def generation():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    assert asyncio.run(cancel_on_disconnect(
+        _Request(10), generation(), "test", poll_interval=0.01)) == "done"
+
+
+@pytest.mark.integration
+def test_client_hanging_up_on_generate_all_stops_upstream_calls(api_key_override):
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        app, host="127.0.0.1", port=port, lifespan="off", log_level="warning"))
+
+    with FakeGeminiServer(latency=5) as upstream:
+        client = genai.Client(api_key="test-key", http_options={"base_url": upstream.base_url})
+        thread = threading.Thread(target=server.run, daemon=True)
+        try:
+            with patch("app.routers.generate.get_cached_client", return_value=client):
+                thread.start()
+                assert _wait_for(lambda: server.started)
+                with pytest.raises(httpx.ReadTimeout):
+                    httpx.post(f"http://127.0.0.1:{port}/generate/all", timeout=0.5,
+                               json={"resume_text": RESUME, "job_description": JD})
+                # Both sections were in flight; both upstream calls get aborted
+                assert _wait_for(lambda: upstream.app.state.aborted == 2)
+        finally:
+            server.should_exit = True
+            thread.join(timeout=10)
@@ -0,0 +1,146 @@
+# test_cassette.py
+from app.cassette import Cassette, CassetteClient, CassetteMiss, fingerprint
+import asyncio
+import gzip
+import json
+import time
+import pytest
+from google.genai import types
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+MODEL = "gemini-2.5-flash"
+
+
+def _response(text, prompt_tokens=12):
+    return types.GenerateContentResponse.model_validate({
+        "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}],
+        "usageMetadata": {"promptTokenCount": prompt_tokens,
+                          "candidatesTokenCount": 3},
+    })
+
+
+def _upstream(latency=0.05):
+    async def generate_content(*, model, contents, config=None):
+        await asyncio.sleep(latency)
+        return _response(f"Answer to {contents}")
+
+    async def chunks():
+        for text in ("Hello", " streamed", " world"):
+            await asyncio.sleep(latency)
+            yield _response(text)
+
+    async def generate_content_stream(*, model, contents, config=None):
+        return chunks()
+
+    client = MagicMock()
+    client.aio.models.generate_content = AsyncMock(side_effect=generate_content)
+    client.aio.models.generate_content_stream = AsyncMock(
+        side_effect=generate_content_stream)
+    return client
+
+
+def test_fingerprint_depends_on_kind_model_contents_and_config():
+    key = fingerprint("generate", MODEL, "prompt", {"temperature": 0.5})
+
+    assert key == fingerprint("generate", MODEL, "prompt", {"temperature": 0.5})
+    assert key != fingerprint("stream", MODEL, "prompt", {"temperature": 0.5})
+    assert key != fingerprint("generate", MODEL, "prompt", {"temperature": 0.7})
+    assert key != fingerprint("generate", MODEL, "other", {"temperature": 0.5})
+
+
+def test_record_then_replay_with_scaled_latency(tmp_path):
+    path = str(tmp_path / "cassette.jsonl.gz")
+    upstream = _upstream(latency=0.05)
+    recorder = CassetteClient(Cassette(path, mode="record"), upstream)
+
+    recorded = asyncio.run(recorder.aio.models.generate_content(
+        model=MODEL, contents="prompt one", config={"temperature": 0.5}))
+    assert recorded.text == "Answer to prompt one"
+
+    with gzip.open(path, "rt") as f:
+        entry = json.loads(f.readline())
+    assert entry["kind"] == "generate" and entry["latency"] >= 0.05
+
+    async def replay(scale):
+        client = CassetteClient(Cassette(path, mode="replay", latency_scale=scale))
+        started = time.perf_counter()
+        response = await client.aio.models.generate_content(
+            model=MODEL, contents="prompt one", config={"temperature": 0.5})
+        return response, time.perf_counter() - started
+
+    response, elapsed = asyncio.run(replay(1.0))
+    assert response.text == "Answer to prompt one"
+    assert response.usage_metadata.prompt_token_count == 12
+    assert elapsed >= 0.05
+
+    _, elapsed = asyncio.run(replay(0.0))
+    assert elapsed < 0.05
+    assert upstream.aio.models.generate_content.await_count == 1
+
+
+def test_replay_miss_raises(tmp_path):
+    client = CassetteClient(Cassette(str(tmp_path / "empty.jsonl.gz"), mode="replay"))
+
+    with pytest.raises(CassetteMiss):
+        asyncio.run(client.aio.models.generate_content(model=MODEL, contents="unknown"))
+
+
+def test_auto_mode_records_only_new_requests(tmp_path):
+    path = str(tmp_path / "cassette.jsonl.gz")
+    upstream = _upstream(latency=0)
+
+    async def run():
+        client = CassetteClient(Cassette(path, mode="auto"), upstream)
+        await client.aio.models.generate_content(model=MODEL, contents="a")
+        client = CassetteClient(Cassette(path, mode="auto"), upstream)
+        await client.aio.models.generate_content(model=MODEL, contents="a")
+        await client.aio.models.generate_content(model=MODEL, contents="b")
+        return client.cassette.stats()
+
+    stats = asyncio.run(run())
+    assert upstream.aio.models.generate_content.await_count == 2
+    assert stats["hits"] == 1 and stats["recorded"] == 1 and stats["entries"] == 2
+
+
+def test_streams_replay_chunks_with_their_timing(tmp_path):
+    path = str(tmp_path / "cassette.jsonl.gz")
+
+    async def collect(client):
+        started = time.perf_counter()
+        stream = await client.aio.models.generate_content_stream(
+            model=MODEL, contents="stream me")
+        chunks = [(chunk.text, time.perf_counter() - started) async for chunk in stream]
+        return chunks
+
+    recorded = asyncio.run(collect(
+        CassetteClient(Cassette(path, mode="record"), _upstream(latency=0.03))))
+    replayed = asyncio.run(collect(CassetteClient(Cassette(path, mode="replay"))))
+
+    assert [text for text, _ in replayed] == ["Hello", " streamed", " world"]
+    assert [text for text, _ in recorded] == [text for text, _ in replayed]
+    assert replayed[-1][1] >= 0.09
+
+
+def test_generate_all_runs_against_a_replayed_cassette(tmp_path, test_client):
+    path = str(tmp_path / "cassette.jsonl.gz")
+    upstream = _upstream(latency=0)
+    recorder = CassetteClient(Cassette(path, mode="record"), upstream)
+    payload = {
+        "resume_text": "Senior Python engineer replaying recorded Gemini calls. " * 5,
+        "job_description": "Backend engineer with Python and cloud experience. " * 5,
+        "tone_hint": "professional",
+    }
+
+    with patch("app.routers.generate.get_cached_client", return_value=recorder):
+        first = test_client.post("/generate/all", json=payload,
+                                 headers={"Cache-Control": "no-cache"})
+
+    replayer = CassetteClient(Cassette(path, mode="replay", latency_scale=0))
+    with patch("app.routers.generate.get_cached_client", return_value=replayer):
+        second = test_client.post("/generate/all", json=payload,
+                                  headers={"Cache-Control": "no-cache"})
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert replayer.cassette.stats()["hits"] == 2
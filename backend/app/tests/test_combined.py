@@ -0,0 +1,95 @@
+# test_combined.py
+from app.routers.generate import CombinedOutputError, parse_combined
+from prometheus_client import REGISTRY
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+
+
+@pytest.fixture(autouse=True)
+def combined_mode():
+    with patch("app.routers.generate.COMBINED_GENERATION", True):
+        yield
+
+
+COMBINED_OUTPUT = json.dumps({
+    "cover_letter": "Dear hiring team, I build reliable Python services.",
+    "bullets": ["- Cut API latency by 40%", "Led a team of 5 engineers"],
+})
+
+
+def _separate_sections(*, model, contents, config):
+    """Answer plain calls by prompt, JSON-mode calls keep the combined text"""
+    if config.get("responseMimeType") == "application/json":
+        return None
+    if "Output: 6-8 optimized bullets" in contents:
+        return "• Separate bullet"
+    return "Separate cover letter"
+
+
+def test_parse_combined_formats_bullets():
+    generated = parse_combined(COMBINED_OUTPUT)
+
+    assert generated.cover_letter.startswith("Dear hiring team")
+    assert generated.bullets == "• Cut API latency by 40%\n• Led a team of 5 engineers"
+
+
+@pytest.mark.parametrize("text", [
+    "not json",
+    json.dumps({"cover_letter": "Hi"}),
+    json.dumps({"cover_letter": "", "bullets": ["x"]}),
+    json.dumps({"cover_letter": "Hi", "bullets": ["  ", "-"]}),
+])
+def test_parse_combined_rejects_bad_output(text):
+    with pytest.raises(CombinedOutputError):
+        parse_combined(text)
+
+
+def test_combined_mode_makes_one_call(test_client, make_payload, make_mock_client):
+    mock_client = make_mock_client(COMBINED_OUTPUT, answer=_separate_sections)
+    payload = make_payload("Senior Python engineer building FastAPI services. one call ")
+    with patch("app.routers.generate.get_cached_client", return_value=mock_client):
+        response = test_client.post("/generate/all", json=payload)
+
+    assert response.status_code == 200
+    assert response.json()["bullets"].startswith("• Cut API latency")
+    assert response.headers["x-cache"] == "combined=miss"
+    assert mock_client.aio.models.generate_content.await_count == 1
+
+
+def test_unparseable_output_falls_back_and_is_not_cached(
+    test_client, make_payload, make_mock_client
+):
+    before = REGISTRY.get_sample_value(
+        "combined_generation_fallbacks_total", {"reason": "invalid"}) or 0
+    mock_client = make_mock_client(
+        "Sure! Here is your cover letter...", answer=_separate_sections)
+    payload = make_payload("Senior Python engineer building FastAPI services. fallback ")
+
+    with patch("app.routers.generate.get_cached_client", return_value=mock_client):
+        first = test_client.post("/generate/all", json=payload)
+        second = test_client.post("/generate/all", json=payload)
+
+    assert first.status_code == 200
+    assert first.json()["cover_letter"] == "Separate cover letter"
+    assert first.json()["bullets"] == "• Separate bullet"
+    # The separate sections are cached, the invalid combined output is not
+    assert second.headers["x-cache"] == "cover_letter=hit, bullets=hit"
+    assert mock_client.aio.models.generate_content.await_count == 4
+    assert REGISTRY.get_sample_value(
+        "combined_generation_fallbacks_total", {"reason": "invalid"}) == before + 2
+
+
+def test_combined_timeout_is_not_retried_as_two_calls(
+    test_client, make_payload, make_mock_client
+):
+    mock_client = make_mock_client()
+    mock_client.aio.models.generate_content.side_effect = asyncio.TimeoutError
+    payload = make_payload("Senior Python engineer building FastAPI services. timeout ")
+
+    with patch("app.routers.generate.get_cached_client", return_value=mock_client):
+        response = test_client.post("/generate/all", json=payload)
+
+    assert response.status_code == 504
+    assert mock_client.aio.models.generate_content.await_count == 1
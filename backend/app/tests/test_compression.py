@@ -0,0 +1,122 @@
+# test_compression.py
+from app.compression import (
+    bm25_scores, compress, estimate_tokens, normalize, split_chunks, terms)
+from unittest.mock import patch
+
+
+RESUME = """Jane Doe
+Senior Backend Engineer
+
+EXPERIENCE
+Acme Corp, Staff Engineer
+- Built Python FastAPI services handling 10k rps on AWS
+- Led the Kubernetes migration of 40 services
+- Organized the yearly company bake sale
+Page 1 of 2
+Globex, Engineer
+- Wrote Java Spring batch jobs
+- Maintained on-prem Oracle databases
+Page 1 of 2
+
+HOBBIES
+Knitting and hiking in the mountains every weekend
+"""
+
+JD = "Backend engineer with Python, FastAPI, AWS and Kubernetes experience."
+
+
+def test_normalize_collapses_whitespace_and_adjacent_lines():
+    text = "Jane  Doe\r\n\r\n\r\n\r\nPage 1 of 2\n\tPython​ dev \nPYTHON DEV\n"
+
+    assert normalize(text) == "Jane Doe\n\nPage 1 of 2\nPython dev"
+
+
+def test_normalize_drops_repeated_page_headers_and_footers():
+    text = ("Jane Doe\njane@example.com\n- Built APIs\nConfidential\nwww.example.com\n"
+            "Jane Doe\njane@example.com\n- Ran databases\nConfidential\nwww.example.com")
+
+    assert normalize(text) == (
+        "Jane Doe\njane@example.com\n- Built APIs\n- Ran databases\n"
+        "Confidential\nwww.example.com")
+
+
+def test_normalize_keeps_repeated_roles_and_bullets():
+    text = ("Jane Doe\nEXPERIENCE\nSoftware Engineer\nAcme Corp\n- Wrote unit tests\n"
+            "Software Engineer\nGlobex\n- Wrote unit tests")
+
+    assert normalize(text) == text
+
+
+def test_split_chunks_tracks_sections():
+    chunks = split_chunks(normalize(RESUME))
+    bake_sale = next(chunk for chunk in chunks if "bake sale" in chunk.text)
+
+    assert chunks[bake_sale.heading].text == "EXPERIENCE"
+    assert chunks[0].text == "Jane Doe" and chunks[0].heading is None
+
+
+def test_bm25_ranks_relevant_chunks_first():
+    documents = [terms(text) for text in (
+        "Organized the yearly company bake sale",
+        "Built Python FastAPI services on AWS",
+        "Wrote Java Spring batch jobs",
+    )]
+
+    scores = bm25_scores(documents, terms(JD))
+    assert scores[1] > scores[2] >= scores[0] == 0
+
+
+def test_compress_packs_relevant_content_into_budget():
+    compressed = compress(RESUME, JD, resume_budget=60)
+
+    assert estimate_tokens(compressed.resume) <= 60
+    assert compressed.resume.startswith("Jane Doe")
+    assert "FastAPI" in compressed.resume and "Kubernetes" in compressed.resume
+    assert "EXPERIENCE" in compressed.resume
+    assert "Knitting" not in compressed.resume
+    assert compressed.tokens_saved == compressed.tokens_before - compressed.tokens_after > 0
+
+
+def test_compress_keeps_text_under_budget():
+    compressed = compress(RESUME, JD)
+
+    assert compressed.resume == RESUME
+    assert compressed.jd == JD
+    assert compressed.tokens_saved == 0
+
+
+def test_long_job_descriptions_keep_their_beginning():
+    jd = "Must know Python. " * 10 + "\n" + "Perks include free snacks. " * 50
+    compressed = compress(RESUME, jd, jd_budget=60)
+
+    assert compressed.jd.startswith("Must know Python.")
+    assert estimate_tokens(compressed.jd) <= 60
+
+
+def test_generate_all_sends_compressed_resume(test_client, make_mock_client):
+    mock_client = make_mock_client()
+    filler = "\n".join(f"- Unrelated achievement number {i} in retail" for i in range(200))
+    payload = {
+        "resume_text": RESUME + filler,
+        "job_description": JD * 4,
+        "tone_hint": "professional",
+    }
+
+    with patch("app.routers.generate.get_cached_client", return_value=mock_client), \
+            patch("app.routers.generate.MAX_RESUME_LENGTH", 100000):
+        result = test_client.post("/generate/all", json=payload)
+
+    assert result.status_code == 200
+    assert int(result.headers["x-input-tokens-saved"]) > 0
+    prompt = mock_client.aio.models.generate_content.await_args.kwargs["contents"]
+    assert "Kubernetes migration" in prompt
+    assert "achievement number 199" not in prompt
+
+
+def test_oversized_input_is_rejected(test_client):
+    with patch("app.routers.generate.MAX_JD_LENGTH", 300):
+        result = test_client.post("/generate/all", json={
+            "resume_text": RESUME, "job_description": JD * 10})
+
+    assert result.status_code == 422
+    assert "at most 300 characters" in result.json()["detail"]
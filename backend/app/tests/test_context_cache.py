@@ -0,0 +1,128 @@
+# test_context_cache.py
+from app.compression import compress
+from app.context_cache import ContextCache
+from app.routers.generate import (
+    build_combined_task, build_tasks, call_upstream, generate_response)
+from benchmarks.fake_gemini import FakeGeminiServer
+import asyncio
+import pytest
+from google import genai
+from unittest.mock import patch
+
+
+RESUME = "Senior Python engineer building FastAPI services on AWS. " * 10
+JDS = [
+    "Backend engineer with Python and cloud experience. " * 5,
+    "Platform engineer running Kubernetes clusters at scale. " * 5,
+]
+
+
+@pytest.fixture
+def upstream(request):
+    kwargs = getattr(request, "param", {})
+    with FakeGeminiServer(latency=0, **kwargs) as server:
+        yield server
+
+
+def _client(server):
+    return genai.Client(api_key="test-key", http_options={"base_url": server.base_url})
+
+
+def _generate_all(server, context_cache, jds=JDS):
+    async def run():
+        client = _client(server)
+        return [await generate_response(client, RESUME, jd, "friendly", use_cache=False)
+                for jd in jds]
+
+    with patch("app.routers.generate.CONTEXT_CACHE", True), \
+            patch("app.routers.generate.get_context_cache", return_value=context_cache):
+        return asyncio.run(run())
+
+
+def test_every_prompt_starts_with_the_resume_prefix():
+    tasks = build_tasks(RESUME, JDS[0], "friendly") + build_tasks(RESUME, JDS[1], "calm")
+    tasks.append(build_combined_task(RESUME, JDS[0], "friendly"))
+    prefix = tasks[0].cache_prefix
+
+    assert RESUME in prefix and JDS[0] not in prefix
+    assert all(task.cache_prefix == prefix for task in tasks)
+    assert all(task.contents.startswith(prefix) for task in tasks)
+
+
+def test_unranked_compression_does_not_depend_on_the_job():
+    long_resume = RESUME + "\n".join(f"- Shipped project {i}" for i in range(500))
+    long_resume += "\n- Operated Kubernetes clusters for 40 teams"
+    first = compress(long_resume, JDS[0], rank=False)
+    second = compress(long_resume, JDS[1], rank=False)
+
+    assert first.resume == second.resume
+    assert "Kubernetes" not in first.resume
+    assert "Kubernetes" in compress(long_resume, JDS[1]).resume
+
+
+def test_calls_for_the_same_resume_share_one_cached_prefix(upstream):
+    context_cache = ContextCache(ttl=60, min_tokens=10)
+
+    results = _generate_all(upstream, context_cache)
+
+    assert all(generated.cover_letter and generated.bullets for generated, _ in results)
+    assert len(upstream.app.state.cached_contents) == 1
+    assert upstream.app.state.cached_calls == 4
+    assert context_cache.stats()["created"] == 1
+    assert context_cache.stats()["hits"] == 3
+
+
+@pytest.mark.parametrize("upstream", [{"context_caching": False}], indirect=True)
+def test_unsupported_caching_falls_back_to_full_prompts(upstream):
+    context_cache = ContextCache(ttl=60, min_tokens=10)
+
+    results = _generate_all(upstream, context_cache)
+
+    assert all(generated.cover_letter for generated, _ in results)
+    assert upstream.app.state.cached_calls == 0
+    # One failed create, then the model is skipped during the cooldown
+    assert context_cache.stats()["errors"] == 1
+    assert context_cache.stats()["skipped"] == 3
+
+
+def test_cache_expired_upstream_is_replaced(upstream):
+    context_cache = ContextCache(ttl=60, min_tokens=10)
+    _generate_all(upstream, context_cache, jds=JDS[:1])
+    upstream.app.state.cached_contents.clear()
+
+    results = _generate_all(upstream, context_cache, jds=JDS[1:])
+
+    assert results[0][0].cover_letter
+    assert context_cache.stats()["invalidated"] == 1
+    # The next lookup registers the prefix again
+    _generate_all(upstream, context_cache, jds=JDS[:1])
+    assert len(upstream.app.state.cached_contents) == 1
+    assert context_cache.stats()["created"] == 2
+
+
+def test_stream_falls_back_when_the_cache_is_gone(upstream):
+    context_cache = ContextCache(ttl=60, min_tokens=10)
+    task = build_tasks(RESUME, JDS[0], "friendly")[0]
+
+    async def run():
+        client = _client(upstream)
+        await context_cache.lookup(client, task.model, task.cache_prefix)
+        upstream.app.state.cached_contents.clear()
+        stream = await call_upstream(client, task, stream=True)
+        return "".join([chunk.text async for chunk in stream])
+
+    with patch("app.routers.generate.CONTEXT_CACHE", True), \
+            patch("app.routers.generate.get_context_cache", return_value=context_cache):
+        text = asyncio.run(run())
+
+    assert text == "Generated by the fake Gemini server."
+    assert context_cache.stats()["invalidated"] == 1
+
+
+def test_short_prefixes_are_not_cached(upstream):
+    context_cache = ContextCache(ttl=60, min_tokens=1024)
+
+    _generate_all(upstream, context_cache, jds=JDS[:1])
+
+    assert upstream.app.state.cached_contents == {}
+    assert context_cache.stats()["skipped"] == 2
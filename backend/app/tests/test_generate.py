@@ -1,9 +1,6 @@
 # test_generate.py
-from app.deps import verify_api_key
 from app.routers.generate import SAFE_MIN
-from app.main import app
 import pytest
-from fastapi.testclient import TestClient
 from unittest.mock import Mock, patch, MagicMock
 from fastapi import HTTPException
 import sys
@@ -13,27 +10,6 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 
-# Mock dependency function
-
-def override_verify_api_key():
-    """Override API key verification for tests"""
-    return "test-api-key-12345"
-
-
-# Override the dependency before creating the test client
-app.dependency_overrides[verify_api_key] = override_verify_api_key
-
-
-# Create test client
-@pytest.fixture(scope="module")
-def test_client():
-    """Create test client with dependency overrides"""
-    client = TestClient(app)
-    yield client
-    # Cleanup
-    app.dependency_overrides.clear()
-
-
 # Test fixtures
 @pytest.fixture
 def valid_resume():
@@ -59,16 +35,6 @@ def valid_job_description():
     """ * 2
 
 
-@pytest.fixture
-def valid_request_payload(valid_resume, valid_job_description):
-    """Generate valid request payload"""
-    return {
-        "resume_text": valid_resume,
-        "job_description": valid_job_description,
-        "tone_hint": "professional"
-    }
-
-
 @pytest.fixture
 def auth_headers():
     """Generate auth headers"""
@@ -81,11 +47,12 @@ def test_generate_all_success(
     mock_get_client,
     test_client,
     valid_request_payload,
-    auth_headers
+    auth_headers,
+    make_mock_client
 ):
     """Test successful generation of cover letter and bullets"""
     # Mock AI client responses
-    mock_client = MagicMock()
+    mock_client = make_mock_client()
 
     mock_cover_response = MagicMock()
     mock_cover_response.text = """Dear Hiring Manager,
@@ -103,7 +70,7 @@ Implemented CI/CD pipelines reducing deployment time by 60%.
 Designed and deployed scalable FastAPI applications serving 1M+ users.
 Optimized database queries improving response time by 40%."""
 
-    mock_client.models.generate_content.side_effect = [
+    mock_client.aio.models.generate_content.side_effect = [
         mock_cover_response,
         mock_bullets_response
     ]
@@ -209,15 +176,16 @@ def test_generate_all_empty_cover_letter(
     mock_get_client,
     test_client,
     valid_request_payload,
-    auth_headers
+    auth_headers,
+    make_mock_client
 ):
     """Test handling when AI returns empty cover letter"""
-    mock_client = MagicMock()
+    mock_client = make_mock_client()
     mock_cover_response = MagicMock()
     mock_cover_response.text = ""  # Empty response
     mock_cover_response.__bool__ = lambda self: True  # Make it truthy
 
-    mock_client.models.generate_content.return_value = mock_cover_response
+    mock_client.aio.models.generate_content.return_value = mock_cover_response
     mock_get_client.return_value = mock_client
 
     response = test_client.post(
@@ -235,10 +203,11 @@ def test_generate_all_empty_bullets(
     mock_get_client,
     test_client,
     valid_request_payload,
-    auth_headers
+    auth_headers,
+    make_mock_client
 ):
     """Test handling when AI returns empty bullets"""
-    mock_client = MagicMock()
+    mock_client = make_mock_client()
 
     mock_cover_response = MagicMock()
     mock_cover_response.text = "Valid cover letter content here with sufficient length"
@@ -247,7 +216,7 @@ def test_generate_all_empty_bullets(
     mock_bullets_response.text = ""  # Empty bullets
     mock_bullets_response.__bool__ = lambda self: True
 
-    mock_client.models.generate_content.side_effect = [
+    mock_client.aio.models.generate_content.side_effect = [
         mock_cover_response,
         mock_bullets_response
     ]
@@ -277,13 +246,14 @@ def test_generate_all_tone_variations(
     valid_resume,
     valid_job_description,
     auth_headers,
-    tone
+    tone,
+    make_mock_client
 ):
     """Test different tone hint values"""
-    mock_client = MagicMock()
+    mock_client = make_mock_client()
     mock_response = MagicMock()
     mock_response.text = "Generated content with sufficient length for validation and testing purposes"
-    mock_client.models.generate_content.return_value = mock_response
+    mock_client.aio.models.generate_content.return_value = mock_response
     mock_get_client.return_value = mock_client
 
     payload = {
@@ -308,11 +278,12 @@ def test_generate_all_ai_client_exception(
     mock_get_client,
     test_client,
     valid_request_payload,
-    auth_headers
+    auth_headers,
+    make_mock_client
 ):
     """Test handling when AI client raises exception"""
-    mock_client = MagicMock()
-    mock_client.models.generate_content.side_effect = Exception(
+    mock_client = make_mock_client()
+    mock_client.aio.models.generate_content.side_effect = Exception(
         "AI service unavailable")
     mock_get_client.return_value = mock_client
 
@@ -331,10 +302,11 @@ def test_generate_all_response_structure(
     mock_get_client,
     test_client,
     valid_request_payload,
-    auth_headers
+    auth_headers,
+    make_mock_client
 ):
     """Test that response has correct structure"""
-    mock_client = MagicMock()
+    mock_client = make_mock_client()
 
     mock_cover_response = MagicMock()
     mock_cover_response.text = "Cover letter content with enough text"
@@ -342,7 +314,7 @@ def test_generate_all_response_structure(
     mock_bullets_response = MagicMock()
     mock_bullets_response.text = "Bullet point content with details"
 
-    mock_client.models.generate_content.side_effect = [
+    mock_client.aio.models.generate_content.side_effect = [
         mock_cover_response,
         mock_bullets_response
     ]
@@ -371,10 +343,11 @@ def test_generate_all_full_flow(
     mock_get_client,
     test_client,
     valid_request_payload,
-    auth_headers
+    auth_headers,
+    make_mock_client
 ):
     """Integration test for complete generation flow"""
-    mock_client = MagicMock()
+    mock_client = make_mock_client()
 
     mock_cover_response = MagicMock()
     mock_cover_response.text = """Dear Hiring Manager,
@@ -399,7 +372,7 @@ Implemented CI/CD pipelines with GitHub Actions, improving deployment frequency
 Integrated AI/ML models into production APIs serving 1M+ daily requests.
 Designed and optimized PostgreSQL database schemas handling 10TB+ of data."""
 
-    mock_client.models.generate_content.side_effect = [
+    mock_client.aio.models.generate_content.side_effect = [
         mock_cover_response,
         mock_bullets_response
     ]
@@ -423,7 +396,7 @@ Designed and optimized PostgreSQL database schemas handling 10TB+ of data."""
     assert len(data["bullets"]) > 50
 
     # Verify AI client was called
-    assert mock_client.models.generate_content.call_count == 2
+    assert mock_client.aio.models.generate_content.call_count == 2
 
 
 # Test: Input sanitization
@@ -431,13 +404,14 @@ Designed and optimized PostgreSQL database schemas handling 10TB+ of data."""
 def test_generate_all_with_special_characters(
     mock_get_client,
     test_client,
-    auth_headers
+    auth_headers,
+    make_mock_client
 ):
     """Test handling of special characters in input"""
-    mock_client = MagicMock()
+    mock_client = make_mock_client()
     mock_response = MagicMock()
     mock_response.text = "Safe content generated successfully"
-    mock_client.models.generate_content.return_value = mock_response
+    mock_client.aio.models.generate_content.return_value = mock_response
     mock_get_client.return_value = mock_client
 
     base_resume = "Software Engineer with experience in Python. " * 20
@@ -458,5 +432,95 @@ def test_generate_all_with_special_characters(
     assert response.status_code in [200, 422]
 
 
+def _by_prompt(cover_text, bullets_text):
+    """Build a make_mock_client answer that replies per prompt type"""
+    def answer(*, model, contents, config):
+        if "Output: 6-8 optimized bullets" in contents:
+            return bullets_text
+        return cover_text
+    return answer
+
+
+# Test: Both generation calls are in flight at the same time
+@patch('app.routers.generate.get_cached_client')
+def test_generate_all_runs_tasks_concurrently(
+    mock_get_client,
+    test_client,
+    valid_request_payload,
+    auth_headers,
+    make_mock_client
+):
+    """Both upstream calls must overlap on the event loop"""
+    in_flight = {"now": 0, "max": 0}
+    mock_client = make_mock_client(
+        answer=_by_prompt("Cover letter content", "Bullet content"),
+        delay=0.05, in_flight=in_flight)
+    mock_get_client.return_value = mock_client
+
+    response = test_client.post(
+        "/generate/all",
+        json=valid_request_payload,
+        headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    assert response.json()["cover_letter"] == "Cover letter content"
+    assert response.json()["bullets"] == "Bullet content"
+    assert response.json()["failed_sections"] == []
+    assert in_flight["max"] == 2
+    mock_client.models.generate_content.assert_not_called()
+
+
+# Test: Partial results keep the section that succeeded
+@patch('app.routers.generate.ALLOW_PARTIAL_RESULTS', True)
+@patch('app.routers.generate.get_cached_client')
+def test_generate_all_partial_results(
+    mock_get_client,
+    test_client,
+    valid_request_payload,
+    auth_headers,
+    make_mock_client
+):
+    """An empty bullets call does not throw away the cover letter"""
+    mock_client = make_mock_client(answer=_by_prompt("Cover letter content", ""))
+    mock_get_client.return_value = mock_client
+
+    response = test_client.post(
+        "/generate/all",
+        json=valid_request_payload,
+        headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["cover_letter"] == "Cover letter content"
+    assert data["bullets"] == ""
+    assert data["failed_sections"] == ["bullets"]
+
+
+# Test: Sequential mode stops at the first failure
+@patch('app.routers.generate.PARALLEL_GENERATION', False)
+@patch('app.routers.generate.get_cached_client')
+def test_generate_all_sequential_stops_on_failure(
+    mock_get_client,
+    test_client,
+    valid_request_payload,
+    auth_headers,
+    make_mock_client
+):
+    """With parallel generation off, bullets are not requested after a failed cover letter"""
+    mock_client = make_mock_client(answer=_by_prompt("", "Bullet content"))
+    mock_get_client.return_value = mock_client
+
+    response = test_client.post(
+        "/generate/all",
+        json=valid_request_payload,
+        headers=auth_headers
+    )
+
+    assert response.status_code == 500
+    assert mock_client.aio.models.generate_content.call_count == 1
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--tb=short"])
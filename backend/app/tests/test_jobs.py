@@ -0,0 +1,154 @@
+# test_jobs.py
+from app import jobs
+from app.jobs import JobStore, JobWorkerPool
+from app.main import app
+import asyncio
+import pytest
+import time
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, patch
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = JobStore(path=str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(jobs, "_store", store)
+    return store
+
+
+@pytest.fixture
+def test_client(store, api_key_override):
+    """Test client with the lifespan (and so the worker pool) running"""
+    with TestClient(app) as client:
+        yield client
+
+
+def test_store_claims_in_order_and_once(store):
+    first = store.enqueue({"n": 1})
+    second = store.enqueue({"n": 2})
+
+    assert store.claim()["id"] == first
+    assert store.claim()["id"] == second
+    assert store.claim() is None
+
+
+def test_store_reclaims_expired_lease(tmp_path):
+    store = JobStore(path=str(tmp_path / "jobs.sqlite3"), lease=0, max_attempts=2)
+    job_id = store.enqueue({})
+
+    assert store.claim()["attempts"] == 1
+    time.sleep(0.01)
+    assert store.claim()["attempts"] == 2
+    time.sleep(0.01)
+    assert store.claim() is None
+    assert store.get(job_id)["status"] == "failed"
+
+
+def test_store_survives_restart(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    job_id = JobStore(path=path).enqueue({"n": 1})
+
+    assert JobStore(path=path).claim()["payload"] == {"n": 1}
+    assert JobStore(path=path).get(job_id)["status"] == "running"
+
+
+def test_worker_pool_records_results_and_errors(store):
+    async def handler(payload):
+        if payload.get("fail"):
+            raise HTTPException(status_code=504, detail="Request timeout.")
+        return {"ok": payload["n"]}
+
+    async def main():
+        pool = JobWorkerPool(store, handler, workers=2, poll_interval=0.01)
+        good = store.enqueue({"n": 1})
+        bad = store.enqueue({"fail": True})
+        pool.start()
+        pool.notify()
+        while set(store.counts()) - {"succeeded", "failed"}:
+            await asyncio.sleep(0.01)
+        await pool.stop()
+        return store.get(good), store.get(bad)
+
+    good, bad = asyncio.run(main())
+
+    assert good["status"] == "succeeded"
+    assert good["result"] == {"ok": 1}
+    assert bad["status"] == "failed"
+    assert bad["status_code"] == 504
+    assert bad["error"] == "Request timeout."
+
+
+def test_unwritable_queue_path_fails_clearly(tmp_path):
+    with pytest.raises(RuntimeError, match="JOB_QUEUE_PATH"):
+        JobStore(path=str(tmp_path / "missing" / "jobs.sqlite3"))
+
+
+def test_workers_keep_store_calls_off_the_event_loop(store):
+    """A claim stuck behind another process's lock does not stall the loop"""
+    claim = store.claim
+
+    def slow_claim():
+        time.sleep(0.2)
+        return claim()
+
+    async def main():
+        pool = JobWorkerPool(store, AsyncMock(), workers=1, poll_interval=0.01)
+        with patch.object(store, "claim", slow_claim):
+            started = time.perf_counter()
+            pool.start()
+            for _ in range(10):
+                await asyncio.sleep(0.001)
+            elapsed = time.perf_counter() - started
+            await pool.stop()
+        return elapsed
+
+    assert asyncio.run(main()) < 0.15
+
+
+@patch('app.routers.generate.get_cached_client')
+def test_job_lifecycle(mock_get_client, test_client, valid_request_payload, make_mock_client):
+    """Submitting returns an id immediately; long-polling returns the result"""
+    mock_get_client.return_value = make_mock_client()
+
+    submitted = test_client.post("/generate/jobs", json=valid_request_payload)
+
+    assert submitted.status_code == 202
+    job_id = submitted.json()["id"]
+    assert submitted.json()["status_url"] == f"/generate/jobs/{job_id}"
+
+    response = test_client.get(f"/generate/jobs/{job_id}", params={"wait": 5})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "succeeded"
+    assert data["result"]["cover_letter"] == "Generated content"
+    assert data["result"]["bullets"] == "Generated content"
+
+
+@patch('app.routers.generate.get_cached_client')
+def test_job_failure_is_reported(
+    mock_get_client, test_client, valid_request_payload, make_mock_client
+):
+    mock_get_client.return_value = make_mock_client(text="")
+
+    job_id = test_client.post(
+        "/generate/jobs", json=valid_request_payload).json()["id"]
+    data = test_client.get(
+        f"/generate/jobs/{job_id}", params={"wait": 5}).json()
+
+    assert data["status"] == "failed"
+    assert data["status_code"] == 500
+    assert data["result"] is None
+
+
+def test_job_submit_validates_input(test_client):
+    payload = {"resume_text": "short", "job_description": "short"}
+
+    response = test_client.post("/generate/jobs", json=payload)
+
+    assert response.status_code == 422
+
+
+def test_unknown_job_is_404(test_client):
+    assert test_client.get("/generate/jobs/missing").status_code == 404
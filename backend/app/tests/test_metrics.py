@@ -0,0 +1,94 @@
+# test_metrics.py
+from prometheus_client import REGISTRY
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_generation_records_latency_and_tokens(test_client, make_payload, make_mock_client):
+    model = "gemini-2.5-flash"
+    before = {
+        "calls": _sample("gemini_request_duration_seconds_count",
+                         task="cover_letter", model=model, outcome="ok"),
+        "prompt": _sample("gemini_tokens_total",
+                          task="bullets", model=model, kind="prompt"),
+        "completion": _sample("gemini_tokens_total",
+                              task="bullets", model=model, kind="completion"),
+        "requests": _sample("http_request_duration_seconds_count",
+                            method="POST", route="/generate/all", status="200"),
+    }
+
+    mock_client = make_mock_client()
+    usage = mock_client.aio.models.generate_content.return_value.usage_metadata
+    usage.prompt_token_count = 120
+    usage.candidates_token_count = 30
+    usage.thoughts_token_count = None
+    usage.cached_content_token_count = None
+    with patch("app.routers.generate.get_cached_client", return_value=mock_client):
+        response = test_client.post(
+            "/generate/all", json=make_payload("Python engineer recording latency metrics. "))
+
+    assert response.status_code == 200
+    assert _sample("gemini_request_duration_seconds_count", task="cover_letter",
+                   model=model, outcome="ok") == before["calls"] + 1
+    assert _sample("gemini_tokens_total", task="bullets", model=model,
+                   kind="prompt") == before["prompt"] + 120
+    assert _sample("gemini_tokens_total", task="bullets", model=model,
+                   kind="completion") == before["completion"] + 30
+    assert _sample("http_request_duration_seconds_count", method="POST",
+                   route="/generate/all", status="200") == before["requests"] + 1
+    assert _sample("gemini_requests_in_flight", task="cover_letter") == 0
+
+
+def test_timeouts_are_counted(test_client, make_payload, make_mock_client):
+    before = _sample("gemini_timeouts_total", task="cover_letter")
+
+    mock_client = make_mock_client()
+    # Surfaces from asyncio.wait_for exactly like an expired REQUEST_TIMEOUT
+    mock_client.aio.models.generate_content.side_effect = asyncio.TimeoutError
+    with patch("app.routers.generate.get_cached_client", return_value=mock_client):
+        response = test_client.post(
+            "/generate/all", json=make_payload("Python engineer whose generation times out. "))
+
+    assert response.status_code == 504
+    assert _sample("gemini_timeouts_total", task="cover_letter") == before + 1
+
+
+def test_metrics_endpoint_is_exposed_and_not_rate_limited(test_client):
+    for _ in range(3):
+        response = test_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "gemini_request_duration_seconds_bucket" in response.text
+    assert "generation_cache_requests_total" in response.text
+
+
+def test_multiprocess_mode_aggregates_workers(tmp_path):
+    backend = Path(__file__).parent.parent.parent
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    worker = (
+        "from app.metrics import CACHE_REQUESTS, IN_FLIGHT, mark_process_dead\n"
+        "CACHE_REQUESTS.labels('hit').inc(2)\n"
+        "IN_FLIGHT.labels('bullets').inc()\n"
+        "mark_process_dead()\n"
+    )
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", worker], cwd=backend, env=env,
+                       check=True)
+
+    scrape = subprocess.run(
+        [sys.executable, "-c",
+         "from app.metrics import render_metrics; print(render_metrics()[0].decode())"],
+        cwd=backend, env=env, check=True, capture_output=True, text=True)
+
+    assert 'generation_cache_requests_total{result="hit"} 4.0' in scrape.stdout
+    # livesum gauges drop workers that shut down
+    assert 'gemini_requests_in_flight{task="bullets"}' not in scrape.stdout
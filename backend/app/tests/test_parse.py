@@ -0,0 +1,152 @@
+# test_parse.py
+from app.main import app
+from app.parsing import ParserPool, read_upload
+from benchmarks.bench_parse import make_docx, make_pdf
+import asyncio
+import hashlib
+import io
+import time
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+
+@pytest.fixture
+def client():
+    with patch("app.routers.parse.get_parser_pool", return_value=ParserPool(workers=0)):
+        yield TestClient(app)
+
+
+def _upload(client, name: str, data: bytes):
+    return client.post("/parse/resume-text", files={"file": (name, data)})
+
+
+def test_pdf_text_and_page_count(client):
+    response = _upload(client, "resume.pdf", make_pdf(3))
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["format"] == "pdf" and body["pages"] == 3
+    assert "Senior Python engineer" in body["text"]
+    assert body["characters"] == len(body["text"])
+
+
+def test_docx_paragraphs_and_page_count(client):
+    body = _upload(client, "resume.docx", make_docx(2)).json()
+
+    assert body["format"] == "docx" and body["pages"] == 2
+    assert body["text"].splitlines()[1].startswith("Led the migration")
+
+
+def test_txt_is_still_accepted(client):
+    data = "Café owner\r\nPython developer\n\n\n".encode()
+    body = _upload(client, "resume.txt", data).json()
+
+    assert body == {"text": "Café owner\nPython developer", "format": "txt",
+                    "pages": None, "characters": 27, "truncated": False,
+                    "fingerprint": hashlib.sha256(data).hexdigest()}
+
+
+@pytest.mark.parametrize("name, data, status", [
+    ("resume.png", b"\x89PNG....", 400),
+    ("resume.pdf", b"just text pretending", 422),
+    ("resume.docx", b"PK\x03\x04 not really a zip", 422),
+    ("resume.pdf", b"%PDF-1.4 truncated", 422),
+])
+def test_bad_uploads_are_rejected(client, name, data, status):
+    assert _upload(client, name, data).status_code == status
+
+
+def test_repeated_upload_is_served_from_the_cache():
+    pool = ParserPool(workers=0)
+    data = make_pdf(2)
+
+    with patch("app.routers.parse.get_parser_pool", return_value=pool), \
+            patch.object(pool, "parse", wraps=pool.parse) as parse:
+        client = TestClient(app)
+        first = _upload(client, "resume.pdf", data)
+        # Same bytes under another name: still the same fingerprint
+        second = _upload(client, "copy.pdf", data)
+
+    assert first.headers["x-cache"] == "miss" and second.headers["x-cache"] == "hit"
+    assert first.json() == second.json()
+    assert first.json()["fingerprint"] == hashlib.sha256(data).hexdigest()
+    assert parse.await_count == 1
+
+
+def test_generation_accepts_the_fingerprint_instead_of_the_text(
+    client, api_key_override, make_mock_client
+):
+    resume = ("Senior Python engineer who builds services from uploaded resumes. " * 5).encode()
+    fingerprint = _upload(client, "resume.txt", resume).json()["fingerprint"]
+    mock_client = make_mock_client()
+    payload = {"job_description": "Backend engineer with Python and cloud experience. " * 5}
+    with patch("app.routers.generate.get_cached_client", return_value=mock_client):
+        ok = client.post("/generate/all", json={**payload, "resume_hash": fingerprint})
+        unknown = client.post("/generate/all", json={**payload, "resume_hash": "0" * 64})
+
+    assert ok.status_code == 200
+    contents = mock_client.aio.models.generate_content.await_args.kwargs["contents"]
+    assert "builds services from uploaded resumes" in contents
+    assert unknown.status_code == 404
+
+
+def test_oversized_upload_is_cut_off(client):
+    with patch("app.routers.parse.PARSE_MAX_BYTES", 1024):
+        response = _upload(client, "resume.txt", b"x" * 100_000)
+
+    assert response.status_code == 413
+
+
+def test_upload_is_read_in_chunks_up_to_the_limit():
+    class Upload:
+        def __init__(self):
+            self.file = io.BytesIO(b"x" * 1_000_000)
+            self.reads = 0
+
+        async def read(self, size: int) -> bytes:
+            self.reads += 1
+            return self.file.read(size)
+
+    upload = Upload()
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(read_upload(upload, max_bytes=100_000))
+
+    assert error.value.status_code == 413
+    assert upload.reads == 2
+
+
+def test_busy_pool_sheds_new_parses():
+    pool = ParserPool(workers=0, max_pending=0)
+
+    async def run():
+        first = asyncio.create_task(pool.run(time.sleep, 0.2))
+        await asyncio.sleep(0.01)
+        with pytest.raises(HTTPException) as error:
+            await pool.run(time.sleep, 0)
+        await first
+        return error.value
+
+    error = asyncio.run(run())
+    assert error.status_code == 503 and "retry-after" in {k.lower() for k in error.headers}
+
+
+def test_stuck_worker_is_killed_after_the_timeout():
+    pool = ParserPool(workers=1, timeout=0.5)
+
+    async def run():
+        with pytest.raises(HTTPException) as error:
+            await pool.run(time.sleep, 30)
+        assert error.value.status_code == 504
+        # A fresh worker serves the next file
+        return await pool.parse(make_pdf(1), "resume.pdf")
+
+    started = time.perf_counter()
+    try:
+        result = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert result["pages"] == 1
+    assert pool.restarts == 1 and pool.timeouts == 1
+    assert time.perf_counter() - started < 15
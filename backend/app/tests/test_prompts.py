@@ -0,0 +1,56 @@
+# test_prompts.py
+from app.prompts import (
+    COVER_LETTER_TASK_PROMPT, COVER_LETTER_TASK_TEMPLATE, RESUME_BULLETS_TASK_PROMPT,
+    RESUME_PREFIX_PROMPT, RESUME_PREFIX_TEMPLATE, PromptTemplate, escape)
+import pytest
+
+
+def test_template_compiles_into_segments_and_slots():
+    template = PromptTemplate("Resume:\n{{RESUME}}\nJD:\n{{JD}}")
+
+    assert template.segments == ["Resume:\n", "", "\nJD:\n", ""]
+    assert template.slots == [(1, "RESUME"), (3, "JD")]
+    assert template.fields == {"RESUME", "JD"}
+
+
+def test_render_matches_chained_replace_for_plain_input():
+    resume, jd, tone = "Python engineer", "Backend role", "friendly"
+    expected = ((RESUME_PREFIX_TEMPLATE + COVER_LETTER_TASK_TEMPLATE)
+                .replace("{{RESUME}}", resume)
+                .replace("{{JD}}", jd)
+                .replace("{{TONE}}", tone))
+
+    rendered = (RESUME_PREFIX_PROMPT.render(RESUME=resume)
+                + COVER_LETTER_TASK_PROMPT.render(JD=jd, TONE=tone))
+    assert rendered == expected
+
+
+def test_placeholders_in_user_input_are_not_substituted():
+    rendered = (RESUME_PREFIX_PROMPT.render(RESUME="I wrote {{JD}} templates")
+                + RESUME_BULLETS_TASK_PROMPT.render(JD="SECRET JOB TEXT"))
+
+    assert rendered.count("SECRET JOB TEXT") == 1
+    assert "{{JD}}" not in rendered
+    assert "I wrote { {JD} } templates" in rendered
+
+
+def test_escape_leaves_plain_text_untouched():
+    text = "no placeholders {here}"
+    assert escape(text) is text
+
+
+def test_render_requires_exactly_the_template_fields():
+    with pytest.raises(ValueError):
+        RESUME_BULLETS_TASK_PROMPT.render()
+    with pytest.raises(ValueError):
+        RESUME_BULLETS_TASK_PROMPT.render(JD="jd", TONE="tone")
+    with pytest.raises(ValueError):
+        RESUME_PREFIX_PROMPT.render(RESUME="resume", JD="jd")
+
+
+def test_length_and_tokens_without_rendering():
+    values = {"JD": "j" * 1000 + "{{", "TONE": "calm"}
+    rendered = COVER_LETTER_TASK_PROMPT.render(**values)
+
+    assert COVER_LETTER_TASK_PROMPT.length(**values) == len(rendered)
+    assert COVER_LETTER_TASK_PROMPT.estimated_tokens(**values) == -(-len(rendered) // 4)
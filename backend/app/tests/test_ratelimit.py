@@ -0,0 +1,124 @@
+# test_ratelimit.py
+from app import ratelimit
+from app.main import app
+from app.ratelimit import SQLiteStorage, api_key_identity, limiter, rate_limit_key_func
+import sqlite3
+import time
+import pytest
+from fastapi.testclient import TestClient
+from limits import parse
+from limits.strategies import SlidingWindowCounterRateLimiter
+from unittest.mock import MagicMock, patch
+
+
+def _storage(tmp_path, **options):
+    return SQLiteStorage("sqlite:///" + str(tmp_path / "ratelimit.sqlite3"), **options)
+
+
+def test_sliding_window_blocks_over_limit(tmp_path):
+    limiter = SlidingWindowCounterRateLimiter(_storage(tmp_path))
+    item = parse("3/minute")
+
+    assert [limiter.hit(item, "1.2.3.4") for _ in range(4)] == [True, True, True, False]
+    assert limiter.hit(item, "5.6.7.8")
+
+
+def test_limits_are_shared_between_processes(tmp_path):
+    """Two storages on one file behave like two uvicorn workers"""
+    first = SlidingWindowCounterRateLimiter(_storage(tmp_path))
+    second = SlidingWindowCounterRateLimiter(_storage(tmp_path))
+    item = parse("2/minute")
+
+    assert first.hit(item, "key")
+    assert second.hit(item, "key")
+    assert not first.hit(item, "key")
+    assert not second.hit(item, "key")
+
+
+def test_counters_use_constant_rows_per_key(tmp_path):
+    storage = _storage(tmp_path)
+    limiter = SlidingWindowCounterRateLimiter(storage)
+    item = parse("1000/minute")
+
+    for _ in range(100):
+        limiter.hit(item, "key")
+
+    assert len(storage) == 1
+    assert storage.get_sliding_window(item.key_for("key"), 60)[2] == 100
+
+
+def test_idle_keys_are_evicted(tmp_path):
+    storage = _storage(tmp_path)
+    storage.incr("idle", expiry=0.01)
+    storage.incr("active", expiry=60)
+    time.sleep(0.02)
+
+    assert storage.purge() == 1
+    assert storage.get("idle") == 0
+    assert storage.get("active") == 1
+
+
+def test_expired_counter_starts_over(tmp_path):
+    storage = _storage(tmp_path)
+    storage.incr("key", expiry=0.01, amount=5)
+    time.sleep(0.02)
+
+    assert storage.incr("key", expiry=60) == 1
+
+
+def _request(headers=None):
+    request = MagicMock()
+    request.headers = headers or {}
+    request.client.host = "1.2.3.4"
+    return request
+
+
+def test_key_func_uses_ip_by_default():
+    assert rate_limit_key_func(_request({"x-api-key": "secret"})) == "1.2.3.4"
+
+
+@patch.object(ratelimit, "RATE_LIMIT_KEY_BY", "api_key")
+@patch.object(ratelimit, "X_API_KEY", "secret")
+def test_key_func_uses_valid_api_key_when_configured():
+    assert rate_limit_key_func(_request({"x-api-key": "secret"})) == api_key_identity("secret")
+    assert rate_limit_key_func(_request({"x-api-key": "made-up"})) == "1.2.3.4"
+    assert rate_limit_key_func(_request()) == "1.2.3.4"
+
+
+def test_api_key_identity_hides_the_key():
+    identity = api_key_identity("secret")
+
+    assert "secret" not in identity
+    assert identity == api_key_identity("secret")
+
+
+def test_unwritable_storage_path_fails_clearly(tmp_path):
+    with pytest.raises(RuntimeError, match="RATE_LIMIT_STORAGE_URI"):
+        SQLiteStorage("sqlite:///" + str(tmp_path / "missing" / "ratelimit.sqlite3"))
+
+
+def test_locked_storage_falls_back_instead_of_failing():
+    """Another worker holding the write lock does not turn requests into 500s"""
+    client = TestClient(app)
+    other_worker = sqlite3.connect(limiter._storage.path, isolation_level=None)
+    other_worker.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.perf_counter()
+        statuses = [client.get("/").status_code for _ in range(3)]
+        elapsed = time.perf_counter() - started
+    finally:
+        other_worker.execute("ROLLBACK")
+        other_worker.close()
+
+    assert statuses == [200] * 3
+    assert elapsed < 1
+
+
+def test_default_limits_apply_app_wide():
+    """The shared limiter enforces the 50/hour default on undecorated routes"""
+    client = TestClient(app)
+
+    statuses = [client.get("/").status_code for _ in range(51)]
+
+    assert statuses[:50] == [200] * 50
+    assert statuses[50] == 429
@@ -0,0 +1,195 @@
+# test_resilience.py
+from app import resilience
+from app.admission import AdmissionController, admission_key
+from app.resilience import (
+    CircuitBreaker, CircuitOpenError, backoff, call_with_resilience, get_breaker,
+    get_latency_tracker, request_deadline)
+from app.routers.generate import generate_with_timeout
+from app.routing import ModelRouter, ModelTier
+import asyncio
+import time
+import pytest
+from fastapi import HTTPException
+from google.genai import errors as genai_errors
+from unittest.mock import AsyncMock, patch
+
+
+def _error(code):
+    body = {"error": {"code": code, "message": "upstream", "status": "X"}}
+    if code >= 500:
+        return genai_errors.ServerError(code, body)
+    return genai_errors.ClientError(code, body)
+
+
+@pytest.fixture(autouse=True)
+def instant_backoff():
+    with patch.object(resilience, "UPSTREAM_RETRY_BASE_DELAY", 0.001):
+        yield
+
+
+def test_backoff_is_jittered_within_the_exponential_cap():
+    delays = [backoff(3, base=0.5, cap=2.0) for _ in range(200)]
+
+    assert all(0 <= delay <= 2.0 for delay in delays)
+    assert len(set(delays)) > 100
+    assert all(backoff(1, base=0.5, cap=10) <= 1.0 for _ in range(50))
+
+
+def test_transient_errors_are_retried():
+    factory = AsyncMock(side_effect=[_error(503), _error(429), "ok"])
+
+    assert asyncio.run(call_with_resilience(factory, "test")) == "ok"
+    assert factory.await_count == 3
+    assert get_breaker("test").failures == 0
+
+
+def test_client_errors_are_not_retried():
+    factory = AsyncMock(side_effect=_error(400))
+
+    with pytest.raises(genai_errors.ClientError):
+        asyncio.run(call_with_resilience(factory, "test"))
+    assert factory.await_count == 1
+    assert get_breaker("test").failures == 0
+
+
+def test_timeouts_are_not_retried_but_count_against_the_circuit():
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        await asyncio.sleep(1.0)
+
+    async def run():
+        with request_deadline(0.05):
+            await call_with_resilience(factory, "test")
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run())
+    assert len(calls) == 1
+    assert get_breaker("test").failures == 1
+
+
+def test_circuit_opens_then_probes_after_reset_timeout():
+    breaker = CircuitBreaker("probe", threshold=2, reset_timeout=0.05)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.failure()
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    # Only one probe at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.success()
+    assert breaker.state == "closed"
+
+
+def test_open_circuit_fails_fast_with_503(test_client, valid_request_payload, make_mock_client):
+    mock_client = make_mock_client()
+    mock_client.aio.models.generate_content.side_effect = _error(503)
+    # A single model tier, so no fallback model takes over
+    router = ModelRouter(routes={
+        "cover_letter": [ModelTier("gemini-2.5-flash")],
+        "bullets": [ModelTier("gemini-2.5-flash")],
+    })
+    with patch("app.routers.generate.get_cached_client", return_value=mock_client), \
+            patch("app.routers.generate.get_model_router", return_value=router), \
+            patch("app.routers.generate.PARALLEL_GENERATION", False):
+        first = test_client.post("/generate/all", json=valid_request_payload)
+        calls = mock_client.aio.models.generate_content.await_count
+        second = test_client.post("/generate/all", json=valid_request_payload)
+
+    # 1 + UPSTREAM_RETRIES attempts; the breaker (threshold 5) is still closed
+    assert first.status_code == 500 and calls == 3
+    assert second.status_code == 503
+    assert int(second.headers["retry-after"]) >= 1
+    # Two more attempts opened the circuit, later calls never went out
+    assert mock_client.aio.models.generate_content.await_count == 5
+
+
+def test_slow_call_is_hedged_after_the_p95():
+    tracker = get_latency_tracker()
+    for _ in range(50):
+        tracker.observe("hedge", 0.01)
+    calls = []
+
+    async def factory():
+        calls.append(time.perf_counter())
+        await asyncio.sleep(1.0 if len(calls) == 1 else 0.01)
+        return len(calls)
+
+    async def run():
+        started = time.perf_counter()
+        result = await call_with_resilience(factory, "hedge", task="hedge")
+        return result, time.perf_counter() - started
+
+    with patch.object(resilience, "HEDGE_REQUESTS", True), \
+            patch.object(resilience, "HEDGE_MIN_DELAY", 0.0):
+        result, elapsed = asyncio.run(run())
+
+    assert result == 2 and len(calls) == 2
+    assert elapsed < 0.5
+
+
+def test_hedge_is_skipped_without_a_free_admission_slot():
+    tracker = get_latency_tracker()
+    for _ in range(50):
+        tracker.observe("hedge", 0.01)
+    controller = AdmissionController(max_concurrency=4, per_key=1, queue_depth=10, weights={})
+    calls = []
+
+    async def factory():
+        calls.append(controller.stats()["active"])
+        await asyncio.sleep(0.1)
+        return len(calls)
+
+    async def run():
+        # The slot of the call itself, which uses up the key's limit
+        await controller.acquire("busy")
+        with admission_key("busy"):
+            return await call_with_resilience(factory, "hedge", task="hedge")
+
+    with patch.object(resilience, "HEDGE_REQUESTS", True), \
+            patch.object(resilience, "HEDGE_MIN_DELAY", 0.0), \
+            patch("app.resilience.get_admission_controller", return_value=controller):
+        result = asyncio.run(run())
+
+    assert result == 1 and calls == [1]
+    assert controller.stats()["active"] == 1
+
+
+def test_calls_of_one_request_share_the_deadline():
+    async def slow():
+        await asyncio.sleep(0.2)
+        return "done"
+
+    async def run():
+        with request_deadline(0.3):
+            first = await generate_with_timeout(slow, circuit="deadline")
+            await generate_with_timeout(slow, circuit="deadline")
+        return first
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(run())
+    assert error.value.status_code == 504
+
+
+def test_probe_that_times_out_opens_the_circuit_again():
+    breaker = get_breaker("probe_timeout")
+    breaker.reset_timeout = 0.05
+    for _ in range(breaker.threshold):
+        breaker.failure()
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+
+    async def slow():
+        await asyncio.sleep(1.0)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(generate_with_timeout(slow, timeout=0.05, circuit="probe_timeout"))
+
+    assert error.value.status_code == 504
+    assert breaker.state == "open"
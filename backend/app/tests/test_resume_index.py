@@ -0,0 +1,164 @@
+# test_resume_index.py
+from app.compression import estimate_tokens
+from app.resume_index import analyze, get_index_cache, get_resume_index, parse_dates, select
+from app.uploads import UPLOAD_CACHE_MAX_ENTRIES, get_upload_cache
+import app.resume_index as resume_index
+from unittest.mock import patch
+
+
+RESUME = """Jane Doe
+Senior Backend Engineer
+jane@example.com
+
+EXPERIENCE
+Acme Corp, Staff Engineer
+Jan 2019 - Present
+- Built Python FastAPI services handling 10k rps on AWS
+- Organized the yearly company bake sale
+- Led the Kubernetes migration of 40 services
+Globex, Engineer (03/2015 - 2018)
+Wrote Java Spring batch jobs
+Maintained on-prem Oracle databases
+
+SKILLS
+Languages: Java, Python; Go
+Tools: Docker | Kubernetes, python
+
+EDUCATION
+BSc Computer Science, 2012
+
+HOBBIES
+Knitting and hiking in the mountains every weekend
+"""
+
+JD = "Backend engineer with Python, FastAPI, AWS and Kubernetes experience."
+
+
+def test_analyze_splits_sections_roles_and_skills():
+    index = analyze(RESUME)
+    experience, skills, education, hobbies = index["sections"]
+
+    assert index["header"] == ["Jane Doe", "Senior Backend Engineer", "jane@example.com"]
+    acme, globex = experience["roles"]
+    assert acme["title"] == "Acme Corp, Staff Engineer | Jan 2019 - Present"
+    assert (acme["start"], acme["end"]) == ("2019-01", "present")
+    assert len(acme["bullets"]) == 3
+    # Bullets without markers still belong to their role
+    assert globex["bullets"] == ["Wrote Java Spring batch jobs", "Maintained on-prem Oracle databases"]
+    assert (globex["start"], globex["end"]) == ("2015-03", "2018")
+    assert skills["skills"] == ["Java", "Python", "Go", "Docker", "Kubernetes"]
+    assert education["kind"] == "education" and hobbies["kind"] == "other"
+
+
+def test_parse_dates_normalizes_formats():
+    assert parse_dates("Sept. 2020 – current") == ["2020-09", "present"]
+    assert parse_dates("2014-2016") == ["2014", "2016"]
+    assert parse_dates("Managed 40 services") == []
+
+
+def test_select_keeps_relevant_bullets_and_the_timeline():
+    # The whole resume needs about 140 tokens
+    text = select(analyze(RESUME), JD, budget=120, bullets_per_role=1)
+
+    assert "FastAPI services" in text
+    assert "bake sale" not in text and "Kubernetes migration" not in text
+    # Every role stays, even without a relevant bullet
+    assert "Globex, Engineer (03/2015 - 2018)" in text
+    assert "Python, Kubernetes, Java, Go, Docker" in text
+    assert "BSc Computer Science" in text
+
+
+def test_select_fits_the_budget():
+    text = select(analyze(RESUME), JD, budget=50, bullets_per_role=0)
+
+    assert estimate_tokens(text) <= 50
+    assert text.startswith("Jane Doe")
+    assert "Knitting" not in text
+
+
+def test_unranked_selection_does_not_depend_on_the_job():
+    index = analyze(RESUME)
+
+    text = select(index, JD, budget=120, rank=False, bullets_per_role=2)
+    assert text == select(index, "Pastry chef who organizes bake sales", budget=120,
+                          rank=False, bullets_per_role=2)
+    assert "bake sale" in text and "Kubernetes migration" not in text
+
+
+def test_resume_within_budget_keeps_every_bullet():
+    index = analyze(RESUME)
+
+    text = select(index, JD, bullets_per_role=1)
+
+    assert text == select(index, JD, bullets_per_role=0)
+    assert "bake sale" in text and "Kubernetes migration" in text
+    assert "Maintained on-prem Oracle databases" in text
+
+
+def test_skill_limits_apply_only_over_budget():
+    resume = RESUME.replace("Tools:", "Designed and operated multi-region Kubernetes clusters\nTools:")
+    index = analyze(resume)
+
+    assert "Designed and operated multi-region Kubernetes clusters" in select(index, JD)
+    assert "multi-region" not in select(index, JD, budget=120)
+
+
+def test_index_is_built_once_per_resume():
+    with patch("app.resume_index.analyze", wraps=analyze) as analyzer:
+        first = get_resume_index(RESUME)
+        second = get_resume_index(RESUME)
+
+    assert first == second
+    analyzer.assert_called_once()
+
+
+def test_indexes_do_not_evict_parsed_uploads():
+    get_upload_cache().set("ab" * 32, {"text": RESUME})
+
+    for i in range(UPLOAD_CACHE_MAX_ENTRIES + 1):
+        get_resume_index(f"{RESUME}\nReference {i}")
+
+    assert get_upload_cache().resume_text("ab" * 32) == RESUME
+    assert len(get_index_cache()) <= resume_index.RESUME_INDEX_CACHE_MAX_ENTRIES
+
+
+def test_generations_reuse_the_index(test_client, make_mock_client):
+    mock_client = make_mock_client()
+    # Well over RESUME_TOKEN_BUDGET, so the prompt is rendered from the index
+    filler = "".join(f"- Filed TPS report number {i}\n" for i in range(300))
+    resume = RESUME.replace("\nSKILLS", f"Initech, Intern (2000 - 2001)\n{filler}\nSKILLS")
+
+    with patch("app.routers.generate.get_cached_client", return_value=mock_client), \
+            patch("app.routers.generate.MAX_RESUME_LENGTH", 100000), \
+            patch.object(resume_index, "analyze", wraps=analyze) as analyzer, \
+            patch.object(resume_index, "RESUME_INDEX_BULLETS_PER_ROLE", 1):
+        for tone in ("formal", "friendly"):
+            result = test_client.post("/generate/all", json={
+                "resume_text": resume, "job_description": JD * 3, "tone_hint": tone})
+            assert result.status_code == 200
+
+    analyzer.assert_called_once()
+    prompt = mock_client.aio.models.generate_content.await_args.kwargs["contents"]
+    assert "- Built Python FastAPI services" in prompt
+    assert "bake sale" not in prompt
+
+
+def test_resume_within_budget_is_sent_as_is(test_client, make_mock_client):
+    mock_client = make_mock_client()
+    resume = RESUME.replace(
+        "Tools: Docker | Kubernetes, python",
+        "Tools: Docker | Kubernetes, python\n"
+        "Designed and operated multi-region Kubernetes clusters on AWS") + (
+        "\nSoftware Engineer, Acme Corp (2010 - 2011)\n- Wrote unit tests\n"
+        "Software Engineer, Globex (2011 - 2012)\n- Wrote unit tests\n")
+
+    with patch("app.routers.generate.get_cached_client", return_value=mock_client), \
+            patch.object(resume_index, "analyze", wraps=analyze) as analyzer:
+        result = test_client.post("/generate/all", json={
+            "resume_text": resume, "job_description": JD * 3})
+
+    assert result.status_code == 200
+    assert result.headers["x-input-tokens-saved"] == "0"
+    analyzer.assert_not_called()
+    prompt = mock_client.aio.models.generate_content.await_args.kwargs["contents"]
+    assert resume.strip() in prompt
@@ -0,0 +1,95 @@
+# test_routing.py
+from app import resilience
+from app.routing import ModelRouter, ModelTier, load_routes
+import json
+from google.genai import errors as genai_errors
+from prometheus_client import REGISTRY
+from unittest.mock import patch
+
+
+FLASH = "gemini-2.5-flash"
+LITE = "gemini-2.5-flash-lite"
+
+def _written_by(failing=()):
+    """Answer with the serving model's name; models in ``failing`` return 503"""
+    def answer(*, model, contents, config):
+        if model in failing:
+            raise genai_errors.ServerError(503, {"error": {"code": 503, "message": "down"}})
+        return f"Written by {model}"
+    return answer
+
+
+def test_routes_merge_overrides_over_the_defaults(tmp_path):
+    spec = json.dumps({"bullets": {
+        "models": [LITE, {"model": FLASH, "config": {"temperature": 0.2}}],
+        "config": {"maxOutputTokens": 512},
+    }})
+    path = tmp_path / "routes.json"
+    path.write_text(spec)
+
+    for routes in (load_routes(spec), load_routes(str(path))):
+        bullets = routes["bullets"]
+        assert [tier.model for tier in bullets] == [LITE, FLASH]
+        assert bullets[0].config == {"temperature": 0.5, "topP": 0.95, "maxOutputTokens": 512}
+        assert bullets[1].config["temperature"] == 0.2
+        assert [tier.model for tier in routes["cover_letter"]] == [FLASH, LITE]
+
+
+def test_unhealthy_models_move_behind_healthy_ones():
+    router = ModelRouter(
+        routes={"bullets": [ModelTier(FLASH), ModelTier(LITE)]},
+        max_error_rate=0.5, latency_slo=2.0, recovery=60)
+
+    for _ in range(5):
+        router.observe("bullets", FLASH, 0.5, ok=False)
+    assert [tier.model for tier in router.order("bullets")] == [LITE, FLASH]
+
+    router.reset()
+    for _ in range(10):
+        router.observe("bullets", FLASH, 5.0, ok=True)
+    assert not router.healthy("bullets", FLASH)
+    assert [tier.model for tier in router.order("bullets")] == [LITE, FLASH]
+
+    # A model that saw no traffic for the recovery period gets another chance
+    router.recovery = 0
+    assert [tier.model for tier in router.order("bullets")] == [FLASH, LITE]
+
+
+def test_failing_primary_falls_back_and_reports_the_model(
+    test_client, valid_request_payload, make_mock_client
+):
+    before = REGISTRY.get_sample_value(
+        "model_fallbacks_total",
+        {"task": "bullets", "model": FLASH, "fallback": LITE}) or 0
+
+    with patch("app.routers.generate.get_cached_client",
+               return_value=make_mock_client(answer=_written_by(failing={FLASH}))), \
+            patch.object(resilience, "UPSTREAM_RETRY_BASE_DELAY", 0.001):
+        response = test_client.post("/generate/all", json=valid_request_payload)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["bullets"] == f"Written by {LITE}"
+    assert body["models"] == {"cover_letter": LITE, "bullets": LITE}
+    assert REGISTRY.get_sample_value(
+        "model_fallbacks_total",
+        {"task": "bullets", "model": FLASH, "fallback": LITE}) == before + 1
+
+
+def test_bullets_can_be_routed_to_a_cheaper_model(
+    test_client, valid_request_payload, make_mock_client
+):
+    router = ModelRouter(routes=load_routes(json.dumps({"bullets": {"models": [LITE]}})))
+    mock_client = make_mock_client(answer=_written_by())
+
+    with patch("app.routers.generate.get_cached_client", return_value=mock_client), \
+            patch("app.routers.generate.get_model_router", return_value=router):
+        first = test_client.post("/generate/all", json=valid_request_payload)
+        cached = test_client.post("/generate/all", json=valid_request_payload)
+
+    assert first.json()["models"] == {"cover_letter": FLASH, "bullets": LITE}
+    # Cache hits still report the model that generated them
+    assert cached.headers["x-cache"] == "cover_letter=hit, bullets=hit"
+    assert cached.json()["models"] == first.json()["models"]
+    models = {call.kwargs["model"] for call in mock_client.aio.models.generate_content.await_args_list}
+    assert models == {FLASH, LITE}
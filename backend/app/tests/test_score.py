@@ -0,0 +1,100 @@
+# test_score.py
+from app.compression import term_counts, terms
+from app.scoring import score_jobs, sparse_counts
+from app.uploads import get_upload_cache
+from unittest.mock import patch
+
+
+RESUME = """Jane Doe
+Senior Backend Engineer
+
+EXPERIENCE
+Acme Corp, Staff Engineer (2019 - Present)
+- Built Python FastAPI services handling 10k rps on AWS
+- Led the Kubernetes migration of 40 services
+
+SKILLS
+Python, FastAPI, Kubernetes, PostgreSQL, Go
+"""
+
+BACKEND = "Backend engineer with Python, FastAPI, AWS and Kubernetes experience."
+DATA = "Data engineer building Spark and Airflow pipelines in Python with SQL."
+PASTRY = "Pastry chef who organizes bake sales and decorates wedding cakes."
+
+
+def test_term_counts_match_terms():
+    text = "The Python and python developers, with C++ and the CI/CD."
+
+    assert term_counts(text) == {term: terms(text).count(term) for term in terms(text)}
+
+
+def test_sparse_counts_number_terms_by_first_occurrence():
+    rows, columns, counts, vocabulary = sparse_counts(
+        [term_counts("python go python"), term_counts("go rust")])
+
+    assert vocabulary == {"python": 0, "go": 1, "rust": 2}
+    assert rows.tolist() == [0, 0, 1, 1]
+    assert columns.tolist() == [0, 1, 1, 2]
+    assert counts.tolist() == [2, 1, 1, 1]
+
+
+def test_scores_rank_matching_jobs_first():
+    backend, data, pastry = score_jobs(
+        RESUME, [BACKEND, DATA, PASTRY], ["Python", "FastAPI", "Kubernetes", "Go"])
+
+    assert backend["score"] > data["score"] > pastry["score"] == 0
+    assert backend["tfidf"] > data["tfidf"] and backend["bm25"] > data["bm25"]
+    assert backend["matched_skills"] == ["Python", "FastAPI", "Kubernetes"]
+    assert backend["skills"] == 0.75
+    assert "spark" in data["missing_keywords"] and "python" not in data["missing_keywords"]
+    assert pastry["missing_keywords"][:2] == ["pastry", "chef"]
+
+
+def test_scores_without_skills_or_terms():
+    empty, backend = score_jobs(RESUME, ["", BACKEND])
+
+    assert empty == {"index": 0, "score": 0.0, "keywords": 0.0, "skills": None, "tfidf": 0.0,
+                     "bm25": 0.0, "matched_skills": [], "missing_keywords": []}
+    assert backend["skills"] is None and 0 < backend["score"] <= 1
+
+
+def test_score_endpoint_ranks_jobs_without_model_calls(test_client):
+    with patch("app.routers.generate.get_cached_client") as client:
+        response = test_client.post("/score", json={
+            "resume_text": RESUME, "job_descriptions": [PASTRY, DATA, BACKEND]})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["index"] for result in results] == [2, 1, 0]
+    # Skills come from the resume index
+    assert results[0]["matched_skills"] == ["Python", "FastAPI", "Kubernetes"]
+    client.assert_not_called()
+
+
+def test_score_endpoint_accepts_resume_hash(test_client):
+    get_upload_cache().set("ab" * 32, {"text": RESUME})
+
+    response = test_client.post("/score", json={
+        "resume_hash": "ab" * 32, "job_descriptions": [BACKEND]})
+
+    assert response.status_code == 200
+    assert response.json()["results"][0]["matched_skills"]
+
+
+def test_score_endpoint_validates_job_count(test_client):
+    with patch("app.routers.score.SCORE_MAX_JOBS", 2):
+        response = test_client.post("/score", json={
+            "resume_text": RESUME, "job_descriptions": [BACKEND] * 3})
+
+    assert response.status_code == 422
+    assert "between 1 and 2" in response.json()["detail"]
+
+
+def test_score_endpoint_accepts_jobs_mentioning_sensitive_terms(test_client):
+    payments = "Payments engineer building credit card processing in Go and Python."
+
+    response = test_client.post("/score", json={
+        "resume_text": RESUME, "job_descriptions": [BACKEND, payments]})
+
+    assert response.status_code == 200
+    assert sorted(result["index"] for result in response.json()["results"]) == [0, 1]
@@ -0,0 +1,179 @@
+# test_security.py
+from app.main import app
+from app.security import ExpiringMap, IPBlocker, IPBlockMiddleware, SharedBlocklist
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from google.genai import errors as genai_errors
+from unittest.mock import patch
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_expiring_map_expires_and_bounds_capacity():
+    clock = FakeClock()
+    entries = ExpiringMap(capacity=2, clock=clock)
+    entries.set("a", 1, ttl=10)
+    entries.set("b", 2, ttl=10)
+    entries.set("c", 3, ttl=10)
+
+    assert len(entries) == 2
+    assert entries.get("a") is None
+    assert entries.get("b") == 2
+
+    clock.now += 11
+    assert entries.get("b") is None
+
+
+def test_blocker_blocks_after_max_failures():
+    blocker = IPBlocker(max_failures=3, block_duration=60, half_life=300,
+                        clock=FakeClock())
+
+    assert [blocker.record_failure("1.2.3.4") for _ in range(3)] == [False, False, True]
+    assert blocker.is_blocked("1.2.3.4")
+    assert not blocker.is_blocked("5.6.7.8")
+
+
+def test_failure_scores_decay_over_time():
+    clock = FakeClock()
+    blocker = IPBlocker(max_failures=3, block_duration=60, half_life=10,
+                        clock=clock)
+
+    for _ in range(10):
+        blocker.record_failure("1.2.3.4")
+        clock.now += 20  # two half-lives between failures
+
+    assert not blocker.is_blocked("1.2.3.4")
+
+
+def test_block_expires():
+    clock = FakeClock()
+    blocker = IPBlocker(max_failures=1, block_duration=60, clock=clock)
+    blocker.record_failure("1.2.3.4")
+
+    clock.now += 61
+    assert not blocker.is_blocked("1.2.3.4")
+
+
+def test_memory_is_bounded_under_scan():
+    blocker = IPBlocker(max_failures=10, capacity=100, clock=FakeClock())
+
+    for index in range(10_000):
+        blocker.record_failure(f"10.0.{index // 256}.{index % 256}")
+
+    assert len(blocker.scores) == 100
+
+
+def test_blocks_are_shared_between_workers(tmp_path):
+    path = str(tmp_path / "blocks.sqlite3")
+    first = IPBlocker(max_failures=1, shared=SharedBlocklist(path), sync_interval=0)
+    second = IPBlocker(max_failures=1, shared=SharedBlocklist(path), sync_interval=0)
+
+    first.record_failure("1.2.3.4")
+
+    assert second.is_blocked("1.2.3.4")
+
+
+def _scope(ip="1.2.3.4"):
+    return {"type": "http", "client": (ip, 1234), "path": "/", "headers": []}
+
+
+def _run(middleware, scope):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return sent
+
+
+def _app(status):
+    async def inner(scope, receive, send):
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+    return inner
+
+
+def test_middleware_passes_responses_through_and_blocks():
+    blocker = IPBlocker(max_failures=2, block_duration=60)
+    middleware = IPBlockMiddleware(_app(404), blocker=blocker)
+
+    first = _run(middleware, _scope())
+    _run(middleware, _scope())
+    blocked = _run(middleware, _scope())
+
+    assert first[0]["status"] == 404
+    assert first[1]["body"] == b"ok"
+    assert blocked[0]["status"] == 403
+    assert _run(middleware, _scope("5.6.7.8"))[0]["status"] == 404
+
+
+@pytest.mark.parametrize("status", [422, 429, 499, 500, 502, 503, 504])
+def test_user_mistakes_and_server_side_statuses_never_count(status):
+    blocker = IPBlocker(max_failures=2, block_duration=60)
+    middleware = IPBlockMiddleware(_app(status), blocker=blocker)
+
+    statuses = [_run(middleware, _scope())[0]["status"] for _ in range(5)]
+
+    assert statuses == [status] * 5
+    assert not blocker.is_blocked("1.2.3.4")
+
+
+def test_middleware_ignores_non_http_scopes():
+    called = []
+
+    async def inner(scope, receive, send):
+        called.append(scope["type"])
+
+    middleware = IPBlockMiddleware(inner, blocker=IPBlocker())
+    asyncio.run(middleware({"type": "lifespan"}, None, None))
+
+    assert called == ["lifespan"]
+
+
+def test_app_blocks_ip_after_repeated_failures():
+    client = TestClient(app)
+
+    statuses = [client.get("/does-not-exist").status_code for _ in range(11)]
+
+    assert statuses[:10] == [404] * 10
+    assert statuses[10] == 403
+    assert client.get("/").status_code == 403
+
+
+def test_rate_limited_client_is_not_blocked():
+    client = TestClient(app)
+
+    # The 50/hour default limit, then 15 rate-limited requests
+    statuses = [client.get("/").status_code for _ in range(65)]
+
+    assert statuses[50:] == [429] * 15
+    assert 403 not in statuses
+
+
+def test_upstream_outage_does_not_block_clients(
+    test_client, valid_request_payload, make_mock_client
+):
+    body = {"error": {"code": 503, "message": "overloaded", "status": "UNAVAILABLE"}}
+    mock_client = make_mock_client()
+    mock_client.aio.models.generate_content.side_effect = genai_errors.ServerError(503, body)
+    with patch("app.routers.generate.get_cached_client", return_value=mock_client), \
+            patch("app.resilience.UPSTREAM_RETRY_BASE_DELAY", 0.001):
+        statuses = [test_client.post("/generate/all", json=valid_request_payload).status_code
+                    for _ in range(12)]
+    after = test_client.get("/")
+
+    # Failures, then an open circuit, but never a block
+    assert 403 not in statuses and all(status >= 500 for status in statuses)
+    assert 503 in statuses
+    assert after.status_code != 403
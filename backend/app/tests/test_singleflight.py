@@ -0,0 +1,100 @@
+# test_singleflight.py
+from app.singleflight import SingleFlight
+import asyncio
+import pytest
+
+
+def test_concurrent_callers_share_one_call():
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main():
+        flight = SingleFlight()
+        results = await asyncio.gather(
+            *(flight.do("key", work) for _ in range(5)))
+        return flight, results
+
+    flight, results = asyncio.run(main())
+
+    assert results == ["result"] * 5
+    assert calls == 1
+    assert flight.stats() == {
+        "leaders": 1, "collapsed": 4, "abandoned": 0, "in_flight": 0}
+
+
+def test_different_keys_do_not_coalesce():
+    async def work():
+        await asyncio.sleep(0)
+        return "result"
+
+    async def main():
+        flight = SingleFlight()
+        await asyncio.gather(flight.do("a", work), flight.do("b", work))
+        return flight
+
+    assert asyncio.run(main()).stats()["collapsed"] == 0
+
+
+def test_exception_is_shared_by_all_waiters():
+    async def work():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    async def main():
+        flight = SingleFlight()
+        return await asyncio.gather(
+            flight.do("key", work), flight.do("key", work),
+            return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_cancelled_waiter_does_not_cancel_shared_work():
+    async def work():
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def main():
+        flight = SingleFlight()
+        leader = asyncio.create_task(flight.do("key", work))
+        follower = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return flight, await follower
+
+    flight, result = asyncio.run(main())
+
+    assert result == "result"
+    assert flight.stats()["abandoned"] == 0
+
+
+def test_last_waiter_leaving_cancels_shared_work():
+    finished = False
+
+    async def work():
+        nonlocal finished
+        await asyncio.sleep(0.05)
+        finished = True
+
+    async def main():
+        flight = SingleFlight()
+        waiter = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.sleep(0.1)
+        return flight
+
+    flight = asyncio.run(main())
+
+    assert not finished
+    assert flight.stats()["abandoned"] == 1
+    assert len(flight) == 0
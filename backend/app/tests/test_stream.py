@@ -0,0 +1,79 @@
+# test_stream.py
+import json
+from unittest.mock import patch
+
+
+def _parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@patch('app.routers.generate.get_cached_client')
+def test_stream_success(
+    mock_get_client, test_client, valid_request_payload, make_stream_client
+):
+    """Cover letter deltas are streamed before bullets, then done"""
+    mock_get_client.return_value = make_stream_client(
+        ["Dear ", "Hiring ", "Manager"], ["- Led\n\n", "- Built"])
+
+    response = test_client.post("/generate/stream", json=valid_request_payload)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _parse_events(response.text)
+    names = [name for name, _ in events]
+    assert names == [
+        "start",
+        "delta", "delta", "delta", "section_complete",
+        "delta", "delta", "section_complete",
+        "done",
+    ]
+    assert events[0][1] == {"sections": ["cover_letter", "bullets"]}
+    assert events[4][1]["text"] == "Dear Hiring Manager"
+    assert events[7][1]["section"] == "bullets"
+    assert events[7][1]["text"] == "- Led\n- Built"
+    assert events[-1][1] == {"failed_sections": []}
+
+
+@patch('app.routers.generate.get_cached_client')
+def test_stream_empty_section_reports_error(
+    mock_get_client, test_client, valid_request_payload, make_stream_client
+):
+    """An empty section produces an error event without ending the stream"""
+    mock_get_client.return_value = make_stream_client([], ["- Built"])
+
+    response = test_client.post("/generate/stream", json=valid_request_payload)
+
+    events = _parse_events(response.text)
+    assert ("error", {
+        "section": "cover_letter",
+        "status": 500,
+        "detail": "Failed to generate cover letter. Please try again.",
+    }) in events
+    assert events[-2][0] == "section_complete"
+    assert events[-1] == ("done", {"failed_sections": ["cover_letter"]})
+
+
+@patch('app.routers.generate.get_cached_client')
+def test_stream_validates_before_streaming(mock_get_client, test_client):
+    """Sanitization errors are plain HTTP errors, not stream events"""
+    payload = {
+        "resume_text": "my password is hunter2 " * 20,
+        "job_description": "Hiring a backend engineer. " * 20,
+    }
+
+    response = test_client.post("/generate/stream", json=payload)
+
+    assert response.status_code == 422
+    mock_get_client.assert_not_called()
+
+
+@patch('app.routers.generate.get_cached_client', side_effect=RuntimeError("no API key"))
+def test_stream_client_error_returns_json_500(mock_get_client, test_client, valid_request_payload):
+    response = test_client.post("/generate/stream", json=valid_request_payload)
+
+    assert response.status_code == 500
+    assert response.json()["detail"] == "An unexpected error occurred. Please try again later."
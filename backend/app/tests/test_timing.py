@@ -0,0 +1,67 @@
+# test_timing.py
+from app.timing import RequestTimer, TimingMiddleware, current_timer, span
+import asyncio
+from unittest.mock import patch
+
+
+def _server_timing(header: str) -> dict:
+    entries = {}
+    for entry in header.split(", "):
+        name, duration = entry.split(";dur=")
+        entries[name] = float(duration)
+    return entries
+
+
+def test_server_timing_header_breaks_down_request(
+    test_client, valid_request_payload, make_mock_client
+):
+    with patch("app.routers.generate.get_cached_client", return_value=make_mock_client()):
+        result = test_client.post("/generate/all", json=valid_request_payload)
+
+    assert result.status_code == 200
+    spans = _server_timing(result.headers["server-timing"])
+    for name in ("ratelimit", "pre_handler", "sanitize", "render", "cache",
+                 "llm_cover_letter", "llm_bullets", "response", "total"):
+        assert name in spans
+    assert spans["total"] >= spans["llm_cover_letter"]
+
+
+def test_error_responses_are_timed(test_client):
+    result = test_client.post("/generate/all", json={
+        "resume_text": "too short", "job_description": "too short"})
+
+    assert result.status_code == 422
+    assert "total" in _server_timing(result.headers["server-timing"])
+
+
+def test_span_is_a_noop_outside_requests():
+    assert current_timer() is None
+    with span("anything"):
+        pass
+    assert current_timer() is None
+
+
+def test_timer_sums_spans_with_the_same_name():
+    timer = RequestTimer()
+    timer.add("ratelimit", 0.001)
+    timer.add("ratelimit", 0.002)
+
+    assert timer.as_dict() == {"ratelimit": 3.0}
+    assert timer.server_timing().startswith("ratelimit;dur=3.00, total;dur=")
+
+
+def test_disabled_middleware_adds_no_header():
+    sent = []
+
+    async def inner(scope, receive, send):
+        assert current_timer() is None
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = TimingMiddleware(inner, enabled=False)
+    asyncio.run(middleware({"type": "http", "method": "GET", "path": "/"},
+                           None, send))
+
+    assert sent[0]["headers"] == []
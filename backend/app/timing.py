@@ -0,0 +1,148 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+import json
+import logging
+import os
+import time
+from typing import Optional
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Per-request timing spans, Server-Timing header and timing logs
+REQUEST_TIMING = os.getenv("REQUEST_TIMING", "true").lower() in ("1", "true", "yes")
+
+
+class RequestTimer:
+    """
+    Accumulates named spans for one request.
+
+    Spans with the same name are summed (e.g. several rate-limit storage
+    hits). Spans may overlap when work runs concurrently.
+    """
+
+    __slots__ = ("started", "spans")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}  # name -> [total seconds, count]
+
+    def add(self, name: str, seconds: float):
+        span = self.spans.get(name)
+        if span is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            span[0] += seconds
+            span[1] += 1
+
+    @contextmanager
+    def span(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        entries = [f"{name};dur={total * 1000:.2f}"
+                   for name, (total, _) in self.spans.items()]
+        entries.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(entries)
+
+    def as_dict(self) -> dict:
+        return {name: round(total * 1000, 2)
+                for name, (total, _) in self.spans.items()}
+
+
+_current: ContextVar[Optional[RequestTimer]] = ContextVar(
+    "request_timer", default=None)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def current_timer() -> Optional[RequestTimer]:
+    return _current.get()
+
+
+def span(name: str):
+    """
+    Time a block in the current request; a shared no-op when timing is off
+    """
+    timer = _current.get()
+    if timer is None:
+        return _NOOP
+    return timer.span(name)
+
+
+def record(name: str, seconds: float):
+    timer = _current.get()
+    if timer is not None:
+        timer.add(name, seconds)
+
+
+def mark(name: str):
+    """
+    Record the time elapsed since the request started, e.g. at handler entry
+    to capture middleware, body parsing and dependency resolution
+    """
+    timer = _current.get()
+    if timer is not None:
+        timer.add(name, timer.elapsed())
+
+
+class TimingMiddleware:
+    """
+    Pure ASGI middleware that installs a RequestTimer for each HTTP request,
+    adds a ``Server-Timing`` header and logs one structured line per request.
+    """
+
+    def __init__(self, app, enabled: bool = None):
+        self.app = app
+        self.enabled = REQUEST_TIMING if enabled is None else enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timer = RequestTimer()
+        token = _current.set(timer)
+        status = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", timer.server_timing().encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            logger.info(json.dumps({
+                "event": "request_timing",
+                "method": scope.get("method"),
+                "path": scope.get("path"),
+                "status": status,
+                "total_ms": round(timer.elapsed() * 1000, 2),
+                "spans_ms": timer.as_dict(),
+            }))
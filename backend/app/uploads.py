@@ -0,0 +1,88 @@
+import json
+import logging
+import os
+import re
+from typing import Optional
+from dotenv import load_dotenv
+from .cache import GenerationCache, MemoryCache, SQLiteCache
+from .metrics import UPLOAD_CACHE_REQUESTS
+from .parsing import PARSE_MAX_PAGES
+
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Text extracted from resume uploads, keyed by the SHA-256 of the file:
+# memory | sqlite (memory in front of a file shared by workers) | off
+UPLOAD_CACHE = os.getenv("UPLOAD_CACHE", "memory").lower()
+UPLOAD_CACHE_TTL = float(os.getenv("UPLOAD_CACHE_TTL", "86400"))  # seconds
+UPLOAD_CACHE_MAX_ENTRIES = int(os.getenv("UPLOAD_CACHE_MAX_ENTRIES", "512"))
+UPLOAD_CACHE_MAX_BYTES = int(os.getenv("UPLOAD_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+UPLOAD_CACHE_PATH = os.getenv("UPLOAD_CACHE_PATH", "upload_cache.sqlite3")
+
+FINGERPRINT = re.compile(r"^[0-9a-f]{64}$")
+# Bump when extraction changes, so results of the old parser are not served
+PARSER_VERSION = 1
+
+
+def upload_key(fingerprint: str) -> str:
+    """
+    Cache key of a parse: the file and the settings that shape the result
+    """
+    return f"v{PARSER_VERSION}:{PARSE_MAX_PAGES}:{fingerprint}"
+
+
+class UploadCache:
+    """
+    Parse results of uploads by content hash, stored in the generation
+    cache tiers; generation requests refer to them with ``resume_hash``
+    """
+
+    def __init__(self, cache: GenerationCache):
+        self.cache = cache
+
+    def get(self, fingerprint: str, endpoint: str = "parse") -> Optional[dict]:
+        value = None
+        if FINGERPRINT.match(fingerprint):
+            value = self.cache.get(upload_key(fingerprint))
+        UPLOAD_CACHE_REQUESTS.labels(endpoint, "miss" if value is None else "hit").inc()
+        return None if value is None else json.loads(value)
+
+    def set(self, fingerprint: str, result: dict):
+        self.cache.set(upload_key(fingerprint), json.dumps(result))
+
+    def resume_text(self, fingerprint: str) -> Optional[str]:
+        """
+        Text of a previously uploaded resume, or None if unknown or expired
+        """
+        result = self.get(fingerprint, endpoint="generate")
+        return None if result is None else result["text"]
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+
+_cache = None
+
+
+def get_upload_cache() -> UploadCache:
+    global _cache
+
+    if _cache is None:
+        memory = MemoryCache(
+            max_entries=UPLOAD_CACHE_MAX_ENTRIES, max_bytes=UPLOAD_CACHE_MAX_BYTES,
+            ttl=UPLOAD_CACHE_TTL)
+        if UPLOAD_CACHE == "off":
+            backends = ()
+        elif UPLOAD_CACHE == "sqlite":
+            backends = (memory, SQLiteCache(
+                path=UPLOAD_CACHE_PATH, max_entries=UPLOAD_CACHE_MAX_ENTRIES,
+                ttl=UPLOAD_CACHE_TTL, table="upload_cache"))
+        else:
+            backends = (memory,)
+        _cache = UploadCache(GenerationCache(*backends))
+    return _cache
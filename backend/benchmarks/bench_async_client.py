@@ -0,0 +1,76 @@
+"""
+Compare thread-pool and native asyncio Gemini calls against the fake upstream.
+
+    python -m benchmarks.bench_async_client --latency 0.2 --levels 8 32 128
+
+For each concurrency level N, N generate_content calls are started at once,
+once through ``asyncio.to_thread`` (the old path) and once through
+``client.aio`` (the new path). With a fixed upstream latency the async path
+should finish in ~1 latency regardless of N, while the thread path degrades
+once N exceeds the default executor size.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from google import genai
+
+from app.openai_client import get_http_options
+from benchmarks.fake_gemini import FakeGeminiServer
+
+MODEL = "gemini-2.5-flash"
+
+
+async def run_threaded(client, n: int) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        asyncio.to_thread(client.models.generate_content,
+                          model=MODEL, contents=f"prompt {i}")
+        for i in range(n)))
+    return time.perf_counter() - started
+
+
+async def run_async(client, n: int) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        client.aio.models.generate_content(model=MODEL, contents=f"prompt {i}")
+        for i in range(n)))
+    return time.perf_counter() - started
+
+
+async def main(args):
+    results = []
+    with FakeGeminiServer(latency=args.latency) as server:
+        http_options = get_http_options()
+        http_options["base_url"] = server.base_url
+        client = genai.Client(api_key="fake-key", http_options=http_options)
+
+        # Warm up both connection pools
+        await run_threaded(client, 2)
+        await run_async(client, 2)
+
+        for n in args.levels:
+            threaded = await run_threaded(client, n)
+            native = await run_async(client, n)
+            results.append({
+                "concurrency": n,
+                "to_thread_s": round(threaded, 3),
+                "async_s": round(native, 3),
+                "to_thread_rps": round(n / threaded, 1),
+                "async_rps": round(n / native, 1),
+            })
+            print(f"n={n:>4}  to_thread {threaded:6.3f}s ({n / threaded:7.1f} rps)"
+                  f"  async {native:6.3f}s ({n / native:7.1f} rps)")
+
+    print(json.dumps({"latency": args.latency, "cpus": os.cpu_count(),
+                      "results": results}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--levels", type=int, nargs="+",
+                        default=[8, 32, 64, 128])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,76 @@
+"""
+Per-request overhead of IPBlockMiddleware.
+
+    python -m benchmarks.bench_ipblock --requests 50000
+
+Drives the ASGI callables directly (no sockets) with a trivial inner app and
+compares: no middleware, a pass-through BaseHTTPMiddleware (the shape of the
+old implementation) and the pure-ASGI IPBlockMiddleware.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.types import Receive, Scope, Send
+
+from app.security import IPBlocker, IPBlockMiddleware
+
+
+async def inner_app(scope: Scope, receive: Receive, send: Send):
+    await PlainTextResponse("ok")(scope, receive, send)
+
+
+class PassThroughMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        return await call_next(request)
+
+
+async def measure(app, requests: int, ips: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    scopes = [{
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/", "raw_path": b"/",
+        "query_string": b"", "root_path": "", "headers": [],
+        "client": (f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", 1234),
+        "server": ("testserver", 80),
+    } for i in range(ips)]
+
+    started = time.perf_counter()
+    for index in range(requests):
+        await app(scopes[index % ips], receive, send)
+    return (time.perf_counter() - started) / requests
+
+
+async def main(args):
+    variants = {
+        "none": inner_app,
+        "base_http_middleware": PassThroughMiddleware(inner_app),
+        "ip_block_middleware": IPBlockMiddleware(inner_app, blocker=IPBlocker()),
+    }
+    results = {}
+    for name, app in variants.items():
+        await measure(app, 1000, args.ips)  # warm up
+        per_request = await measure(app, args.requests, args.ips)
+        results[name] = round(per_request * 1e6, 2)
+        print(f"{name:>22}: {per_request * 1e6:8.2f} us/request")
+
+    baseline = results["none"]
+    print(json.dumps({
+        "us_per_request": results,
+        "overhead_us": {k: round(v - baseline, 2) for k, v in results.items()},
+    }))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--ips", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
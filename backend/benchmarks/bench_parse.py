@@ -0,0 +1,177 @@
+"""
+Measure resume parsing throughput and event-loop blocking.
+
+    python -m benchmarks.bench_parse --files 120 --pages 1 3 10 --workers 0 2 4
+
+A corpus of generated PDF, DOCX and TXT resumes is parsed three ways:
+``inline`` (extraction called on the event loop, like the old handler),
+``threads`` (ParserPool with workers=0) and ``pool`` with N worker
+processes. For each run it reports files/s, MB/s, p50/p95 latency per file
+and the worst event-loop stall seen by a 10ms heartbeat.
+"""
+import argparse
+import asyncio
+import io
+import json
+import statistics
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+from app.extract import detect_format, extract_document
+from app.parsing import ParserPool
+
+LINES = [
+    "Senior Python engineer, 8 years building FastAPI services on AWS.",
+    "Led the migration of a monolith to async microservices (p95 -40%).",
+    "Built ingestion pipelines processing 2M events per day with Kafka.",
+    "Mentored five engineers; introduced code review and CI standards.",
+    "Skills: Python, FastAPI, PostgreSQL, Redis, Docker, Kubernetes.",
+]
+LINES_PER_PAGE = 40
+
+
+def sample_lines(count: int, offset: int = 0) -> list:
+    return [f"{LINES[(offset + i) % len(LINES)]} ({offset + i})" for i in range(count)]
+
+
+def make_pdf(pages: int) -> bytes:
+    """
+    Minimal PDF with ``pages`` pages of Helvetica text lines
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for page in range(pages):
+        text = "".join(
+            "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") Tj T* "
+            for line in sample_lines(LINES_PER_PAGE, page * LINES_PER_PAGE))
+        stream = f"BT /F1 10 Tf 14 TL 50 780 Td {text}ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), pages)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+              % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def make_docx(pages: int) -> bytes:
+    """
+    Minimal DOCX with ``pages`` pages worth of paragraphs
+    """
+    body = "".join(
+        f'<w:p><w:r><w:t xml:space="preserve">{escape(line)}</w:t></w:r></w:p>'
+        for line in sample_lines(LINES_PER_PAGE * pages))
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f"<w:body>{body}</w:body></w:document>")
+    app_properties = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties">'
+        f"<Pages>{pages}</Pages></Properties>")
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("word/document.xml", document)
+        archive.writestr("docProps/app.xml", app_properties)
+    return out.getvalue()
+
+
+def make_txt(pages: int) -> bytes:
+    return "\n".join(sample_lines(LINES_PER_PAGE * pages)).encode("utf-8")
+
+
+MAKERS = {"pdf": make_pdf, "docx": make_docx, "txt": make_txt}
+
+
+def build_corpus(files: int, pages: list) -> list:
+    corpus = []
+    for index in range(files):
+        fmt = list(MAKERS)[index % len(MAKERS)]
+        count = pages[index // len(MAKERS) % len(pages)]
+        corpus.append((f"resume{index}.{fmt}", MAKERS[fmt](count)))
+    return corpus
+
+
+async def heartbeat(stop: asyncio.Event, lags: list, interval: float = 0.01):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def run(corpus: list, mode: str, workers: int, concurrency: int) -> dict:
+    pool = ParserPool(workers=workers, max_pending=len(corpus), timeout=60)
+    if mode == "pool":
+        # Start the worker processes outside the measurement
+        await asyncio.gather(*(pool.run(extract_document, make_pdf(1), "pdf", 1)
+                               for _ in range(2 * workers)))
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def parse(name: str, data: bytes):
+        async with semaphore:
+            started = time.perf_counter()
+            if mode == "inline":
+                extract_document(data, detect_format(name, data[:8]), 50)
+            else:
+                await pool.parse(data, name)
+            latencies.append(time.perf_counter() - started)
+
+    stop, lags = asyncio.Event(), []
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(parse(name, data) for name, data in corpus))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await beat
+    pool.shutdown()
+
+    latencies.sort()
+    megabytes = sum(len(data) for _, data in corpus) / 1e6
+    return {
+        "mode": mode,
+        "workers": workers,
+        "files": len(corpus),
+        "files_per_s": round(len(corpus) / elapsed, 1),
+        "mb_per_s": round(megabytes / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 1),
+        "max_loop_stall_ms": round(max(lags, default=0) * 1000, 1),
+    }
+
+
+def main(args):
+    corpus = build_corpus(args.files, args.pages)
+    runs = [("inline", 0)] + [
+        ("threads" if workers == 0 else "pool", workers) for workers in args.workers]
+    for mode, workers in runs:
+        result = asyncio.run(run(corpus, mode, workers, args.concurrency))
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=120)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 3, 10])
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=8)
+    main(parser.parse_args())
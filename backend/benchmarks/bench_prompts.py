@@ -0,0 +1,56 @@
+"""
+Compare chained ``str.replace`` prompt rendering with the compiled templates.
+
+    python -m benchmarks.bench_prompts --sizes 1000 10000 50000 200000
+
+For each resume size (characters; the job description is half of it) both
+renderers build the cover letter prompt (resume prefix and task, as
+/generate/all does) ``--number`` times.
+"""
+import argparse
+import json
+import timeit
+
+from app.prompts import (
+    COVER_LETTER_TASK_PROMPT, COVER_LETTER_TASK_TEMPLATE, RESUME_PREFIX_PROMPT,
+    RESUME_PREFIX_TEMPLATE)
+
+
+def render_replace(resume: str, jd: str, tone: str) -> str:
+    return (
+        (RESUME_PREFIX_TEMPLATE + COVER_LETTER_TASK_TEMPLATE)
+        .replace("{{RESUME}}", resume)
+        .replace("{{JD}}", jd)
+        .replace("{{TONE}}", tone)
+    )
+
+
+def render_compiled(resume: str, jd: str, tone: str) -> str:
+    return (RESUME_PREFIX_PROMPT.render(RESUME=resume)
+            + COVER_LETTER_TASK_PROMPT.render(JD=jd, TONE=tone))
+
+
+def main(args):
+    results = []
+    for size in args.sizes:
+        resume = ("Built Python services on AWS. " * (size // 30 + 1))[:size]
+        jd = ("Hiring a backend engineer. " * (size // 54 + 1))[:size // 2]
+        tone = "professional"
+        assert render_replace(resume, jd, tone) == render_compiled(resume, jd, tone)
+
+        row = {"resume_chars": size, "jd_chars": len(jd)}
+        for name, render in (("replace", render_replace), ("compiled", render_compiled)):
+            seconds = min(timeit.repeat(
+                lambda: render(resume, jd, tone), number=args.number, repeat=5))
+            row[f"{name}_us"] = round(seconds / args.number * 1e6, 2)
+        row["speedup"] = round(row["replace_us"] / row["compiled_us"], 2)
+        results.append(row)
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1000, 10000, 50000, 200000])
+    parser.add_argument("--number", type=int, default=200)
+    main(parser.parse_args())
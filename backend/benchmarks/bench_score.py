@@ -0,0 +1,62 @@
+"""
+Measure /score relevance scoring against many job descriptions.
+
+    python -m benchmarks.bench_score --jobs 10 100 500 --words 400
+
+For each count of generated job descriptions it reports the time of
+scoring.score_jobs (best of ``--repeat`` runs) and the part of it spent
+tokenizing the job descriptions; the rest is the vectorized scoring.
+"""
+import argparse
+import json
+import random
+import time
+
+from app.compression import term_counts
+from app.scoring import score_jobs
+
+SKILLS = ("Python FastAPI Django Go Rust Java Kotlin TypeScript React AWS GCP Azure "
+          "Docker Kubernetes Terraform Kafka Spark Airflow PostgreSQL Redis").split()
+WORDS = ("build scale services teams own design deliver mentor data platform "
+         "customers reliable latency pipelines product roadmap cloud secure").split()
+RESUME = "\n".join(
+    f"- Built {SKILLS[i % len(SKILLS)]} and {SKILLS[(i * 7) % len(SKILLS)]} "
+    f"services that {WORDS[i % len(WORDS)]} {WORDS[(i * 3) % len(WORDS)]} ({i})"
+    for i in range(40))
+
+
+def make_jobs(count: int, words: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    vocabulary = SKILLS + WORDS + [f"term{i}" for i in range(2000)]
+    return [" ".join(rng.choices(vocabulary, k=words)) for _ in range(count)]
+
+
+def best_of(repeat: int, func) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(args):
+    for count in args.jobs:
+        jobs = make_jobs(count, args.words)
+        total = best_of(args.repeat, lambda: score_jobs(RESUME, jobs, SKILLS))
+        tokenize = best_of(args.repeat, lambda: [term_counts(jd) for jd in jobs])
+        print(json.dumps({
+            "jobs": count,
+            "words": args.words,
+            "score_jobs_ms": round(total * 1000, 1),
+            "tokenize_ms": round(tokenize * 1000, 1),
+            "jobs_per_s": round(count / total),
+        }))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--words", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,83 @@
+"""
+Measure time-to-first-token of /generate/stream against /generate/all.
+
+    python -m benchmarks.bench_stream --latency 4
+
+The API runs in-process against the fake Gemini upstream, so no quota is used.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from benchmarks.fake_gemini import FakeGeminiServer, free_port
+
+PAYLOAD = {
+    "resume_text": "Senior Python engineer building FastAPI services on AWS. " * 10,
+    "job_description": "Hiring a backend engineer with Python and cloud experience. " * 10,
+    "tone_hint": "professional",
+}
+
+
+def serve_app(port: int) -> uvicorn.Server:
+    from app.main import app
+
+    server = uvicorn.Server(uvicorn.Config(
+        app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def main(args):
+    text = " ".join(f"word{i}" for i in range(args.words))
+    with FakeGeminiServer(latency=args.latency, text=text,
+                          first_chunk=args.first_chunk) as upstream:
+        os.environ["GEMINI_BASE_URL"] = upstream.base_url
+        os.environ.setdefault("OPENAI_API_KEY", "fake-key")
+        os.environ.setdefault("X_API_KEY", "bench-key")
+        port = free_port()
+        server = serve_app(port)
+        base = f"http://127.0.0.1:{port}"
+        headers = {"x-api-key": os.environ["X_API_KEY"]}
+
+        with httpx.Client(base_url=base, headers=headers, timeout=120) as http:
+            started = time.perf_counter()
+            response = http.post("/generate/all", json=PAYLOAD)
+            all_total = time.perf_counter() - started
+            response.raise_for_status()
+
+            started = time.perf_counter()
+            first_byte = first_delta = None
+            with http.stream("POST", "/generate/stream", json=PAYLOAD) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if first_byte is None:
+                        first_byte = time.perf_counter() - started
+                    if first_delta is None and line == "event: delta":
+                        first_delta = time.perf_counter() - started
+            stream_total = time.perf_counter() - started
+
+        server.should_exit = True
+
+    result = {
+        "upstream_latency_s": args.latency,
+        "all_total_s": round(all_total, 3),
+        "stream_first_byte_s": round(first_byte, 3),
+        "stream_first_delta_s": round(first_delta, 3),
+        "stream_total_s": round(stream_total, 3),
+    }
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=4.0)
+    parser.add_argument("--first-chunk", type=float, default=0.3)
+    parser.add_argument("--words", type=int, default=50)
+    main(parser.parse_args())
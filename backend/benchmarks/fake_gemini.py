@@ -0,0 +1,273 @@
+"""
+Local stand-in for the Gemini REST API.
+
+Serves ``models/{model}:generateContent`` and ``:streamGenerateContent``
+(SSE) with a configurable latency distribution and error rate so the
+generation layer can be exercised without spending quota. ``cachedContents``
+can be created and referenced from generate calls like Gemini context caching.
+Point the app at it with ``GEMINI_BASE_URL=http://127.0.0.1:<port>``.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+DISTRIBUTIONS = ("uniform", "normal", "lognormal", "exponential")
+
+# Status names Google APIs return for the error codes we can inject
+ERROR_STATUSES = {
+    400: "INVALID_ARGUMENT",
+    403: "PERMISSION_DENIED",
+    404: "NOT_FOUND",
+    429: "RESOURCE_EXHAUSTED",
+    500: "INTERNAL",
+    503: "UNAVAILABLE",
+    504: "DEADLINE_EXCEEDED",
+}
+
+
+def build_response(text: str, prompt: str = "", cached_tokens: int = 0) -> dict:
+    """Minimal generateContent payload understood by google-genai"""
+    prompt_tokens = max(1, len(prompt) // 4)
+    completion_tokens = max(1, len(text) // 4)
+    response = {
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": text}]},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": completion_tokens,
+            "totalTokenCount": prompt_tokens + completion_tokens,
+        },
+        "modelVersion": "fake-gemini",
+    }
+    if cached_tokens:
+        response["usageMetadata"]["cachedContentTokenCount"] = cached_tokens
+    return response
+
+
+def build_error(code: int, message: str = "Injected by the fake Gemini server.") -> dict:
+    return {"error": {
+        "code": code,
+        "message": message,
+        "status": ERROR_STATUSES.get(code, "UNKNOWN"),
+    }}
+
+
+def latency_sampler(distribution: str, latency: float, jitter: float):
+    """
+    Return a function sampling response times in seconds.
+
+    ``latency`` is the median (the mean for ``uniform``/``normal``) and
+    ``jitter`` the spread: the half-width for ``uniform``, the standard
+    deviation for ``normal`` and the log-space sigma for ``lognormal``, which
+    gives the long tail typical of LLM APIs. ``exponential`` adds an
+    exponential tail with mean ``jitter`` on top of ``latency``.
+    """
+    if distribution == "uniform":
+        sample = lambda: latency + random.uniform(-jitter, jitter)
+    elif distribution == "normal":
+        sample = lambda: random.gauss(latency, jitter)
+    elif distribution == "lognormal":
+        sample = lambda: random.lognormvariate(math.log(latency), jitter) if latency > 0 else 0.0
+    elif distribution == "exponential":
+        sample = lambda: latency + (random.expovariate(1 / jitter) if jitter > 0 else 0.0)
+    else:
+        raise ValueError(f"Unknown latency distribution: {distribution}")
+    return lambda: max(0.0, sample())
+
+
+def prompt_text(body: dict) -> str:
+    return "".join(
+        part.get("text", "")
+        for content in body.get("contents", [])
+        for part in content.get("parts", [])
+    )
+
+
+def create_app(latency: float = 0.2, jitter: float = 0.0,
+               text: str = "Generated by the fake Gemini server.",
+               first_chunk: float = 0.05, distribution: str = "uniform",
+               error_rate: float = 0.0, error_codes: tuple = (500,),
+               context_caching: bool = True) -> FastAPI:
+    """
+    ``latency`` is the total response time, drawn from ``distribution`` (see
+    latency_sampler); when streaming, the first chunk arrives after
+    ``first_chunk`` seconds and the rest is spread evenly. A fraction
+    ``error_rate`` of calls fails after the sampled latency with one of
+    ``error_codes``. Without ``context_caching`` creating cached contents
+    fails with 404, like a model or endpoint that does not support it.
+    """
+    app = FastAPI(title="Fake Gemini")
+    app.state.calls = 0
+    app.state.errors = 0
+    # name -> (cached prompt text, expiry as time.time())
+    app.state.cached_contents = {}
+    app.state.cached_calls = 0
+    # Calls the client hung up on before the response was complete
+    app.state.aborted = 0
+    sample_latency = latency_sampler(distribution, latency, jitter)
+
+    def injected_error():
+        if error_rate and random.random() < error_rate:
+            app.state.errors += 1
+            return random.choice(error_codes)
+        return None
+
+    def resolve_prompt(body: dict):
+        """(full prompt, cached tokens), or None for an unknown cache"""
+        name = body.get("cachedContent")
+        if not name:
+            return prompt_text(body), 0
+        cached = app.state.cached_contents.get(name)
+        if cached is None or cached[1] < time.time():
+            return None
+        app.state.cached_calls += 1
+        return cached[0] + prompt_text(body), max(1, len(cached[0]) // 4)
+
+    async def respond_after(request: Request, seconds: float) -> bool:
+        """Sleep ``seconds``; False if the client hung up meanwhile"""
+        deadline = time.monotonic() + seconds
+        while (left := deadline - time.monotonic()) > 0:
+            await asyncio.sleep(min(left, 0.05))
+            if await request.is_disconnected():
+                app.state.aborted += 1
+                return False
+        return True
+
+    async def stream(prompt: str, cached_tokens: int = 0):
+        words = text.split(" ")
+        total = sample_latency()
+        complete = False
+        try:
+            await asyncio.sleep(min(first_chunk, total))
+            step = max(0.0, total - first_chunk) / max(1, len(words) - 1)
+            for index, word in enumerate(words):
+                if index:
+                    await asyncio.sleep(step)
+                chunk = word if index == 0 else " " + word
+                yield f"data: {json.dumps(build_response(chunk, prompt, cached_tokens))}\r\n\r\n"
+            complete = True
+        finally:
+            if not complete:
+                app.state.aborted += 1
+
+    @app.post("/{version}/cachedContents")
+    async def create_cached_content(version: str, request: Request):
+        body = await request.json()
+        if not context_caching:
+            return JSONResponse(
+                build_error(404, "Context caching is not supported."), status_code=404)
+        ttl = float(str(body.get("ttl", "3600s")).rstrip("s"))
+        name = f"cachedContents/{uuid.uuid4().hex[:16]}"
+        prompt = prompt_text(body)
+        app.state.cached_contents[name] = (prompt, time.time() + ttl)
+        expire = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        return {
+            "name": name,
+            "displayName": body.get("displayName", ""),
+            "model": body.get("model"),
+            "expireTime": expire.isoformat().replace("+00:00", "Z"),
+            "usageMetadata": {"totalTokenCount": max(1, len(prompt) // 4)},
+        }
+
+    @app.post("/{version}/models/{model_action}")
+    async def generate_content(version: str, model_action: str, request: Request):
+        body = await request.json()
+        app.state.calls += 1
+        error = injected_error()
+        if error is not None:
+            await asyncio.sleep(sample_latency())
+            return JSONResponse(build_error(error), status_code=error)
+        resolved = resolve_prompt(body)
+        if resolved is None:
+            return JSONResponse(build_error(
+                404, f"CachedContent not found: {body['cachedContent']}"), status_code=404)
+        prompt, cached_tokens = resolved
+        if model_action.endswith(":streamGenerateContent"):
+            return StreamingResponse(
+                stream(prompt, cached_tokens), media_type="text/event-stream")
+        if not await respond_after(request, sample_latency()):
+            return Response(status_code=499)
+        config = body.get("generationConfig") or {}
+        if config.get("responseMimeType") == "application/json":
+            # Shape of the combined generation mode
+            return build_response(json.dumps({
+                "cover_letter": text,
+                "bullets": [text] * 6,
+            }), prompt, cached_tokens)
+        return build_response(text, prompt, cached_tokens)
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class FakeGeminiServer:
+    """
+    Run the fake upstream in a background thread (context manager)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = None, **app_kwargs):
+        self.host = host
+        self.port = port or free_port()
+        self.app = create_app(**app_kwargs)
+        self._server = uvicorn.Server(uvicorn.Config(
+            self.app, host=self.host, port=self.port,
+            log_level="warning", access_log=False))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def __enter__(self):
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Fake Gemini server did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="uniform")
+    parser.add_argument("--first-chunk", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-codes", type=int, nargs="+", default=[500])
+    parser.add_argument("--no-context-caching", action="store_true",
+                        help="Reject cachedContents like an unsupported model")
+    args = parser.parse_args()
+    uvicorn.run(create_app(latency=args.latency, jitter=args.jitter,
+                           distribution=args.distribution,
+                           first_chunk=args.first_chunk,
+                           error_rate=args.error_rate,
+                           error_codes=tuple(args.error_codes),
+                           context_caching=not args.no_context_caching),
+                host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,360 @@
+"""
+Offline load test of the generation API against the fake Gemini upstream.
+
+    python -m benchmarks.loadtest --levels 1 4 16 64 --duration 10 \\
+        --latency 1.5 --jitter 0.4 --distribution lognormal --error-rate 0.02 \\
+        --output results/loadtest.json
+    python -m benchmarks.loadtest compare results/before.json results/after.json
+
+For every concurrency level a closed loop of N clients sends requests for
+``--duration`` seconds and the run reports throughput, latency percentiles
+and a breakdown of errors. The fake upstream and the API (``--workers``
+uvicorn processes) run as subprocesses so the load generator does not share
+a GIL with either of them; ``--url`` targets an already running API instead.
+
+Every request carries a unique resume so the generation cache and request
+coalescing do not turn the run into a cache benchmark (``--repeat`` sends
+identical payloads to measure exactly that). ``--cassette`` replays
+exchanges recorded from the real API (see app/cassette.py) in place of the
+fake upstream, with ``--latency-scale`` applied to their timings. Results are written as JSON
+together with the git commit, so runs can be compared across commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks.fake_gemini import DISTRIBUTIONS, free_port
+
+BACKEND = Path(__file__).resolve().parent.parent
+ENDPOINTS = {"all": "/generate/all", "stream": "/generate/stream"}
+# Metrics compared by ``compare``: name -> True when higher is better
+COMPARED = {"rps": True, "p50_ms": False, "p95_ms": False, "p99_ms": False,
+            "error_rate": False}
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """
+    Linearly interpolated percentile of an already sorted list
+    """
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    weight = position - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+
+
+def payload(index: int, repeat: bool) -> dict:
+    marker = "" if repeat else f" Request {index}."
+    return {
+        "resume_text": "Senior Python engineer building FastAPI services on AWS. " * 10 + marker,
+        "job_description": "Hiring a backend engineer with Python and cloud experience. " * 10,
+        "tone_hint": "professional",
+    }
+
+
+async def send(http: httpx.AsyncClient, path: str, body: dict) -> tuple:
+    """
+    One request; returns (outcome, total seconds, first byte seconds).
+
+    The outcome is "ok", the HTTP status code, "stream_<status>" for an
+    error event inside a 200 stream, or the exception class name.
+    """
+    started = time.perf_counter()
+    first_byte = None
+    try:
+        async with http.stream("POST", path, json=body) as response:
+            first_byte = time.perf_counter() - started
+            outcome = "ok" if response.status_code == 200 else str(response.status_code)
+            async for line in response.aiter_lines():
+                if line.startswith("data: ") and '"status"' in line and outcome == "ok":
+                    event = json.loads(line[6:])
+                    if "section" in event and "status" in event:
+                        outcome = f"stream_{event['status']}"
+    except httpx.HTTPError as e:
+        outcome = type(e).__name__
+    return outcome, time.perf_counter() - started, first_byte
+
+
+async def run_level(base_url: str, headers: dict, path: str, concurrency: int,
+                    duration: float, timeout: float, repeat: bool,
+                    counter: list) -> dict:
+    latencies, first_bytes, outcomes = [], [], {}
+    limits = httpx.Limits(max_connections=concurrency,
+                          max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers,
+                                 timeout=timeout, limits=limits) as http:
+        deadline = time.perf_counter() + duration
+
+        async def client():
+            while time.perf_counter() < deadline:
+                counter[0] += 1
+                outcome, total, first_byte = await send(
+                    http, path, payload(counter[0], repeat))
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+                latencies.append(total)
+                if first_byte is not None:
+                    first_bytes.append(first_byte)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    first_bytes.sort()
+    requests = len(latencies)
+    ok = outcomes.pop("ok", 0)
+    ms = lambda seconds: round(seconds * 1000, 1)
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "ok": ok,
+        "errors": dict(sorted(outcomes.items())),
+        "error_rate": round((requests - ok) / requests, 4) if requests else 0.0,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(requests / elapsed, 2),
+        "ok_rps": round(ok / elapsed, 2),
+        "mean_ms": ms(sum(latencies) / requests) if requests else 0.0,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1]) if latencies else 0.0,
+        "ttfb_p50_ms": ms(percentile(first_bytes, 50)),
+        "ttfb_p95_ms": ms(percentile(first_bytes, 95)),
+    }
+
+
+def wait_until_up(url: str, process: subprocess.Popen = None, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def start_upstream(args) -> tuple:
+    port = free_port()
+    process = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_gemini", "--port", str(port),
+        "--latency", str(args.latency), "--jitter", str(args.jitter),
+        "--distribution", args.distribution,
+        "--first-chunk", str(args.first_chunk),
+        "--error-rate", str(args.error_rate),
+        "--error-codes", *map(str, args.error_codes),
+    ], cwd=BACKEND)
+    base_url = f"http://127.0.0.1:{port}"
+    wait_until_up(base_url + "/docs", process)
+    return process, base_url
+
+
+def start_api(args, upstream_url: str, state_dir: str) -> tuple:
+    port = free_port()
+    metrics_dir = Path(state_dir) / "metrics"
+    metrics_dir.mkdir()
+    env = dict(
+        os.environ,
+        GEMINI_BASE_URL=upstream_url or "",
+        OPENAI_API_KEY="fake-key",
+        X_API_KEY=args.api_key,
+        RATE_LIMIT_ENABLED="true" if args.keep_rate_limits else "false",
+        COMBINED_GENERATION="true" if args.combined else "false",
+        RATE_LIMIT_STORAGE_URI=f"sqlite:///{state_dir}/ratelimit.sqlite3",
+        IP_BLOCK_MAX_FAILURES="1000000000",
+        # Every simulated client shares one address, so only the global
+        # admission limits apply unless --per-key-limit is given
+        ADMISSION_PER_KEY_CONCURRENCY=str(args.per_key_limit),
+        JOB_QUEUE_PATH=f"{state_dir}/jobs.sqlite3",
+        GENERATION_CACHE_PATH=f"{state_dir}/generation_cache.sqlite3",
+        PROMETHEUS_MULTIPROC_DIR=str(metrics_dir),
+    )
+    if args.cassette:
+        # Recorded exchanges instead of the fake upstream; every request
+        # must reach the cassette, so caching and coalescing are off
+        env.update(
+            GEMINI_CASSETTE="replay",
+            GEMINI_CASSETTE_PATH=str(Path(args.cassette).resolve()),
+            GEMINI_CASSETTE_LATENCY_SCALE=str(args.latency_scale),
+            GENERATION_CACHE="off",
+            SINGLE_FLIGHT="false",
+        )
+    process = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+        "--port", str(port), "--workers", str(args.workers),
+        "--log-level", "warning", "--no-access-log",
+    ], cwd=BACKEND, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    wait_until_up(base_url + "/", process)
+    return process, base_url
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> dict:
+    processes = []
+    try:
+        with tempfile.TemporaryDirectory() as state_dir:
+            base_url = args.url
+            if base_url is None:
+                upstream_url = None
+                if not args.cassette:
+                    upstream, upstream_url = start_upstream(args)
+                    processes.append(upstream)
+                api, base_url = start_api(args, upstream_url, state_dir)
+                processes.append(api)
+
+            headers = {"x-api-key": args.api_key}
+            path = ENDPOINTS[args.endpoint]
+            counter = [0]
+            # Warm up connection pools and lazily created clients
+            asyncio.run(run_level(base_url, headers, path, 2, 1, args.timeout,
+                                  args.repeat, counter))
+
+            levels = []
+            for concurrency in args.levels:
+                level = asyncio.run(run_level(
+                    base_url, headers, path, concurrency, args.duration,
+                    args.timeout, args.repeat, counter))
+                print(json.dumps(level), file=sys.stderr)
+                levels.append(level)
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=10)
+
+    return {
+        "benchmark": "loadtest",
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {
+            "endpoint": path,
+            "url": args.url,
+            "workers": None if args.url else args.workers,
+            "duration_s": args.duration,
+            "repeat": args.repeat,
+            "rate_limits": args.keep_rate_limits,
+            "per_key_limit": args.per_key_limit,
+            "combined": args.combined,
+            "cassette": args.cassette and {
+                "path": args.cassette, "latency_scale": args.latency_scale},
+            "upstream": None if args.url or args.cassette else {
+                "latency_s": args.latency,
+                "jitter_s": args.jitter,
+                "distribution": args.distribution,
+                "first_chunk_s": args.first_chunk,
+                "error_rate": args.error_rate,
+                "error_codes": args.error_codes,
+            },
+        },
+        "levels": levels,
+    }
+
+
+def compare(before: dict, after: dict) -> list:
+    """
+    Per concurrency level, the relative change of each compared metric
+    """
+    previous = {level["concurrency"]: level for level in before["levels"]}
+    rows = []
+    for level in after["levels"]:
+        old = previous.get(level["concurrency"])
+        if old is None:
+            continue
+        row = {"concurrency": level["concurrency"]}
+        for metric, higher_is_better in COMPARED.items():
+            change = None
+            if old[metric]:
+                change = round((level[metric] - old[metric]) / old[metric] * 100, 1)
+            delta = level[metric] - old[metric]
+            row[metric] = {"before": old[metric], "after": level[metric],
+                           "change_pct": change,
+                           "better": delta > 0 if higher_is_better else delta < 0}
+        rows.append(row)
+    return rows
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[:1] == ["compare"]:
+        parser = argparse.ArgumentParser(prog="loadtest compare")
+        parser.add_argument("before")
+        parser.add_argument("after")
+        args = parser.parse_args(argv[1:])
+        with open(args.before) as f:
+            before = json.load(f)
+        with open(args.after) as f:
+            after = json.load(f)
+        print(json.dumps({
+            "before": before.get("commit"),
+            "after": after.get("commit"),
+            "levels": compare(before, after),
+        }, indent=2))
+        return
+
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="seconds per concurrency level")
+    parser.add_argument("--endpoint", choices=ENDPOINTS, default="all")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--repeat", action="store_true",
+                        help="send identical payloads (exercises the cache)")
+    parser.add_argument("--url", help="load an already running API instead")
+    parser.add_argument("--api-key", default=os.getenv("X_API_KEY", "bench-key"))
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--keep-rate-limits", action="store_true")
+    parser.add_argument("--per-key-limit", type=int, default=0,
+                        help="ADMISSION_PER_KEY_CONCURRENCY of the API (0 = off)")
+    parser.add_argument("--combined", action="store_true",
+                        help="one JSON-mode call per request (COMBINED_GENERATION)")
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--first-chunk", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-codes", type=int, nargs="+", default=[429, 500, 503])
+    parser.add_argument("--cassette",
+                        help="replay recorded Gemini exchanges instead of the fake upstream")
+    parser.add_argument("--latency-scale", type=float, default=1.0,
+                        help="multiplier for recorded latencies on replay")
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args(argv)
+    if args.cassette:
+        # Only the recorded payload can be replayed
+        args.repeat = True
+
+    result = run(args)
+    text = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
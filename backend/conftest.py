@@ -1,6 +1,13 @@
+import os
+import tempfile
 import pytest
 from unittest.mock import patch
 
+# Keep the shared rate-limit storage out of the working tree
+os.environ.setdefault(
+    "RATE_LIMIT_STORAGE_URI",
+    "sqlite:///" + os.path.join(tempfile.mkdtemp(), "ratelimit.sqlite3"))
+
 
 @pytest.fixture(scope="session", autouse=True)
 def setup_test_environment():
@@ -14,4 +21,35 @@ def setup_test_environment():
 def reset_rate_limiter():
     """Reset rate limiter between tests"""
     # This ensures tests don't interfere with each other
+    from app.ratelimit import limiter
+    from app.security import get_ip_blocker
+    limiter.reset()
+    get_ip_blocker().reset()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def reset_generation_cache():
+    """Start every test with empty generation, upload and resume index caches"""
+    from app.cache import get_generation_cache
+    from app.resume_index import get_index_cache
+    from app.singleflight import get_single_flight
+    from app.uploads import get_upload_cache
+    get_generation_cache().clear()
+    get_upload_cache().clear()
+    get_index_cache().clear()
+    get_single_flight().reset()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def reset_resilience():
+    """Close every circuit breaker, forget observed latencies and errors and
+    empty the admission queue"""
+    from app import resilience
+    from app.admission import get_admission_controller
+    from app.routing import get_model_router
+    resilience.reset()
+    get_model_router().reset()
+    get_admission_controller().reset()
     yield